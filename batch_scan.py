@@ -0,0 +1,283 @@
+"""Scanning cubes from still images, many cubes at a time.
+
+Each cube is six photos, one per face, held the way main() asks for the face
+while scanning.  Every image goes through the same sticker detection as the
+webcam loop (main.locate_stickers) and the facelet string is built from the
+centre colours as main() does, then validated and solved with kociemba.
+By default the colours are read against the cube's own six centre stickers,
+so no calibration is needed and the lighting only has to be the same across
+one cube's photos.  BatchScanner spreads the cubes of a batch over a process
+pool and reports throughput and failures per batch.
+
+A cube is a directory of images named after the faces (U.png, cube7_front.jpg,
+...), a {face: image} dict or a list of six images in URFDLB order, where an
+image is a path or a BGR array.  A batch directory holds one cube directory
+per cube, or is a cube directory itself.
+
+    python batch_scan.py qa/batch1 qa/batch2 --workers 4 --output results.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+import calibration
+import cube_state
+import main
+import solver
+import stickers
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
+
+# words in an image's file name that say which face it shows
+FACE_NAMES = {
+    "U": ("u", "up", "top"),
+    "R": ("r", "right"),
+    "F": ("f", "front"),
+    "D": ("d", "down", "bottom"),
+    "L": ("l", "left"),
+    "B": ("b", "back"),
+}
+
+# Stages a cube can fail at, in order
+STAGES = ("read", "stickers", "colours", "invalid", "solve")
+
+# Classify against the cube's own centre stickers instead of a stickers.use() classifier
+CENTRES = "centres"
+
+_kociemba = None
+
+
+def _images(directory):
+    return sorted(name for name in os.listdir(directory) if name.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def face_images(directory):
+    """{face: path} for the six face images in ``directory``; ValueError when they cannot be told apart."""
+    found = {}
+    for name in _images(directory):
+        words = re.split(r"[^a-z0-9]+", os.path.splitext(name)[0].lower())
+        faces = [face for face, names in FACE_NAMES.items() if words[-1] in names]
+        if faces:
+            if faces[0] in found:
+                raise ValueError("two images of face %s: %s, %s" % (faces[0], found[faces[0]], name))
+            found[faces[0]] = os.path.join(directory, name)
+    missing = [face for face in cube_state.FACES if face not in found]
+    if missing:
+        raise ValueError("no image of face %s in %s" % (", ".join(missing), directory))
+    return found
+
+
+def find_cubes(directory):
+    """{cube name: cube directory} for a batch directory, which may itself be a single cube."""
+    if _images(directory):
+        return {os.path.basename(os.path.normpath(directory)): directory}
+    return {name: os.path.join(directory, name) for name in sorted(os.listdir(directory))
+            if os.path.isdir(os.path.join(directory, name)) and _images(os.path.join(directory, name))}
+
+
+def _solve(facelets):
+    global _kociemba
+    if _kociemba is None:
+        import kociemba
+        _kociemba = kociemba
+    return _kociemba.solve(facelets)
+
+
+def _start_worker(classifier):
+    # per process: the colour classifier, and kociemba with its tables loaded
+    if classifier != CENTRES:
+        stickers.use(classifier)
+    _solve(solver.WARMUP_CUBE)
+
+
+def _ping():
+    return os.getpid()
+
+
+def _read(images):
+    if isinstance(images, str):
+        images = face_images(images)
+    elif not isinstance(images, dict):
+        images = dict(zip(cube_state.FACES, images))
+    frames = {}
+    for face in cube_state.FACES:
+        image = images.get(face)
+        if image is None:
+            raise ValueError("no image of face %s" % face)
+        frame = cv2.imread(image) if isinstance(image, str) else np.array(image)
+        if frame is None:
+            raise ValueError("cannot read %s" % image)
+        frames[face] = frame
+    return frames
+
+
+def scan_cube(images, centres=True, solve=True):
+    """Scan one cube's six face images; returns a JSON-ready result.
+
+    Colours are read against the cube's centre stickers, or with stickers.classify()
+    when ``centres`` is False.  ``failed`` is the first stage in STAGES that went
+    wrong (None when all went well) and ``error`` says why.
+    """
+    result = {"ok": False, "failed": None, "error": None, "stickers": {}, "facelets": None, "solution": None}
+    timings = result["seconds"] = {}
+    stage = "read"
+    start = time.perf_counter()
+    try:
+        frames = _read(images)
+        timings["read"] = time.perf_counter() - start
+
+        stage = "stickers"
+        start = time.perf_counter()
+        blobs = {}
+        for face, frame in frames.items():
+            # every photo is searched whole, not around where the last one had the cube
+            main.tracker.reset()
+            blobs[face] = main.locate_stickers(frame)
+            result["stickers"][face] = len(blobs[face])
+        timings["stickers"] = time.perf_counter() - start
+        wrong = ["%s: %d" % (face, len(found)) for face, found in blobs.items() if len(found) != 9]
+        if wrong:
+            raise ValueError("expected 9 stickers per face, found " + ", ".join(wrong))
+
+        stage = "colours"
+        start = time.perf_counter()
+        if centres:
+            centroids = [(found["b"][4], found["g"][4], found["r"][4]) for found in blobs.values()]
+            profile = calibration.ColourProfile(centroids, max_distance=float("inf"))
+            faces = [profile.lookup(found["b"], found["g"], found["r"])[0] for found in blobs.values()]
+        else:
+            faces = [stickers.classify(found) for found in blobs.values()]
+        timings["colours"] = time.perf_counter() - start
+        unread = [face for face, ids in zip(blobs, faces) if np.count_nonzero(ids) != 9]
+        if unread:
+            raise ValueError("unrecognised sticker colours on face %s" % ", ".join(unread))
+
+        stage = "invalid"
+        facelets = result["facelets"] = cube_state.to_facelet_string(cube_state.from_faces(*faces))
+        problems = cube_state.validate(facelets)
+        if problems:
+            raise ValueError("; ".join(reason for reason, _ in problems))
+
+        stage = "solve"
+        if solve:
+            start = time.perf_counter()
+            result["solution"] = "" if facelets == solver.SOLVED_CUBE else _solve(facelets)
+            timings["solve"] = time.perf_counter() - start
+        result["ok"] = True
+    except Exception as e:
+        result["failed"] = stage
+        result["error"] = str(e)
+    return result
+
+
+class BatchScanner:
+    """Scans batches of cubes across a process pool; scan() returns (results, stats) per batch."""
+
+    def __init__(self, workers=None, classifier=CENTRES, solve=True):
+        self.workers = workers or os.cpu_count() or 1
+        self.classifier = classifier
+        self.solve = solve
+        self.pool = None
+
+    def start(self):
+        if self.workers == 1:
+            # a pool of one only adds the cost of sending the images across
+            _start_worker(self.classifier)
+        else:
+            self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=_start_worker, initargs=(self.classifier,))
+            # start and warm up every worker now, so the first batch's throughput is not spent on it
+            for future in [self.pool.submit(_ping) for _ in range(self.workers)]:
+                future.result()
+        return self
+
+    def scan(self, cubes):
+        """Scan {name: cube} (or a list of cubes, named by position) and return (results, stats)."""
+        if not isinstance(cubes, dict):
+            cubes = {str(i): cube for i, cube in enumerate(cubes)}
+        start = time.perf_counter()
+        names = list(cubes)
+        centres = self.classifier == CENTRES
+        if self.pool is None:
+            scanned = [scan_cube(cubes[name], centres, self.solve) for name in names]
+        else:
+            chunksize = max(1, len(names) // (4 * self.workers))
+            scanned = list(self.pool.map(scan_cube, [cubes[name] for name in names],
+                                         [centres] * len(names), [self.solve] * len(names),
+                                         chunksize=chunksize))
+        elapsed = time.perf_counter() - start
+        results = {name: result for name, result in zip(names, scanned)}
+        failures = Counter(result["failed"] for result in scanned if not result["ok"])
+        stats = {
+            "cubes": len(names),
+            "ok": len(names) - sum(failures.values()),
+            "failed": sum(failures.values()),
+            "failures": {stage: failures[stage] for stage in STAGES if failures[stage]},
+            "seconds": elapsed,
+            "cubes_per_second": len(names) / max(elapsed, 1e-9),
+            "stage_seconds": {stage: sum(result["seconds"].get(stage, 0.0) for result in scanned)
+                              for stage in ("read", "stickers", "colours", "solve")},
+        }
+        return results, stats
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+
+def report(stats):
+    failures = ", ".join("%s %d" % item for item in stats["failures"].items())
+    return "%d cubes in %.2f s (%.1f cubes/s), %d ok, %d failed%s" % (
+        stats["cubes"], stats["seconds"], stats["cubes_per_second"], stats["ok"], stats["failed"],
+        " (%s)" % failures if failures else "")
+
+
+def scan_batch(cubes, workers=None, classifier=CENTRES, solve=True):
+    """One-off BatchScanner.scan(); the pool is started and closed around it."""
+    scanner = BatchScanner(workers, classifier, solve).start()
+    try:
+        return scanner.scan(cubes)
+    finally:
+        scanner.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scan, validate and solve cubes from face images.")
+    parser.add_argument("batches", nargs="+", help="batch directories of cube directories, or cube directories")
+    parser.add_argument("--workers", type=int, help="processes (default one per core)")
+    parser.add_argument("--classifier", default=CENTRES,
+                        help="'centres' (each cube's own centre stickers), 'rules', 'bgr', 'hsv' or a saved LUT")
+    parser.add_argument("--no-solve", action="store_true", help="only scan and validate")
+    parser.add_argument("--output", help="write the JSON results here instead of printing them")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    classifier = None if args.classifier == "rules" else args.classifier
+    scanner = BatchScanner(args.workers, classifier, not args.no_solve).start()
+    batches = []
+    try:
+        for batch in args.batches:
+            results, stats = scanner.scan(find_cubes(batch))
+            print("%s: %s" % (batch, report(stats)))
+            batches.append({"batch": batch, "stats": stats, "cubes": results})
+    finally:
+        scanner.close()
+    text = json.dumps(batches if len(batches) > 1 else batches[0], indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(text)
+    else:
+        print(text)
+    sys.exit(0 if all(batch["stats"]["failed"] == 0 for batch in batches) else 1)
@@ -0,0 +1,101 @@
+"""Per-camera colour calibration profiles.
+
+A profile holds one BGR centroid per cube colour and classifies sticker means
+by the nearest centroid, so it can stand in for the fixed thresholds as
+stickers.classifier.  Centroids are learnt from the centre stickers of the six
+faces (optionally refined with k-means over every sticker seen while
+calibrating), saved per camera and resolution, and nudged towards every
+confidently classified sticker in later sessions.
+"""
+import json
+import os
+
+import cv2
+import numpy as np
+
+PROFILE_PATH = "colour_profiles.json"
+
+
+def camera_key(camera, frame_shape):
+    return "%s@%dx%d" % (camera, frame_shape[1], frame_shape[0])
+
+
+class ColourProfile:
+    def __init__(self, centroids, max_distance=90.0, rate=0.02, min_confidence=0.4):
+        # centroids[k] is the BGR mean of colour id k + 1
+        self.centroids = np.array(centroids, dtype=np.float32).reshape(-1, 3)
+        self.max_distance = max_distance
+        self.rate = rate
+        self.min_confidence = min_confidence
+        self.refinements = 0
+
+    def _distances(self, bgr):
+        return np.sqrt(((bgr[:, None, :] - self.centroids[None, :, :]) ** 2).sum(axis=-1))
+
+    def lookup(self, b, g, r):
+        """(colour ids, confidences) by nearest centroid; id 0 when every centroid is too far."""
+        bgr = np.stack([b, g, r], axis=-1).astype(np.float32).reshape(-1, 3)
+        distances = self._distances(bgr)
+        order = np.argsort(distances, axis=1)
+        rows = np.arange(len(bgr))
+        best = distances[rows, order[:, 0]]
+        second = distances[rows, order[:, 1]]
+        ids = np.where(best > self.max_distance, 0, order[:, 0] + 1)
+        confidence = np.where(ids > 0, 1 - best / np.maximum(second, 1e-6), 0)
+        return ids.reshape(np.shape(b)), confidence.reshape(np.shape(b))
+
+    def refine(self, blobs):
+        """Move each centroid a little towards the confidently classified stickers of its colour."""
+        confident = (blobs["colour"] > 0) & (blobs["confidence"] >= self.min_confidence)
+        if not confident.any():
+            return
+        bgr = np.stack([blobs["b"], blobs["g"], blobs["r"]], axis=-1)[confident].astype(np.float32)
+        ids = blobs["colour"][confident] - 1
+        for k in np.unique(ids):
+            mean = bgr[ids == k].mean(axis=0)
+            self.centroids[k] += self.rate * (mean - self.centroids[k])
+        self.refinements += 1
+
+    def kmeans(self, samples, iterations=20):
+        """Refine the centroids with k-means over (N, 3) sticker means, starting from the current ones."""
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1, 3)
+        labels = np.argmin(self._distances(samples), axis=1).astype(np.int32).reshape(-1, 1)
+        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, iterations, 0.5)
+        _, labels, centres = cv2.kmeans(samples, len(self.centroids), labels, criteria, 1,
+                                        cv2.KMEANS_USE_INITIAL_LABELS)
+        self.centroids = centres.astype(np.float32)
+
+    def to_dict(self):
+        return {"centroids": self.centroids.round(2).tolist(), "refinements": self.refinements}
+
+    @classmethod
+    def from_dict(cls, data):
+        profile = cls(data["centroids"])
+        profile.refinements = data.get("refinements", 0)
+        return profile
+
+
+def _read(path):
+    # {} for a missing file, and for one that cannot be read, which the next save replaces
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            profiles = json.load(f)
+    except (OSError, ValueError) as e:
+        print("Ignoring colour profiles in %s: %s" % (path, e))
+        return {}
+    return profiles if isinstance(profiles, dict) else {}
+
+
+def load_profile(key, path=None):
+    data = _read(path or PROFILE_PATH).get(key)
+    return None if data is None else ColourProfile.from_dict(data)
+
+
+def save_profile(key, profile, path=None):
+    path = path or PROFILE_PATH
+    profiles = _read(path)
+    profiles[key] = profile.to_dict()
+    with open(path, "w") as f:
+        json.dump(profiles, f, indent=1)
@@ -0,0 +1,96 @@
+"""Threaded camera capture that always hands out the newest frame.
+
+FrameGrabber reads the camera on a background thread into a small ring buffer,
+so a slow detection step never leaves the driver's own buffer full of stale
+frames.  read() has cv2.VideoCapture's signature and returns the newest frame
+the caller has not seen yet, waiting for one if necessary; frames that were
+overwritten before anyone read them are counted as dropped.
+"""
+import threading
+import time
+from collections import deque
+
+import cv2
+
+
+def open_camera(source=0, width=None, height=None, fps=None, fourcc=None, buffer_size=None):
+    """cv2.VideoCapture with the given properties applied (None leaves the driver's default)."""
+    camera = cv2.VideoCapture(source)
+    if fourcc:
+        camera.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+    for prop, value in ((cv2.CAP_PROP_FRAME_WIDTH, width), (cv2.CAP_PROP_FRAME_HEIGHT, height),
+                        (cv2.CAP_PROP_FPS, fps), (cv2.CAP_PROP_BUFFERSIZE, buffer_size)):
+        if value:
+            camera.set(prop, value)
+    return camera
+
+
+class FrameGrabber:
+    def __init__(self, camera, ring_size=4, timeout=2.0):
+        self.camera = camera
+        self.ring = deque(maxlen=ring_size)
+        self.timeout = timeout
+        self.condition = threading.Condition()
+        self.sequence = 0
+        self.delivered_sequence = 0
+        self.stopped = False
+        self.stats = {"captured": 0, "delivered": 0, "dropped": 0, "latency": 0.0}
+        self.thread = threading.Thread(target=self._run, name="frame-grabber", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _run(self):
+        while not self.stopped:
+            is_ok, frame = self.camera.read()
+            timestamp = time.perf_counter()
+            with self.condition:
+                if not is_ok:
+                    self.stopped = True
+                else:
+                    if self.sequence > self.delivered_sequence:
+                        self.stats["dropped"] += 1
+                    self.sequence += 1
+                    self.stats["captured"] += 1
+                    self.ring.append((self.sequence, timestamp, frame))
+                self.condition.notify_all()
+
+    def read_latest(self):
+        """(ok, frame, capture timestamp) for the newest frame not returned before."""
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.sequence > self.delivered_sequence or self.stopped,
+                                           self.timeout):
+                return False, None, None
+            if self.sequence == self.delivered_sequence:
+                return False, None, None
+            sequence, timestamp, frame = self.ring[-1]
+            self.delivered_sequence = sequence
+            self.stats["delivered"] += 1
+            self.stats["latency"] += time.perf_counter() - timestamp
+        return True, frame, timestamp
+
+    def read(self):
+        is_ok, frame, _ = self.read_latest()
+        return is_ok, frame
+
+    def recent(self):
+        """The frames still in the ring buffer, oldest first, as (sequence, timestamp, frame)."""
+        with self.condition:
+            return list(self.ring)
+
+    def isOpened(self):
+        return not self.stopped and self.camera.isOpened()
+
+    def report(self):
+        mean_latency = self.stats["latency"] / max(1, self.stats["delivered"])
+        return "captured %d, delivered %d, dropped %d, mean frame age %.1f ms" % (
+            self.stats["captured"], self.stats["delivered"], self.stats["dropped"], mean_latency * 1000)
+
+    def release(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        if self.thread.is_alive() and self.thread is not threading.current_thread():
+            self.thread.join(1.0)
+        self.camera.release()
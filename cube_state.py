@@ -0,0 +1,288 @@
+"""Compact cube state: one 54-byte facelet array plus precomputed move permutations.
+
+Facelets are stored face by face in the order U, R, F, D, L, B (the same order
+main.concat used and kociemba expects), nine stickers per face, row by row as
+the camera sees them.  Every move is an index array ``perm`` such that the
+state after the move is ``state[perm]``, so a whole sequence collapses into a
+single gather.
+"""
+from functools import lru_cache
+from operator import itemgetter
+
+import numpy as np
+
+FACES = "URFDLB"
+CENTRES = np.arange(4, 54, 9)
+
+# rotate_cw / rotate_ccw of a single 3x3 face
+FACE_CW = np.array([6, 3, 0, 7, 4, 1, 8, 5, 2])
+FACE_CCW = np.argsort(FACE_CW)
+
+
+def _idx(face, stickers):
+    base = FACES.index(face) * 9
+    return [base + s for s in stickers]
+
+
+def _build(cycles, turned=(), counter_turned=()):
+    # each cycle lists strips where strip[k] receives the stickers of strip[k + 1]
+    perm = np.arange(54)
+    for cycle in cycles:
+        strips = [_idx(face, stickers) for face, stickers in cycle]
+        for k, strip in enumerate(strips):
+            perm[strip] = strips[(k + 1) % len(strips)]
+    for face in turned:
+        perm[_idx(face, range(9))] = _idx(face, FACE_CW)
+    for face in counter_turned:
+        perm[_idx(face, range(9))] = _idx(face, FACE_CCW)
+    return perm
+
+
+_ALL = range(9)
+_REVERSED = range(8, -1, -1)
+
+# Clockwise quarter turns, sticker for sticker the same as the move functions in rotate.py
+_BASE = {
+    "U": _build([[("F", (0, 1, 2)), ("R", (0, 1, 2)), ("B", (0, 1, 2)), ("L", (0, 1, 2))]], turned="U"),
+    "D": _build([[("F", (6, 7, 8)), ("L", (6, 7, 8)), ("B", (6, 7, 8)), ("R", (6, 7, 8))]], turned="D"),
+    "R": _build([[("F", (2, 5, 8)), ("D", (2, 5, 8)), ("B", (6, 3, 0)), ("U", (2, 5, 8))]], turned="R"),
+    "L": _build([[("F", (0, 3, 6)), ("U", (0, 3, 6)), ("B", (8, 5, 2)), ("D", (0, 3, 6))]], turned="L"),
+    "F": _build([[("U", (6, 7, 8)), ("L", (8, 5, 2)), ("D", (2, 1, 0)), ("R", (0, 3, 6))]], turned="F"),
+    "B": _build([[("U", (0, 1, 2)), ("R", (2, 5, 8)), ("D", (8, 7, 6)), ("L", (6, 3, 0))]], turned="B"),
+    # whole-cube rotations: y is turn_to_right (show the right face), x follows R, z follows F
+    "y": _build([[("F", _ALL), ("R", _ALL), ("B", _ALL), ("L", _ALL)]], turned="U", counter_turned="D"),
+    "x": _build([[("U", _ALL), ("F", _ALL), ("D", _ALL), ("B", _REVERSED)]], turned="R", counter_turned="L"),
+}
+_BASE["z"] = np.argsort(_BASE["y"])[_BASE["x"][_BASE["y"]]]
+
+MOVES = {}
+for _name, _perm in _BASE.items():
+    MOVES[_name] = _perm
+    MOVES[_name + "2"] = _perm[_perm]
+    MOVES[_name + "'"] = np.argsort(_perm)
+IDENTITY = np.arange(54)
+for _perm in (IDENTITY, *MOVES.values()):
+    _perm.setflags(write=False)
+
+FACE_TURNS = tuple(name for name in MOVES if name[0] in FACES)
+ROTATIONS = tuple(name for name in MOVES if name[0] in "xyz")
+
+# Integer move ids for batched use: MOVE_TABLE[i] is MOVES[MOVE_NAMES[i]], and id -1 is "no move"
+MOVE_NAMES = tuple(MOVES)
+MOVE_TABLE = np.stack([MOVES[name] for name in MOVE_NAMES] + [IDENTITY])
+MOVE_TABLE.setflags(write=False)
+NO_MOVE = -1
+
+
+def parse(moves):
+    if isinstance(moves, str):
+        return tuple(moves.split())
+    return tuple(moves)
+
+
+@lru_cache(maxsize=4096)
+def _compose(moves):
+    perm = IDENTITY
+    for move in moves:
+        perm = perm[MOVES[move]]
+    perm.setflags(write=False)
+    return perm
+
+
+def compose(moves):
+    """Single permutation equivalent to applying ``moves`` left to right."""
+    return _compose(parse(moves))
+
+
+# The 24 whole-cube orientations, as rotation sequences and stacked permutations
+ORIENTATIONS = tuple((first + " " + second).strip()
+                     for first in ("", "x", "x2", "x'", "z", "z'")
+                     for second in ("", "y", "y2", "y'"))
+ORIENTATION_TABLE = np.stack([compose(rotation) for rotation in ORIENTATIONS])
+ORIENTATION_TABLE.setflags(write=False)
+
+
+def inverse(perm):
+    return np.argsort(perm)
+
+
+def inverse_moves(moves):
+    """The move sequence that undoes ``moves``."""
+    flip = {"": "'", "'": "", "2": "2"}
+    return " ".join(move[0] + flip[move[1:]] for move in reversed(parse(moves)))
+
+
+def apply(state, moves):
+    return state[compose(moves)]
+
+
+def move_ids(moves):
+    return np.array([MOVE_NAMES.index(move) for move in parse(moves)], dtype=np.intp)
+
+
+def apply_batch(states, moves):
+    """Apply the same move sequence to every row of an (N, 54) array of states."""
+    return np.asarray(states)[:, compose(moves)]
+
+
+def apply_rows(states, row_moves):
+    """Apply a different move sequence to each row of an (N, 54) array of states.
+
+    ``row_moves`` is either N move sequences (strings or lists of move names),
+    or an integer array of move ids with shape (N,) or (N, K), padded with NO_MOVE.
+    """
+    states = np.asarray(states)
+    if not len(states):
+        return states.reshape(0, 54)
+    if isinstance(row_moves, np.ndarray) and row_moves.dtype.kind in "iu":
+        ids = row_moves.reshape(len(states), -1)
+        for k in range(ids.shape[1]):
+            states = np.take_along_axis(states, MOVE_TABLE[ids[:, k]], axis=1)
+        return states
+    perms = np.stack([compose(moves) for moves in row_moves])
+    return np.take_along_axis(states, perms, axis=1)
+
+
+def from_faces(up_face, right_face, front_face, down_face, left_face, back_face):
+    state = np.empty(54, dtype=np.uint8)
+    for i, face in enumerate((up_face, right_face, front_face, down_face, left_face, back_face)):
+        state[i * 9:(i + 1) * 9] = np.ravel(face)
+    return state
+
+
+def face(state, name):
+    i = FACES.index(name) * 9
+    return state[..., i:i + 9]
+
+
+def centres(state):
+    return state[..., CENTRES]
+
+
+def is_solved(state):
+    return bool((state.reshape(6, 9) == centres(state)[:, None]).all())
+
+
+# Facelet indices of each corner and edge slot, in kociemba's order (URF, UFL, ... and UR, UF, ...)
+CORNER_FACELETS = ((8, 9, 20), (6, 18, 38), (0, 36, 47), (2, 45, 11),
+                   (29, 26, 15), (27, 44, 24), (33, 53, 42), (35, 17, 51))
+EDGE_FACELETS = ((5, 10), (7, 19), (3, 37), (1, 46), (32, 16), (28, 25),
+                 (30, 43), (34, 52), (23, 12), (21, 41), (50, 39), (48, 14))
+
+
+SOLVED_FACELETS = "".join(name * 9 for name in FACES)
+_SLOTS = CORNER_FACELETS + EDGE_FACELETS
+_CORNER_STICKERS = tuple(i for slot in CORNER_FACELETS for i in slot)
+_EDGE_STICKERS = tuple(i for slot in EDGE_FACELETS for i in slot)
+# colours read clockwise from a slot -> (piece, twist or flip); a mirrored corner has no entry
+_PIECES = {}
+for _piece_index, _slot in enumerate(_SLOTS):
+    _colours = "".join(SOLVED_FACELETS[i] for i in _slot)
+    for _turn in range(len(_slot)):
+        _PIECES[_colours[_turn:] + _colours[:_turn]] = (_piece_index, (len(_slot) - _turn) % len(_slot))
+
+
+def _parity(perm):
+    # 0 for an even permutation, 1 for an odd one
+    seen = [False] * len(perm)
+    cycles = 0
+    for i in range(len(perm)):
+        if not seen[i]:
+            cycles += 1
+            j = i
+            while not seen[j]:
+                seen[j] = True
+                j = perm[j]
+    return (len(perm) - cycles) % 2
+
+
+_READ_SLOTS = tuple(itemgetter(*slot) for slot in _SLOTS)
+
+
+def _read_pieces(facelets):
+    # (piece, twist or flip) in each corner and edge slot, None where no such piece exists
+    return [_PIECES.get("".join(read(facelets))) for read in _READ_SLOTS]
+
+
+def validate(facelets):
+    """Why ``facelets`` cannot be a real cube, as a list of (reason, sticker indices); empty when it can.
+
+    Checks centres and sticker counts, that every corner and edge is a piece that
+    exists exactly once, then corner twist, edge flip and permutation parity.
+    Stickers are those most likely to have been misread.
+    """
+    if len(facelets) != 54:
+        return [("expected 54 stickers, got %d" % len(facelets), tuple(range(min(len(facelets), 54))))]
+    if facelets[4::9] != FACES:
+        # faces whose centre colour turns up on another centre too, or on none at all
+        wrong_centres = tuple(int(i) for i in CENTRES if facelets[4::9].count(facelets[i]) != 1)
+        return [("centre colours are not all different", wrong_centres)]
+    pieces = _read_pieces(facelets)
+    if None in pieces or len({piece for piece, _ in pieces}) != 20:
+        return _diagnose(facelets, pieces)
+    problems = []
+    if sum(twist for _, twist in pieces[:8]) % 3:
+        problems.append(("a corner is twisted", _CORNER_STICKERS))
+    if sum(flip for _, flip in pieces[8:]) % 2:
+        problems.append(("an edge is flipped", _EDGE_STICKERS))
+    if _parity([piece for piece, _ in pieces[:8]]) != _parity([piece - 8 for piece, _ in pieces[8:]]):
+        problems.append(("two pieces are swapped", _CORNER_STICKERS + _EDGE_STICKERS))
+    return problems
+
+
+def _diagnose(facelets, pieces):
+    # missing or repeated pieces, and the sticker counts that go with them
+    problems = []
+    suspects = set()
+    seen = {}
+    for slot, piece in zip(_SLOTS, pieces):
+        if piece is None:
+            problems.append(("no such piece: %s" % "".join(facelets[i] for i in slot), slot))
+            suspects.update(slot)
+        else:
+            seen.setdefault(piece[0], []).append(slot)
+    for piece, slots in seen.items():
+        if len(slots) > 1:
+            stickers = tuple(i for slot in slots for i in slot)
+            name = "".join(SOLVED_FACELETS[i] for i in _SLOTS[piece])
+            problems.append(("piece %s appears %d times" % (name, len(slots)), stickers))
+            suspects.update(stickers)
+
+    counts = [facelets.count(name) for name in FACES]
+    if counts != [9] * 6:
+        over = "".join(name for name, count in zip(FACES, counts) if count > 9)
+        stickers = tuple(i for i in suspects if facelets[i] in over) or \
+            tuple(i for i, name in enumerate(facelets) if name in over and i not in CENTRES) or tuple(suspects)
+        problems.append(("sticker counts %s" % " ".join("%s%d" % pair for pair in zip(FACES, counts)),
+                         tuple(sorted(stickers))))
+    return problems
+
+
+def problem_faces(problems):
+    """Faces (as a string in URFDLB order) holding the stickers named by validate()."""
+    stickers = {i for _, indices in problems for i in indices}
+    return "".join(name for k, name in enumerate(FACES) if any(k * 9 <= i < k * 9 + 9 for i in stickers))
+
+
+def inverse_facelets(facelets):
+    """Facelet string of the inverse cube: solving it and inverting the solution solves ``facelets``.
+
+    Raises ValueError if ``facelets`` is not a real cube.
+    """
+    problems = validate(facelets)
+    if problems:
+        raise ValueError(problems[0][0])
+    perm = IDENTITY.copy()
+    for slot, (piece, _) in zip(_SLOTS, _read_pieces(facelets)):
+        home = _SLOTS[piece]
+        for i in slot:
+            perm[i] = next(j for j in home if SOLVED_FACELETS[j] == facelets[i])
+    state = np.frombuffer(SOLVED_FACELETS.encode(), dtype=np.uint8)[inverse(perm)]
+    return state.tobytes().decode()
+
+
+def to_facelet_string(state):
+    """Kociemba facelet string, naming each sticker after the face whose centre shares its colour."""
+    lut = np.full(256, ord("?"), dtype=np.uint8)
+    lut[centres(state)] = np.frombuffer(FACES.encode(), dtype=np.uint8)
+    return lut[state].tobytes().decode()
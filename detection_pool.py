@@ -0,0 +1,268 @@
+"""Sticker detection in worker processes over a shared-memory frame ring.
+
+ParallelDetectionStage is a drop-in for pipeline.DetectionStage that spreads
+main.locate_stickers over several processes.  Each camera frame is copied once
+into a slot of a shared-memory ring; workers take turns on the frames, find the
+stickers on a NumPy view of the slot (drawing their outlines straight into it)
+and send back only the slot, the sequence number and the small blob array.
+Results are put back in capture order before the stickers are classified in
+this process, so the colour profile is refined here in frame order as before.
+Frames the ``schedule`` skips are handed out in their turn as not detected,
+and those that fail the ``gate`` (main's motion gate) as frames without
+stickers, neither going to a worker; detected frames are searched at the
+schedule's current height.
+"""
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import stickers
+
+# In place of a blob array: frames the schedule skipped, and frames the gate turned away
+SKIPPED = "skipped"
+GATED = "gated"
+
+
+class SharedFrameRing:
+    # slots frames of one shape in a single shared-memory block, as an (slots, h, w, 3) array
+    def __init__(self, shape, slots, name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        size = slots * int(np.prod(self.shape))
+        self.owner = name is None
+        self.memory = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.memory.buf)
+
+    def close(self):
+        del self.frames
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+
+def _detect_worker(ring_name, shape, slots, settings, jobs, results):
+    import main
+
+    for name, value in settings.items():
+        setattr(main, name, value)
+    ring = SharedFrameRing(shape, slots, ring_name)
+    # warm up OpenCV before the first real frame
+    main.locate_stickers(np.zeros(shape, dtype=np.uint8))
+    main.tracker.reset()
+    results.put(None)
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        sequence, slot, height = job
+        start = time.perf_counter()
+        blobs = main.locate_stickers(ring.frames[slot], height)
+        results.put((sequence, slot, blobs, time.perf_counter() - start))
+    ring.close()
+
+
+class ParallelDetectionStage:
+    def __init__(self, video, shape, classify, workers=None, queue_size=2, settings=None, timeout=2.0, gate=None,
+                 schedule=None):
+        self.video = video
+        self.shape = tuple(shape)
+        self.classify = classify
+        # gate(frame) False: the frame is not worth detecting (main's motion gate) and skips the workers
+        self.gate = gate
+        # a scheduler.DetectionScheduler deciding which frames to detect and at what height
+        self.schedule = schedule
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.settings = settings or {}
+        self.timeout = timeout
+        # every worker may hold two frames while the consumer holds queue_size more
+        self.ring = SharedFrameRing(self.shape, 2 * self.workers + queue_size + 1)
+        self.free = deque(range(self.ring.slots))
+        self.ready = deque()
+        self.pending = {}
+        self.next_sequence = 0
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.exhausted = False
+        self.error = None
+        self.closed = False
+        self.dispatched = 0
+        self.started = None
+        self.stats = {"detected": 0, "skipped": 0, "gated": 0, "consumed": 0, "reordered": 0, "max_pending": 0, "busy": 0.0,
+                      "blocked": 0.0, "waited": 0.0}
+        context = multiprocessing.get_context("spawn")
+        self.results = context.Queue()
+        self.jobs = [context.Queue() for _ in range(self.workers)]
+        self.processes = [context.Process(target=_detect_worker, daemon=True,
+                                          args=(self.ring.memory.name, self.shape, self.ring.slots,
+                                                self.settings, jobs, self.results))
+                          for jobs in self.jobs]
+        self.feeder = threading.Thread(target=self._feed, name="detection-feeder", daemon=True)
+        self.collector = threading.Thread(target=self._collect, name="detection-collector", daemon=True)
+
+    def start(self):
+        # RuntimeError, with the workers stopped and the ring freed, when a worker dies while starting
+        for process in self.processes:
+            process.start()
+        ready = 0
+        while ready < len(self.processes):
+            try:
+                self.results.get(timeout=self.timeout)
+                ready += 1
+            except queue.Empty:
+                error = self._dead_worker()
+                if error:
+                    for process in self.processes:
+                        process.terminate()
+                        process.join(self.timeout)
+                    self.ring.close()
+                    raise RuntimeError(error + " while starting")
+        self.started = time.perf_counter()
+        self.feeder.start()
+        self.collector.start()
+        return self
+
+    def _feed(self):
+        while not self.stopped:
+            is_ok, frame = self.video.read()
+            if not is_ok:
+                break
+            with self.condition:
+                start = time.perf_counter()
+                self.condition.wait_for(lambda: self.free or self.stopped)
+                self.stats["blocked"] += time.perf_counter() - start
+                if self.stopped:
+                    break
+                slot = self.free.popleft()
+                due = self.schedule is None or self.schedule.due()
+                height = None if self.schedule is None else self.schedule.height
+            self.ring.frames[slot] = frame
+            if not due or (self.gate is not None and not self.gate(frame)):
+                # handed out in its turn without going to a worker
+                with self.condition:
+                    self.stats["skipped" if not due else "gated"] += 1
+                    self._arrived(self.dispatched, slot, SKIPPED if not due else GATED)
+            else:
+                # alternate frames between workers, so each one's face tracker sees every n-th frame
+                self.jobs[self.dispatched % self.workers].put((self.dispatched, slot, height))
+            self.dispatched += 1
+        for jobs in self.jobs:
+            jobs.put(None)
+        with self.condition:
+            self.exhausted = True
+            self.condition.notify_all()
+
+    def _dead_worker(self):
+        # what went wrong when a worker has exited with an error, else None
+        for number, process in enumerate(self.processes):
+            if process.exitcode not in (None, 0):
+                return "detection worker %d exited with code %s" % (number, process.exitcode)
+        return None
+
+    def _collect(self):
+        while True:
+            with self.condition:
+                if self.exhausted and self.next_sequence >= self.dispatched:
+                    break
+            try:
+                sequence, slot, blobs, seconds = self.results.get(timeout=0.1)
+            except queue.Empty:
+                error = None if self.stopped else self._dead_worker()
+                if error:
+                    # its frames will never come back, so nothing after them can be handed out
+                    with self.condition:
+                        self.error = error
+                        self.stopped = self.exhausted = True
+                        self.condition.notify_all()
+                    break
+                continue
+            with self.condition:
+                self.stats["busy"] += seconds
+                self.stats["detected"] += 1
+                if self.schedule is not None:
+                    # the workers detect side by side, so each frame costs the budget a share of its time
+                    self.schedule.record(seconds / self.workers)
+                if sequence != self.next_sequence:
+                    self.stats["reordered"] += 1
+                self._arrived(sequence, slot, blobs)
+
+    def _arrived(self, sequence, slot, blobs):
+        # with the condition held: queue the result and release every one that is now in order
+        self.pending[sequence] = (slot, blobs)
+        self.stats["max_pending"] = max(self.stats["max_pending"], len(self.pending))
+        while self.next_sequence in self.pending:
+            self.ready.append(self.pending.pop(self.next_sequence))
+            self.next_sequence += 1
+        self.condition.notify_all()
+
+    def read_detected(self):
+        with self.condition:
+            start = time.perf_counter()
+            self.condition.wait_for(
+                lambda: self.ready or self.error or (self.exhausted and self.next_sequence >= self.dispatched),
+                self.timeout)
+            self.stats["waited"] += time.perf_counter() - start
+            slot = None
+            if self.ready:
+                slot, blobs = self.ready.popleft()
+        if slot is None:
+            if self.error and not self.closed:
+                # ends the session like any other read failure, with the workers stopped and the ring freed
+                print("Detection workers failed (%s)" % self.error)
+                self.stop()
+            return False, None, [], []
+        # the caller keeps drawing on and recording the frame, so it gets its own copy and the slot is reused
+        frame = self.ring.frames[slot].copy()
+        with self.condition:
+            self.free.append(slot)
+            self.stats["consumed"] += 1
+            self.condition.notify_all()
+        if blobs is SKIPPED:
+            # what pipeline.detect_scheduled returns for a frame it skips
+            return True, frame, None, []
+        if blobs is GATED:
+            # what detect_face returns for a moving cube
+            return True, frame, [0, 0, 0], np.zeros(0, dtype=stickers.BLOB_DTYPE)
+        face, blobs = self.classify(blobs)
+        return True, frame, face, blobs
+
+    def read(self):
+        is_ok, frame, _, _ = self.read_detected()
+        return is_ok, frame
+
+    def isOpened(self):
+        return not self.exhausted or bool(self.ready)
+
+    def report(self):
+        elapsed = max(1e-9, time.perf_counter() - self.started)
+        return ("%d workers detected %d frames at %.1f fps, mean %.1f ms per frame, %d out of order "
+                "(max %d waiting), feeder waiting on slots %.0f%%; vote %d frames, waiting on detect %.0f%%") % (
+            self.workers, self.stats["detected"], self.stats["detected"] / elapsed,
+            1000 * self.stats["busy"] / max(1, self.stats["detected"]), self.stats["reordered"],
+            self.stats["max_pending"], 100 * self.stats["blocked"] / elapsed, self.stats["consumed"],
+            100 * self.stats["waited"] / elapsed)
+
+    def stop(self):
+        # stops the workers and frees the ring; the video itself belongs to the caller
+        if self.closed:
+            return
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        self.feeder.join(self.timeout)
+        for process in self.processes:
+            process.join(self.timeout)
+            if process.is_alive():
+                process.terminate()
+        with self.condition:
+            self.exhausted = True
+            self.dispatched = self.next_sequence
+        self.collector.join(self.timeout)
+        self.ring.close()
+        self.closed = True
@@ -0,0 +1,115 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# Set by headless runs (simulator, benchmarks) to skip imshow/waitKey
+headless = False
+
+# Callables notified as listener(event, value) when the app asks the user for something:
+# ("face", prompt text) while scanning and ("move", (move name, face to show)) while guiding a move.
+# They are also told what the app has worked out: ("scanned", facelet string) once all six faces
+# are in, ("solution", moves) once solved, and ("moved", (move name, facelet string)) as each move
+# is seen done.
+listeners = []
+
+# The Renderer showing frames while run() is active, None when show_frame displays them itself
+renderer = None
+
+# perf_counter() time of the first frame shown since it was last set to None (for startup timing)
+first_frame_time = None
+
+def notify(event, value):
+    for listener in list(listeners):
+        listener(event, value)
+
+def warm_up():
+    # OpenCV loads its Hershey fonts on the first putText, which takes about 40 ms; done at startup
+    # beside the camera opening instead of on the first frame shown
+    cv2.putText(np.zeros((8, 8, 3), dtype=np.uint8), "0", (0, 8), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 3)
+
+def show_frame(videoWriter, bgr_image_input):
+    # Record and display one frame; True when the user pressed ESC or q
+    global first_frame_time
+    if first_frame_time is None:
+        first_frame_time = time.perf_counter()
+    videoWriter.write(bgr_image_input)
+    if headless:
+        return False
+    if renderer is not None:
+        return renderer.post(bgr_image_input)
+    cv2.imshow("Output Image", bgr_image_input)
+    key_pressed = cv2.waitKey(1) & 0xFF
+    return key_pressed == 27 or key_pressed == ord('q')
+
+
+class Renderer:
+    # Single-slot mailbox between the app thread and the window: the newest posted frame wins
+    def __init__(self, fps):
+        self.period = 1.0 / fps
+        self.lock = threading.Lock()
+        self.frame = None
+        self.quit = False
+        self.started = time.perf_counter()
+        self.stats = {"refreshes": 0, "posted": 0, "shown": 0, "skipped": 0}
+
+    def post(self, frame):
+        with self.lock:
+            if self.frame is not None:
+                self.stats["skipped"] += 1
+            self.frame = frame
+            self.stats["posted"] += 1
+        return self.quit
+
+    def show(self):
+        with self.lock:
+            frame, self.frame = self.frame, None
+        if frame is not None:
+            cv2.imshow("Output Image", frame)
+            self.stats["shown"] += 1
+        self.stats["refreshes"] += 1
+        key_pressed = cv2.waitKey(1) & 0xFF
+        if key_pressed == 27 or key_pressed == ord('q'):
+            self.quit = True
+
+    def report(self):
+        elapsed = max(1e-9, time.perf_counter() - self.started)
+        return "refreshed at %.1f Hz, showed %d of %d frames (%.1f fps), %d skipped" % (
+            self.stats["refreshes"] / elapsed, self.stats["shown"], self.stats["posted"],
+            self.stats["shown"] / elapsed, self.stats["skipped"])
+
+
+def run(target, *args, fps=None):
+    """Call target(*args) on a worker thread while this thread shows its frames at ``fps``.
+
+    GUI toolkits want imshow/waitKey on the main thread, so the app runs beside
+    it instead.  Headless, or without fps, target just runs here.
+    """
+    global renderer
+    if headless or not fps:
+        return target(*args)
+    outcome = {}
+
+    def work():
+        try:
+            outcome["result"] = target(*args)
+        except BaseException as error:
+            outcome["error"] = error
+
+    renderer = Renderer(fps)
+    thread = threading.Thread(target=work, name="app")
+    thread.start()
+    try:
+        next_frame = time.perf_counter()
+        while thread.is_alive():
+            renderer.show()
+            # after a slow frame start again from now rather than catching up in a burst
+            next_frame = max(next_frame + renderer.period, time.perf_counter())
+            time.sleep(max(0.0, next_frame - time.perf_counter()))
+        print("Display: %s" % renderer.report())
+    finally:
+        renderer = None
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome.get("result")
@@ -0,0 +1,58 @@
+"""Region-of-interest tracking for detect_face.
+
+Once a frame shows all nine stickers, the next frames are only searched inside
+the stickers' bounding box grown by ``margin`` times its size on every side.
+After ``max_misses`` frames in a row without nine stickers in that region the
+tracker forgets it and detect_face searches the whole frame again.
+"""
+
+
+class FaceTracker:
+    def __init__(self, margin=0.5, max_misses=5, enabled=True):
+        self.margin = margin
+        self.max_misses = max_misses
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        self.box = None
+        self.misses = 0
+        self.stats = {"frames": 0, "roi_frames": 0, "roi_hits": 0, "full_frames": 0, "full_hits": 0, "fallbacks": 0}
+
+    def region(self, shape):
+        """(x0, y0, x1, y1) to search in a frame of ``shape``, or None for the whole frame."""
+        self.stats["frames"] += 1
+        if not self.enabled or self.box is None:
+            self.stats["full_frames"] += 1
+            return None
+        self.stats["roi_frames"] += 1
+        x0, y0, x1, y1 = self.box
+        h, w = shape[:2]
+        return max(0, x0), max(0, y0), min(w, x1), min(h, y1)
+
+    def update(self, roi, blobs):
+        """Record the result of searching ``roi``; blobs holds (x, y, w, h) of each sticker found."""
+        if len(blobs) == 9:
+            self.stats["roi_hits" if roi is not None else "full_hits"] += 1
+            x0 = min(x for x, y, w, h in blobs)
+            y0 = min(y for x, y, w, h in blobs)
+            x1 = max(x + w for x, y, w, h in blobs)
+            y1 = max(y + h for x, y, w, h in blobs)
+            dx = int((x1 - x0) * self.margin)
+            dy = int((y1 - y0) * self.margin)
+            self.box = (x0 - dx, y0 - dy, x1 + dx, y1 + dy)
+            self.misses = 0
+        elif roi is not None:
+            self.misses += 1
+            if self.misses >= self.max_misses:
+                self.box = None
+                self.misses = 0
+                self.stats["fallbacks"] += 1
+
+    def hit_rate(self):
+        # share of frames answered from the tracked region
+        return self.stats["roi_hits"] / max(1, self.stats["frames"])
+
+    def report(self):
+        return ", ".join("%s %d" % item for item in self.stats.items()) + ", roi hit rate %.0f%%" % (
+            100 * self.hit_rate())
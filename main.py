@@ -476,30 +476,94 @@
 
 
 
+import time
+IMPORT_START = time.perf_counter()
 import cv2
 import sys
-import time
-import math
 import numpy as np
-import random as rng
-from scipy import stats
-import kociemba
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from rotate import right_cw, right_ccw, left_cw, left_ccw, front_cw, front_ccw, turn_to_right, turn_to_front, up_cw, up_ccw, down_cw, down_ccw
+import calibration
+import capture
+import cube_state
+import display
+import face_tracker
+import motion
+import move_compiler
+import pipeline
+import recorder
+import rotate
+import scheduler
+import stickers
+import voting
+from rotate import right_cw, right_ccw, right_half, left_cw, left_ccw, left_half, front_cw, front_ccw, front_half, back_cw, back_ccw, back_half, turn_to_right, turn_to_front, up_cw, up_ccw, up_half, down_cw, down_ccw, down_half
+IMPORT_SECONDS = time.perf_counter() - IMPORT_START
+
+# Physical step functions for the steps move_compiler produces
+STEP_MOVES = {
+    "R": right_cw, "R'": right_ccw, "R2": right_half,
+    "L": left_cw, "L'": left_ccw, "L2": left_half,
+    "F": front_cw, "F'": front_ccw, "F2": front_half,
+    "B": back_cw, "B'": back_ccw, "B2": back_half,
+    "U": up_cw, "U'": up_ccw, "U2": up_half,
+    "D": down_cw, "D'": down_ccw, "D2": down_half,
+    "y": turn_to_right, "y'": turn_to_front,
+}
+
+# Frames are halved (an image pyramid) until they are at most about this tall before detection,
+# so its cost does not grow with the camera's resolution; None detects at full resolution
+DETECTION_HEIGHT = 480
+# Sticker contour limits for a 480-pixel-high detection image: area in px^2, and how far
+# (perimeter / 4)^2 may be from the area.  The area range scales with the square of the
+# detection height and the squareness tolerance with the height, as outline errors do.
+STICKER_AREA_RANGE = (1000, 3000)
+STICKER_SQUARENESS = 150
+REFERENCE_HEIGHT = 480
+# Search only around the last place nine stickers were seen (see face_tracker.py)
+tracker = face_tracker.FaceTracker()
+# Keep detection within DETECTION_LOAD of each frame at DETECTION_TARGET_FPS by lowering the detection
+# height through DETECTION_HEIGHTS and then skipping frames (see scheduler.py); False detects every frame
+SCHEDULE_DETECTION = True
+DETECTION_TARGET_FPS = 30
+DETECTION_LOAD = 0.5
+DETECTION_HEIGHTS = (480, 240)
+schedule = scheduler.DetectionScheduler(DETECTION_TARGET_FPS, DETECTION_LOAD, DETECTION_HEIGHTS)
+# Skip detection while the cube region changes by more than MOTION_THRESHOLD grey levels a frame
+# (see motion.py), resuming after MOTION_SETTLE_FRAMES still frames
+MOTION_GATE = True
+MOTION_THRESHOLD = 15
+MOTION_SETTLE_FRAMES = 1
+motion_gate = motion.MotionGate(MOTION_THRESHOLD, settle=MOTION_SETTLE_FRAMES)
+# Sticker colour classifier: None for the BGR rules, "bgr" or "hsv" for a lookup table built from
+# those rules, or the path of a table saved by stickers.py
+COLOUR_CLASSIFIER = None
 
-def concat(up_face,right_face,front_face,down_face,left_face,back_face):
-    # solution = [up_face,right_face,front_face,down_face,left_face,back_face]
-    solution = np.concatenate((up_face, right_face), axis=None)
-    solution = np.concatenate((solution, front_face), axis=None)
-    solution = np.concatenate((solution, down_face), axis=None)
-    solution = np.concatenate((solution, left_face), axis=None)
-    solution = np.concatenate((solution, back_face), axis=None)
-    # print(solution)
-    return solution
+def detect_face(bgr_image_input, height=None):
+    if not motion_gate.check(bgr_image_input, tracker.box):
+        # the cube is moving: treat it like a frame without a face
+        return [0,0,0], np.zeros(0, dtype=stickers.BLOB_DTYPE)
+    return read_face(locate_stickers(bgr_image_input, height))
 
-def detect_face(bgr_image_input):
 
-    gray = cv2.cvtColor(bgr_image_input,cv2.COLOR_BGR2GRAY)
+def locate_stickers(bgr_image_input, height=None):
+    # Find, sample and outline the sticker candidates, searching at most ``height`` (default
+    # DETECTION_HEIGHT) pixels high; the costly half of detect_face
+    height = height or DETECTION_HEIGHT
+    roi = tracker.region(bgr_image_input.shape)
+    x0, y0 = 0, 0
+    search = bgr_image_input
+    if roi is not None:
+        x0, y0, x1, y1 = roi
+        search = bgr_image_input[y0:y1, x0:x1]
+    scale = 1.0
+    while height and bgr_image_input.shape[0] * scale > height * 1.25:
+        # halving is INTER_AREA's fast path
+        search = cv2.resize(search, (search.shape[1] // 2, search.shape[0] // 2), interpolation=cv2.INTER_AREA)
+        scale /= 2
+    unit = (bgr_image_input.shape[0] * scale / REFERENCE_HEIGHT) ** 2
+    min_area, max_area = STICKER_AREA_RANGE[0] * unit, STICKER_AREA_RANGE[1] * unit
+    squareness = STICKER_SQUARENESS * unit ** 0.5
+    gray = cv2.cvtColor(search,cv2.COLOR_BGR2GRAY)
 
     kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE,(2,2))
     gray = cv2.morphologyEx(gray, cv2.MORPH_OPEN, kernel)
@@ -517,62 +581,39 @@ def detect_face(bgr_image_input):
     contour_id = 0
     #print(len(contours))
     count = 0
-    blob_colors = []
+    rects = []
+    outlines = []
     for contour in contours:
         A1 = cv2.contourArea(contour)
         contour_id = contour_id + 1
 
-        if A1 < 3000 and A1 > 1000:
+        if A1 < max_area and A1 > min_area:
             perimeter = cv2.arcLength(contour, True)
             epsilon = 0.01 * perimeter
             approx = cv2.approxPolyDP(contour, epsilon, True)
-            hull = cv2.convexHull(contour)
-            if cv2.norm(((perimeter / 4) * (perimeter / 4)) - A1) < 150:
+            if cv2.norm(((perimeter / 4) * (perimeter / 4)) - A1) < squareness:
                 #if cv2.ma
                 count = count + 1
-                x, y, w, h = cv2.boundingRect(contour)
-                #cv2.rectangle(bgr_image_input, (x, y), (x + w, y + h), (0, 255, 255), 2)
-                #cv2.imshow('cutted contour', bgr_image_input[y:y + h, x:x + w])
-                val = (50*y) + (10*x)
-                blob_color = np.array(cv2.mean(bgr_image_input[y:y+h,x:x+w])).astype(int)
-                cv2.drawContours(bgr_image_input,[contour],0,(255, 255, 0),2)
-                cv2.drawContours(bgr_image_input, [approx], 0, (255, 255, 0), 2)
-                blob_color = np.append(blob_color, val)
-                blob_color = np.append(blob_color, x)
-                blob_color = np.append(blob_color, y)
-                blob_color = np.append(blob_color, w)
-                blob_color = np.append(blob_color, h)
-                blob_colors.append(blob_color)
-    if len(blob_colors) > 0:
-        blob_colors = np.asarray(blob_colors)
-        blob_colors = blob_colors[blob_colors[:, 4].argsort()]
-    face = np.array([0,0,0,0,0,0,0,0,0])
+                rects.append(cv2.boundingRect(contour))
+                outlines.append(contour)
+                outlines.append(approx)
+    # sample colours before the outlines are drawn over the frame; geometry comes back in frame coordinates
+    blob_colors = stickers.sample(search, rects, (x0, y0), scale)
+    blob_colors = blob_colors[np.argsort(blob_colors["order"], kind="stable")]
+    tracker.update(roi, np.stack([blob_colors["x"], blob_colors["y"], blob_colors["w"], blob_colors["h"]], axis=-1))
+    origin = np.array([x0, y0], dtype=np.int32)
+    outlines = [np.rint(outline / scale).astype(np.int32) + origin for outline in outlines]
+    cv2.drawContours(bgr_image_input, outlines, -1, (255, 255, 0), 2)
+    return blob_colors
+
+
+def read_face(blob_colors):
+    # Classify the stickers found by locate_stickers: (colour ids, blobs) for a full face
     if len(blob_colors) == 9:
-        #print(blob_colors)
-        for i in range(9):
-            #print(blob_colors[i])
-            if blob_colors[i][0] > 120 and blob_colors[i][1] > 120 and blob_colors[i][2] > 100:
-                blob_colors[i][3] = 1
-                face[i] = 1
-            elif blob_colors[i][0] < 100 and blob_colors[i][1] > 120 and blob_colors[i][2] > 120 and np.abs(blob_colors[i][1]-blob_colors[i][2])<30:
-                blob_colors[i][3] = 2
-                face[i] = 2
-            elif blob_colors[i][0] > blob_colors[i][1] and blob_colors[i][1] > blob_colors[i][2]:
-                blob_colors[i][3] = 3
-                face[i] = 3
-            elif blob_colors[i][1] > blob_colors[i][0] and blob_colors[i][1] > blob_colors[i][2] and np.abs(blob_colors[i][0] - blob_colors[i][2]) < 30:
-                blob_colors[i][3] = 4
-                face[i] = 4
-            elif blob_colors[i][2] > blob_colors[i][0] and blob_colors[i][2] > blob_colors[i][1] and np.abs(blob_colors[i][0] - blob_colors[i][1]) < 30 and blob_colors[i][0] < 80:
-                blob_colors[i][3] = 5
-                face[i] = 5
-            elif blob_colors[i][1] < blob_colors[i][2] and blob_colors[i][0] < blob_colors[i][1] and blob_colors[i][2] > 120:
-                blob_colors[i][3] = 6
-                face[i] = 6
-        #print(face)
+        face = stickers.classify(blob_colors)
         if np.count_nonzero(face) == 9:
-            #print(face)
-            #print (blob_colors)
+            if isinstance(stickers.classifier, calibration.ColourProfile):
+                stickers.classifier.refine(blob_colors)
             return face, blob_colors
         else:
             return [0,0], blob_colors
@@ -580,51 +621,276 @@ def detect_face(bgr_image_input):
         return [0,0,0], blob_colors
         #break
 
+def gate_frame(bgr_image_input):
+    # detect_face's motion gate on its own, for detection workers that only locate the stickers
+    return motion_gate.check(bgr_image_input, tracker.box)
+
+
+def read_located(blob_colors):
+    # read_face for stickers found by a detection worker, keeping this process's tracker box (where
+    # gate_frame measures motion) where the worker found the cube
+    tracker.update(None, np.stack([blob_colors["x"], blob_colors["y"], blob_colors["w"], blob_colors["h"]], axis=-1))
+    return read_face(blob_colors)
+
+# rotate.py's move loops detect with this module's detect_face and schedule
+rotate.detect_face = detect_face
+rotate.schedule = schedule
+
+# How long the "Show ... Face" hint stays up between scans, and the final "CUBE SOLVED" banner
+FACE_PROMPT_SECONDS = 3
+SOLVED_MESSAGE_SECONDS = 5
+# Learn colours per camera on the first run and reuse them afterwards (see calibration.py);
+# CALIBRATE forces a new calibration and CALIBRATION_KMEANS refines it over every sticker seen
+COLOUR_CALIBRATION = True
+CALIBRATE = False
+CALIBRATION_KMEANS = False
+CALIBRATION_FRAMES = 10
+# how far (BGR distance) a centre must be from the colours already learnt to count as a new face
+CALIBRATION_MIN_DISTANCE = 40
+# seconds to wait for each face before giving up and classifying with the rules (stickers.classifier)
+CALIBRATION_TIMEOUT = 30
+# Camera settings (None keeps the driver's default).  Frames are read on a background thread and
+# every loop gets the newest one; CAPTURE_BUFFER_SIZE is the driver's own queue, CAPTURE_RING_SIZE ours
+CAPTURE_WIDTH = None
+CAPTURE_HEIGHT = None
+CAPTURE_FPS = None
+CAPTURE_FOURCC = None
+CAPTURE_BUFFER_SIZE = 1
+CAPTURE_RING_SIZE = 4
+# OUTPUT5.avi is encoded on a background thread; RECORD_FPS None measures the frame rate from the
+# first frames' timestamps.  RECORD_POLICY is what a full queue does: "block", "drop_oldest" or "drop_newest"
+RECORD_PATH = "OUTPUT5.avi"
+RECORD_FPS = None
+RECORD_QUEUE_SIZE = 32
+RECORD_POLICY = "drop_oldest"
+# Detect on a thread of its own, at most PIPELINE_QUEUE_SIZE frames ahead of the loops that vote on the
+# results, and show the window at DISPLAY_FPS from the main thread whatever speed detection runs at
+PIPELINE = True
+PIPELINE_QUEUE_SIZE = 2
+DISPLAY_FPS = 30
+# Processes that find stickers on alternate frames from a shared-memory ring (None: one per core);
+# 0 keeps detection on the pipeline's single thread
+DETECTION_WORKERS = 0
+FACE_PROMPTS = {
+    "U": "Show Top Face", "R": "Show Right Face", "F": "Show Front Face",
+    "D": "Show Down Face", "L": "Show Left Face", "B": "Show Back Face",
+}
+# Seconds the solver may search before the best solution so far is used (None: plain kociemba.solve)
+SOLVE_DEADLINE = None
+SOLVE_MAX_DEPTH = 24
+# Solve the cube held several ways in a process pool and guide the cheapest solution found within
+# SOLVE_ORIENTATIONS_DEADLINE seconds (the first one found, when none is by then)
+SOLVE_ORIENTATIONS = True
+SOLVE_ORIENTATIONS_DEADLINE = 0.2
+# SQLite file the solution cache keeps between runs; None keeps it in memory for the session only
+SOLUTION_CACHE_PATH = "solution_cache.sqlite3"
+# A scanned face is decided once, for every sticker, the leading colour is ahead of the runner-up by
+# VOTE_THRESHOLD of its votes over the last VOTE_WINDOW faces (at least VOTE_MIN_FRAMES of them);
+# VOTE_WEIGHTED weights each vote by its classification confidence
+VOTE_WINDOW = 5
+VOTE_MIN_FRAMES = 3
+VOTE_THRESHOLD = 0.6
+VOTE_WEIGHTED = True
+
 def find_face(video,videoWriter,uf,rf,ff,df,lf,bf,text = ""):
-    faces = []
+    display.notify("face", text)
+    voter = voting.StickerVoter(VOTE_WINDOW, VOTE_MIN_FRAMES, VOTE_THRESHOLD, VOTE_WEIGHTED)
     while True:
-        is_ok, bgr_image_input = video.read()
+        is_ok, bgr_image_input, face, blob_colors = pipeline.read_detected(video, detect_face, schedule)
 
         if not is_ok:
             print("Cannot read video source")
             sys.exit()
 
-
-        face, blob_colors = detect_face(bgr_image_input)
         bgr_image_input = cv2.putText(bgr_image_input, text, (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 255), 3)
         # print(len(face))
-        if len(face) == 9:
-            faces.append(face)
-            if len(faces) == 5:
-                face_array = np.array(faces)
-                # print('INNNNN')
-                # face_array = np.transpose(face_array)
-                detected_face = stats.mode(face_array)[0]
-                # print(final_face)
-                uf = np.asarray(uf)
-                ff = np.asarray(ff)
-                detected_face = np.asarray(detected_face)
-                #print(np.array_equal(detected_face, tf))
-                #print(np.array_equal(detected_face, ff))
-                faces = []
+        if face is None:
+            voter.skip()
+        elif len(face) == 9:
+            detected_face = voter.add(face, blob_colors["confidence"])
+            if detected_face is not None:
                 if np.array_equal(detected_face, uf) == False and np.array_equal(detected_face, ff) == False and np.array_equal(detected_face, bf) == False and np.array_equal(detected_face, df) == False and np.array_equal(detected_face, lf) == False and np.array_equal(detected_face, rf) == False:
                     return detected_face
-        videoWriter.write(bgr_image_input)
-        cv2.imshow("Output Image", bgr_image_input)
-        key_pressed = cv2.waitKey(1) & 0xFF
-        if key_pressed == 27 or key_pressed == ord('q'):
+        else:
+            voter.miss()
+        if display.show_frame(videoWriter, bgr_image_input):
             break
 
 
-def main():
+def calibrate(video, videoWriter, kmeans=False):
+    # Learn one colour per face from its centre sticker, in scanning order, and finish
+    # with the front face back in view so scanning can start; None if the user quit.
+    # TimeoutError when a face is not learnt within CALIBRATION_TIMEOUT seconds
+    centroids = []
+    samples = []
+    for name in "FUDRLB" + "F":
+        display.notify("face", FACE_PROMPTS[name])
+        centres = []
+        refused = ""
+        face_start = time.perf_counter()
+        while len(centres) < (CALIBRATION_FRAMES if len(centroids) < 6 else 1):
+            if time.perf_counter() - face_start > CALIBRATION_TIMEOUT:
+                raise TimeoutError("no %s face in %g s%s" % (FACE_PROMPTS[name].split()[1].lower(),
+                                                             CALIBRATION_TIMEOUT, refused and ", " + refused))
+            is_ok, bgr_image_input, face, blob_colors = pipeline.read_detected(video, detect_face, schedule)
+            if not is_ok:
+                print("Cannot read video source")
+                sys.exit()
+            if len(blob_colors) == 9:
+                means = np.stack([blob_colors["b"], blob_colors["g"], blob_colors["r"]], axis=-1).astype(float)
+                distances = [np.linalg.norm(means[4] - c) for c in centroids]
+                if len(centroids) == 6:
+                    # back to the front face
+                    if np.argmin(distances) == 0 and distances[0] < CALIBRATION_MIN_DISTANCE:
+                        centres.append(means[4])
+                # a face is new once its centre matches none of the colours learnt so far
+                elif all(distance > CALIBRATION_MIN_DISTANCE for distance in distances):
+                    centres.append(means[4])
+                    samples.append(means)
+                else:
+                    closest = int(np.argmin(distances))
+                    learnt = FACE_PROMPTS["FUDRLB"[closest]].split()[1].lower()
+                    reason = "centre too close to the %s face's colour" % learnt
+                    # the last face is still in view for a while after the prompt
+                    if reason != refused and time.perf_counter() - face_start > FACE_PROMPT_SECONDS:
+                        print("Calibrating: %s refused, %s (%.0f, needs %d)" % (
+                            FACE_PROMPTS[name], reason, distances[closest], CALIBRATION_MIN_DISTANCE))
+                        refused = reason
+            bgr_image_input = cv2.putText(bgr_image_input, "Calibrating: " + FACE_PROMPTS[name], (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 3)
+            if refused:
+                bgr_image_input = cv2.putText(bgr_image_input, refused, (50, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+            if display.show_frame(videoWriter, bgr_image_input):
+                return None
+        if len(centroids) < 6:
+            centroids.append(np.median(centres, axis=0))
+    profile = calibration.ColourProfile(centroids)
+    if kmeans:
+        profile.kmeans(np.concatenate(samples))
+    return profile
+
+
+def show_prompt(video, videoWriter, text):
+    # Show a prompt over the preview for FACE_PROMPT_SECONDS; False if the user quit
+    start_time = datetime.now()
+    while (datetime.now() - start_time).total_seconds() <= FACE_PROMPT_SECONDS:
+        is_ok, bgr_image_input = video.read()
+        if not is_ok:
+            return False
+        bgr_image_input = cv2.putText(bgr_image_input, text, (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 255), 3)
+        if display.show_frame(videoWriter, bgr_image_input):
+            return False
+    return True
+
+
+def rescan_invalid(video, videoWriter, scanned):
+    # Check the scanned faces make a real cube and rescan only the faces holding bad stickers.
+    # scanned maps face name -> detected face and is updated in place; False if the user quit
+    while True:
+        cube = cube_state.from_faces(*(scanned[name] for name in cube_state.FACES))
+        problems = cube_state.validate(cube_state.to_facelet_string(cube))
+        if not problems:
+            return True
+        faces = cube_state.problem_faces(problems)
+        print("Scan problems: %s" % "; ".join(reason for reason, stickers in problems))
+        print("Rescanning faces: %s" % faces)
+        # a rescanned face must keep its centre colour, unless that centre was the problem
+        centres = [int(cube_state.centres(cube)[k]) for k in range(6)]
+        expected = {name: centres[cube_state.FACES.index(name)] for name in faces}
+        for name in faces:
+            if centres.count(expected[name]) > 1:
+                expected[name] = None
+            scanned[name] = [0, 0]
+        for name in faces:
+            if not show_prompt(video, videoWriter, FACE_PROMPTS[name]):
+                return False
+            while True:
+                face = find_face(video, videoWriter, *(scanned[n] for n in cube_state.FACES), text=FACE_PROMPTS[name])
+                if face is None:
+                    return False
+                taken = {int(scanned[n][4]) for n in cube_state.FACES if len(scanned[n]) == 9}
+                if face[4] == expected[name] or (expected[name] is None and int(face[4]) not in taken):
+                    break
+            scanned[name] = face
+
+
+def solve_cube(video, videoWriter, solver_cache, final_str):
+    # Keep the preview running while a deadline-bounded solver has not found a solution yet
+    while True:
+        try:
+            return solver_cache.solve(final_str)
+        except TimeoutError:
+            is_ok, bgr_image_input = video.read()
+            if not is_ok:
+                print("Cannot read video source")
+                sys.exit()
+            bgr_image_input = cv2.putText(bgr_image_input, "Solving...", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 255), 3)
+            if display.show_frame(videoWriter, bgr_image_input):
+                return None
+
+
+def start_solver():
+    # The solver backend (loading its tables in the background) and the solution cache.  Imported
+    # here, on a startup thread, so the first frame does not wait for multiprocessing and sqlite
+    import solution_cache
+    import solver
+    if SOLVE_DEADLINE is not None:
+        backend = solver.DeadlineSolver(SOLVE_DEADLINE, SOLVE_MAX_DEPTH).start()
+    elif SOLVE_ORIENTATIONS:
+        backend = solver.OrientationSolver(deadline=SOLVE_ORIENTATIONS_DEADLINE).start()
+    else:
+        backend = solver.start_warmup()
+    return backend, solution_cache.SolutionCache(SOLUTION_CACHE_PATH, solver=backend.solve)
+
+
+def open_video(video):
+    # (video, camera name, ok, first frame); video None opens the default camera
+    if video is not None:
+        name = getattr(video, "camera_name", None) or type(getattr(video, "camera", video)).__name__
+        return (video, name) + tuple(video.read())
+    camera = capture.open_camera(0, CAPTURE_WIDTH, CAPTURE_HEIGHT, CAPTURE_FPS, CAPTURE_FOURCC, CAPTURE_BUFFER_SIZE)
+    video = capture.FrameGrabber(camera, CAPTURE_RING_SIZE).start()
+    return (video, "camera0") + tuple(video.read())
+
+
+def main(video=None, videoWriter=None):
+    # Runs the session beside the display loop; returns scan_and_solve's timings
+    return display.run(scan_and_solve, video, videoWriter, fps=DISPLAY_FPS)
+
+
+def scan_and_solve(video=None, videoWriter=None):
+    # Returns wall-clock seconds spent in each phase: "scan", "solve" and "guidance"
+    timings = {"calibrate": 0.0, "scan": 0.0, "solve": 0.0, "guidance": 0.0}
+    tracker.reset()
+    schedule.reset()
+    schedule.enabled = SCHEDULE_DETECTION
+    motion_gate.reset()
+    motion_gate.enabled = MOTION_GATE
+    startup_start = time.perf_counter()
+    display.first_frame_time = None
+    # the solver starts and the camera opens side by side, and the writer takes its size from
+    # the first frame it is given, so nothing waits for the camera but the first frame itself
+    startup = ThreadPoolExecutor(3)
+    solver_start = startup.submit(start_solver)
+    camera_start = startup.submit(open_video, video)
+    if video is None:
+        # only worth it while a real camera takes its time to open
+        startup.submit(display.warm_up)
+    startup.shutdown(wait=False)
+    own_writer = videoWriter is None
+    if videoWriter is None:
+        # a path that cannot be written is reported by the writer once it opens the file
+        videoWriter = recorder.AsyncVideoWriter(RECORD_PATH, "MJPG", None, RECORD_FPS,
+                                                RECORD_QUEUE_SIZE, RECORD_POLICY)
+    stickers.use(COLOUR_CLASSIFIER)
     up_face = [0, 0]
     front_face = [0, 0]
     left_face = [0, 0]
     right_face = [0, 0]
     down_face = [0, 0]
     back_face = [0, 0]
-    video = cv2.VideoCapture(0)
-    is_ok, bgr_image_input = video.read()
+    own_video = video is None
+    video, camera_name, is_ok, bgr_image_input = camera_start.result()
+    camera_ready = time.perf_counter()
     broke = 0
     
 
@@ -636,35 +902,64 @@ def main():
     w1 = bgr_image_input.shape[1]
     faces = []
     
-    try:
-        fourcc = cv2.VideoWriter_fourcc('M', 'J', 'P', 'G')
-        fname = "OUTPUT5.avi"
-        fps = 20.0
-        videoWriter = cv2.VideoWriter(fname, fourcc, fps, (w1, h1))
-    except:
-        print("Error: can't create output video: %s" % fname)
-        sys.exit()
+    source = video
+    # sources with read_detected (offline.FrameReplay) come with their stickers already found
+    detected = hasattr(source, "read_detected")
+    if DETECTION_WORKERS != 0 and not detected:
+        import detection_pool
+        settings = {name: globals()[name] for name in
+                    ("DETECTION_HEIGHT", "STICKER_AREA_RANGE", "STICKER_SQUARENESS", "REFERENCE_HEIGHT")}
+        try:
+            video = detection_pool.ParallelDetectionStage(source, bgr_image_input.shape, read_located,
+                                                          DETECTION_WORKERS, PIPELINE_QUEUE_SIZE, settings,
+                                                          gate=gate_frame, schedule=schedule).start()
+        except RuntimeError as e:
+            print("Detection workers failed (%s), detecting on a thread instead" % e)
+    if video is source and PIPELINE and not detected:
+        video = pipeline.DetectionStage(source, detect_face, PIPELINE_QUEUE_SIZE, schedule).start()
+
+    profile_key = None
+    if COLOUR_CALIBRATION:
+        profile_key = calibration.camera_key(camera_name, bgr_image_input.shape)
+        profile = None if CALIBRATE else calibration.load_profile(profile_key)
+        if profile is None:
+            calibrate_start = time.perf_counter()
+            try:
+                profile = calibrate(video, videoWriter, kmeans=CALIBRATION_KMEANS)
+            except TimeoutError as e:
+                print("Colour calibration gave up (%s), using the colour rules instead" % e)
+                profile = stickers.classifier
+                profile_key = None
+            timings["calibrate"] = time.perf_counter() - calibrate_start
+            if profile is None and profile_key is not None:
+                if video is not source:
+                    video.stop()
+                if own_writer:
+                    videoWriter.release()
+                for part in solver_start.result():
+                    part.close()
+                return timings
+            if profile_key is not None:
+                calibration.save_profile(profile_key, profile)
+        else:
+            print("Loaded colour profile for %s" % profile_key)
+        stickers.classifier = profile
     
     while True:
         is_ok, bgr_image_input = video.read()
         if not is_ok:
             break
+        phase_start = time.perf_counter()
         while True:
             #print("Show Front Face")
             front_face = find_face(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face, text="Show Front Face")
-            if front_face is not None and front_face.ndim == 1:
-                front_face = np.reshape(front_face, (1, -1))
-            mf = front_face[0,4]
             print(front_face)
-            print(mf)
             #print("Show Up Face")
             #time.sleep(2)
             up_face = find_face(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face, text="Show Top Face")
-            if up_face is not None and up_face.ndim == 1:
-                up_face = np.reshape(up_face, (1, -1))
             start_time = datetime.now()
             while True:
-                if (datetime.now() - start_time).total_seconds() > 3:
+                if (datetime.now() - start_time).total_seconds() > FACE_PROMPT_SECONDS:
                     break
                 else:
                     is_ok, bgr_image_input = video.read()
@@ -672,25 +967,18 @@ def main():
                         broke = 1
                         break
                     bgr_image_input = cv2.putText(bgr_image_input, "Show Down Face", (50,50), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 255), 3)
-                    videoWriter.write(bgr_image_input)
-                    cv2.imshow("Output Image", bgr_image_input)
-                    key_pressed = cv2.waitKey(1) & 0xFF
-                    if key_pressed == 27 or key_pressed == ord('q'):
+                    if display.show_frame(videoWriter, bgr_image_input):
                         broke = 1
                         break
             if broke == 1:
                 break
-            mu = up_face[0, 4]
             print(up_face)
-            print(mu)
             #print("Show Down Face")
             #time.sleep(2)
             down_face = find_face(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face, text="Show Down Face")
-            if down_face is not None and down_face.ndim == 1:
-                down_face = np.reshape(down_face, (1, -1))
             start_time = datetime.now()
             while True:
-                if (datetime.now() - start_time).total_seconds() > 3:
+                if (datetime.now() - start_time).total_seconds() > FACE_PROMPT_SECONDS:
                     break
                 else:
                     is_ok, bgr_image_input = video.read()
@@ -698,25 +986,18 @@ def main():
                         broke = 1
                         break
                     bgr_image_input = cv2.putText(bgr_image_input, "Show Right Face", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 255), 3)
-                    videoWriter.write(bgr_image_input)
-                    cv2.imshow("Output Image", bgr_image_input)
-                    key_pressed = cv2.waitKey(1) & 0xFF
-                    if key_pressed == 27 or key_pressed == ord('q'):
+                    if display.show_frame(videoWriter, bgr_image_input):
                         broke = 1
                         break
             if broke == 1:
                 break
-            md = down_face[0, 4]
             print(down_face)
-            print(md)
             #print("Show Right Face")
             #time.sleep(2)
             right_face = find_face(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face, text="Show Right Face")
-            if right_face is not None and right_face.ndim == 1:
-                right_face = np.reshape(right_face, (1, -1))
             start_time = datetime.now()
             while True:
-                if (datetime.now() - start_time).total_seconds() > 3:
+                if (datetime.now() - start_time).total_seconds() > FACE_PROMPT_SECONDS:
                     break
                 else:
                     is_ok, bgr_image_input = video.read()
@@ -724,25 +1005,18 @@ def main():
                         broke = 1
                         break
                     bgr_image_input = cv2.putText(bgr_image_input, "Show Left Face", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 255), 3)
-                    videoWriter.write(bgr_image_input)
-                    cv2.imshow("Output Image", bgr_image_input)
-                    key_pressed = cv2.waitKey(1) & 0xFF
-                    if key_pressed == 27 or key_pressed == ord('q'):
+                    if display.show_frame(videoWriter, bgr_image_input):
                         broke = 1
                         break
             if broke == 1:
                 break
-            mr = right_face[0, 4]
             print(right_face)
-            print(mr)
             #print("Show Left Face")
             #time.sleep(2)
             left_face = find_face(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face, text="Show Left Face")
-            if left_face is not None and left_face.ndim == 1:
-                left_face = np.reshape(left_face, (1, -1))
             start_time = datetime.now()
             while True:
-                if (datetime.now() - start_time).total_seconds() > 3:
+                if (datetime.now() - start_time).total_seconds() > FACE_PROMPT_SECONDS:
                     break
                 else:
                     is_ok, bgr_image_input = video.read()
@@ -750,25 +1024,18 @@ def main():
                         broke = 1
                         break
                     bgr_image_input = cv2.putText(bgr_image_input, "Show Back Face", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 255), 3)
-                    videoWriter.write(bgr_image_input)
-                    cv2.imshow("Output Image", bgr_image_input)
-                    key_pressed = cv2.waitKey(1) & 0xFF
-                    if key_pressed == 27 or key_pressed == ord('q'):
+                    if display.show_frame(videoWriter, bgr_image_input):
                         broke = 1
                         break
             if broke == 1:
                 break
-            ml = left_face[0, 4]
             print(left_face)
-            print(ml)
             #print("Show Back Face")
             #time.sleep(2)
             back_face = find_face(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face, text="Show Back Face")
-            if back_face is not None and back_face.ndim == 1:
-                back_face = np.reshape(back_face, (1, -1))
             start_time = datetime.now()
             while True:
-                if (datetime.now() - start_time).total_seconds() > 3:
+                if (datetime.now() - start_time).total_seconds() > FACE_PROMPT_SECONDS:
                     break
                 else:
                     is_ok, bgr_image_input = video.read()
@@ -776,57 +1043,49 @@ def main():
                         broke = 1
                         break
                     bgr_image_input = cv2.putText(bgr_image_input, "Show Front Face", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 255), 3)
-                    videoWriter.write(bgr_image_input)
-                    cv2.imshow("Output Image", bgr_image_input)
-                    key_pressed = cv2.waitKey(1) & 0xFF
-                    if key_pressed == 27 or key_pressed == ord('q'):
+                    if display.show_frame(videoWriter, bgr_image_input):
                         broke = 1
                         break
             if broke == 1:
                 break
-            mb = back_face[0, 4]
             print(back_face)
             #time.sleep(2)
-            print(mb)
-
-            solution = concat(up_face,right_face,front_face,down_face,left_face,back_face)
-            #print(solution)
-            cube_solved = [mu, mu, mu, mu, mu, mu, mu, mu, mu, mr, mr, mr, mr, mr, mr, mr, mr, mr, mf, mf, mf, mf, mf,
-                           mf, mf, mf, mf, md, md, md, md, md, md, md, md, md, ml, ml, ml, ml, ml, ml, ml, ml, ml, mb,
-                           mb, mb, mb, mb, mb, mb, mb, mb]
-            if (concat(up_face, right_face, front_face, down_face, left_face, back_face) == cube_solved).all():
+
+            scanned = {"U": up_face, "R": right_face, "F": front_face, "D": down_face, "L": left_face, "B": back_face}
+            if not rescan_invalid(video, videoWriter, scanned):
+                broke = 1
+                break
+            up_face, right_face, front_face, down_face, left_face, back_face = (scanned[name] for name in cube_state.FACES)
+            cube = cube_state.from_faces(up_face, right_face, front_face, down_face, left_face, back_face)
+            display.notify("scanned", cube_state.to_facelet_string(cube))
+            if cube_state.is_solved(cube):
                 # print("CUBE IS SOLVED")
                 is_ok, bgr_image_input = video.read()
                 bgr_image_input = cv2.putText(bgr_image_input, "CUBE ALREADY SOLVED", (100, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 3)
-                videoWriter.write(bgr_image_input)
-                cv2.imshow("Output Image", bgr_image_input)
-                key_pressed = cv2.waitKey(1) & 0xFF
-                if key_pressed == 27 or key_pressed == ord('q'):
+                if display.show_frame(videoWriter, bgr_image_input):
                     break
-                time.sleep(5)
+                time.sleep(SOLVED_MESSAGE_SECONDS)
                 break
 
-            final_str = ''
-            for val in range(len(solution)):
-                if solution[val] == mf:
-                    final_str = final_str + 'F'
-                elif solution[val] == mr:
-                    final_str = final_str + 'R'
-                elif solution[val] == mb:
-                    final_str = final_str + 'B'
-                elif solution[val] == ml:
-                    final_str = final_str + 'L'
-                elif solution[val] == mu:
-                    final_str = final_str + 'U'
-                elif solution[val] == md:
-                    final_str = final_str + 'D'
+            final_str = cube_state.to_facelet_string(cube)
 
             print(final_str)
+            solve_start = time.perf_counter()
+            timings["scan"] += solve_start - phase_start
+            warmup, solver_cache = solver_start.result()
             try:
-                solved = kociemba.solve(final_str)
+                solved = solve_cube(video, videoWriter, solver_cache, final_str)
+                if solved is None:
+                    broke = 1
+                    break
                 print(solved)
+                display.notify("solution", solved)
+                print("Solver warm-up: %s" % warmup.report())
+                timings["solve"] += time.perf_counter() - solve_start
                 break
             except:
+                timings["solve"] += time.perf_counter() - solve_start
+                phase_start = time.perf_counter()
                 up_face = [0, 0]
                 front_face = [0, 0]
                 left_face = [0, 0]
@@ -836,89 +1095,31 @@ def main():
 
         if broke == 1:
             break
-        steps = solved.split()
+        phase_start = time.perf_counter()
+        # the same steps, at the same costs, that the solver chose the solution by
+        steps, frame = move_compiler.compile_steps(solved, move_compiler.STEP_COSTS)
+        print(" ".join(steps))
+        # the front face is in view when the scan ends
+        rotate.shown_view = "F"
         for step in steps:
-            if step == "R":
-                [up_face, right_face, front_face, down_face, left_face, back_face] = right_cw(video,videoWriter,up_face,right_face,front_face,down_face,left_face,back_face)
-                #print(concat(up_face, right_face, front_face, down_face, left_face, back_face))
-            elif step == "R'":
-                [up_face, right_face, front_face, down_face, left_face, back_face] = right_ccw(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-                #print(concat(up_face, right_face, front_face, down_face, left_face, back_face))
-            elif step == "R2":
-                [up_face, right_face, front_face, down_face, left_face, back_face] = right_cw(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-                [up_face, right_face, front_face, down_face, left_face, back_face] = right_cw(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-                #print(concat(up_face, right_face, front_face, down_face, left_face, back_face))
-            elif step == "L":
-                [up_face, right_face, front_face, down_face, left_face, back_face] = left_cw(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-                #print(concat(up_face, right_face, front_face, down_face, left_face, back_face))
-            elif step == "L'":
-                [up_face, right_face, front_face, down_face, left_face, back_face] = left_ccw(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-                #print(concat(up_face, right_face, front_face, down_face, left_face, back_face))
-            elif step == "L2":
-                [up_face, right_face, front_face, down_face, left_face, back_face] = left_cw(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-                [up_face, right_face, front_face, down_face, left_face, back_face] = left_cw(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-                #print(concat(up_face, right_face, front_face, down_face, left_face, back_face))
-            elif step == "F":
-                [up_face, right_face, front_face, down_face, left_face, back_face] = front_cw(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-                #print(concat(up_face, right_face, front_face, down_face, left_face, back_face))
-            elif step == "F'":
-                [up_face, right_face, front_face, down_face, left_face, back_face] = front_ccw(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-                #print(concat(up_face, right_face, front_face, down_face, left_face, back_face))
-            elif step == "F2":
-                [up_face, right_face, front_face, down_face, left_face, back_face] = front_cw(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-                [up_face, right_face, front_face, down_face, left_face, back_face] = front_cw(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-                #print(concat(up_face, right_face, front_face, down_face, left_face, back_face))
-            elif step == "B":
-                [up_face, right_face, front_face, down_face, left_face, back_face] = turn_to_right(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-                [up_face, right_face, front_face, down_face, left_face, back_face] = right_cw(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-                [up_face, right_face, front_face, down_face, left_face, back_face] = turn_to_front(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-                #print(concat(up_face, right_face, front_face, down_face, left_face, back_face))
-            elif step == "B'":
-                #print(up_face, right_face, front_face, down_face, left_face, back_face)
-                [up_face, right_face, front_face, down_face, left_face, back_face] = turn_to_right(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-                [up_face, right_face, front_face, down_face, left_face, back_face] = right_ccw(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-                [up_face, right_face, front_face, down_face, left_face, back_face] = turn_to_front(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-            elif step == "B2":
-                [up_face, right_face, front_face, down_face, left_face, back_face] = turn_to_right(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-                [up_face, right_face, front_face, down_face, left_face, back_face] = right_cw(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-                [up_face, right_face, front_face, down_face, left_face, back_face] = right_cw(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-                [up_face, right_face, front_face, down_face, left_face, back_face] = turn_to_front(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-                #print(concat(up_face, right_face, front_face, down_face, left_face, back_face))
-            elif step == "U":
-                [up_face, right_face, front_face, down_face, left_face, back_face] = up_cw(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-                #print(concat(up_face, right_face, front_face, down_face, left_face, back_face))
-            elif step == "U'":
-                [up_face, right_face, front_face, down_face, left_face, back_face] = up_ccw(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-                #print(concat(up_face, right_face, front_face, down_face, left_face, back_face))
-            elif step == "U2":
-                [up_face, right_face, front_face, down_face, left_face, back_face] = up_cw(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-                [up_face, right_face, front_face, down_face, left_face, back_face] = up_cw(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-                #print(concat(up_face, right_face, front_face, down_face, left_face, back_face))
-            elif step == "D":
-                [up_face, right_face, front_face, down_face, left_face, back_face] = down_cw(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-                #print(concat(up_face, right_face, front_face, down_face, left_face, back_face))
-            elif step == "D'":
-                [up_face, right_face, front_face, down_face, left_face, back_face] = down_ccw(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-                #print(concat(up_face, right_face, front_face, down_face, left_face, back_face))
-            elif step == "D2":
-                [up_face, right_face, front_face, down_face, left_face, back_face] = down_cw(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-                [up_face, right_face, front_face, down_face, left_face, back_face] = down_cw(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-                #print(concat(up_face, right_face, front_face, down_face, left_face, back_face))
-
-        cube_solved = [mu, mu, mu, mu, mu, mu, mu, mu, mu, mr, mr, mr, mr, mr, mr, mr, mr, mr, mf, mf, mf, mf, mf, mf, mf, mf, mf, md, md, md, md, md, md, md, md, md, ml, ml, ml, ml, ml, ml, ml, ml, ml, mb, mb, mb, mb, mb, mb, mb, mb, mb]
-        if (concat(up_face, right_face, front_face, down_face, left_face, back_face) == cube_solved).all():
+            cube = STEP_MOVES[step](video, videoWriter, cube)
+            if cube is None:
+                broke = 1
+                break
+        timings["guidance"] += time.perf_counter() - phase_start
+        if broke == 1:
+            break
+
+        if cube_state.is_solved(cube):
             #print("CUBE IS SOLVED")
             is_ok, bgr_image_input = video.read()
             bgr_image_input = cv2.putText(bgr_image_input, "CUBE SOLVED", (100, 50), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 255), 3)
 
-            videoWriter.write(bgr_image_input)
-            cv2.imshow("Output Image", bgr_image_input)
-            key_pressed = cv2.waitKey(1) & 0xFF
-            if key_pressed == 27 or key_pressed == ord('q'):
+            if display.show_frame(videoWriter, bgr_image_input):
                 break
             start_time = datetime.now()
             while True:
-                if (datetime.now() - start_time).total_seconds() > 5:
+                if (datetime.now() - start_time).total_seconds() > SOLVED_MESSAGE_SECONDS:
                     break
                 else:
                     is_ok, bgr_image_input = video.read()
@@ -926,10 +1127,7 @@ def main():
                         broke = 1
                         break
                     bgr_image_input = cv2.putText(bgr_image_input, "CUBE SOLVED", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 255), 3)
-                    videoWriter.write(bgr_image_input)
-                    cv2.imshow("Output Image", bgr_image_input)
-                    key_pressed = cv2.waitKey(1) & 0xFF
-                    if key_pressed == 27 or key_pressed == ord('q'):
+                    if display.show_frame(videoWriter, bgr_image_input):
                         broke = 1
                         break
             if broke == 1:
@@ -938,14 +1136,39 @@ def main():
         #print(front_face)
         #print(up_face)
 
-        videoWriter.write(bgr_image_input)
-        cv2.imshow("Output Image", bgr_image_input)
         # print(count)
         # print(blob_color)
         # print(face)
-        key_pressed = cv2.waitKey(1) & 0xFF
-        if key_pressed == 27 or key_pressed == ord('q'):
+        if display.show_frame(videoWriter, bgr_image_input):
             break
+    # the solver backend, and the solution cache, which writes when its entries were last used
+    for part in solver_start.result():
+        part.close()
+    if profile_key is not None:
+        calibration.save_profile(profile_key, stickers.classifier)
+    first_frame = display.first_frame_time
+    print("Startup: imports %.0f ms, camera ready after %.0f ms, first frame shown after %s" % (
+        IMPORT_SECONDS * 1000, (camera_ready - startup_start) * 1000,
+        "-" if first_frame is None else "%.0f ms" % ((first_frame - startup_start) * 1000)))
+    if tracker.stats["frames"]:
+        # detection workers track faces in their own processes
+        print("Face tracking: %s" % tracker.report())
+    if schedule.stats["frames"]:
+        print("Detection schedule: %s" % schedule.report())
+    if motion_gate.stats["frames"]:
+        print("Motion gate: %s" % motion_gate.report())
+    if isinstance(source, capture.FrameGrabber):
+        print("Capture: %s" % source.report())
+    if video is not source:
+        video.stop()
+        print("Pipeline: %s" % video.report())
+    if isinstance(videoWriter, recorder.AsyncVideoWriter):
+        if own_writer:
+            videoWriter.release()
+        print("Recording: %s" % videoWriter.report())
+    if own_video:
+        source.release()
+    return timings
 
 
 if __name__ == "__main__":
@@ -0,0 +1,60 @@
+"""Motion gating for detect_face.
+
+While the cube is being turned, frames almost never show nine stickers, so
+detection is skipped until the scene settles.  Every frame is shrunk by taking
+every n-th pixel (about ``size`` pixels wide, so it costs a tenth of a
+millisecond at any resolution), and the mean absolute difference from the
+previous frame is measured inside the last box the cube was seen in (kept
+after the face tracker gives up on it), or over the whole frame before the
+cube has been found.  Above ``threshold`` grey levels the frame counts as
+moving; detection resumes after ``settle`` still frames.
+"""
+import cv2
+
+
+class MotionGate:
+    def __init__(self, threshold=15.0, size=80, settle=1, enabled=True):
+        self.threshold = threshold
+        self.size = size
+        self.settle = settle
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        self.previous = None
+        self.box = None
+        self.still = self.settle
+        self.stats = {"frames": 0, "processed": 0, "skipped": 0, "motion": 0.0}
+
+    def _shrink(self, frame):
+        step = max(1, frame.shape[1] // self.size)
+        small = cv2.cvtColor(frame[::step, ::step], cv2.COLOR_BGR2GRAY)
+        # averages out pixel noise and the odd pixel the subsampling lands on
+        return cv2.blur(small, (3, 3)), step
+
+    def check(self, frame, box=None):
+        """Whether ``frame`` is still enough to run detection on; box is (x0, y0, x1, y1) in frame pixels."""
+        self.stats["frames"] += 1
+        if not self.enabled:
+            self.stats["processed"] += 1
+            return True
+        small, step = self._shrink(frame)
+        previous, self.previous = self.previous, small
+        box = self.box = box if box is not None else self.box
+        if previous is not None and previous.shape == small.shape:
+            difference = cv2.absdiff(small, previous)
+            if box is not None:
+                x0, y0, x1, y1 = (max(0, v // step) for v in box)
+                difference = difference[y0:y1 + 1, x0:x1 + 1]
+            motion = float(difference.mean()) if difference.size else 0.0
+            self.stats["motion"] = motion
+            self.still = 0 if motion > self.threshold else self.still + 1
+        if self.still < self.settle:
+            self.stats["skipped"] += 1
+            return False
+        self.stats["processed"] += 1
+        return True
+
+    def report(self):
+        return "processed %d of %d frames, skipped %d while moving" % (
+            self.stats["processed"], self.stats["frames"], self.stats["skipped"])
@@ -0,0 +1,106 @@
+"""Turn a kociemba solution into the physical steps main() guides the user through.
+
+Every face turn is one verified step (B is checked on the top face), and so are
+the whole-cube rotations y (turn_to_right) and y' (turn_to_front).  When B turns
+are made expensive, or unavailable with back_cost=None, they are reached by
+rotating the cube instead: the cube stays turned until a later move needs a
+different orientation, and the orientations are chosen over the whole sequence
+to keep the total cost as low as possible.  Half turns stay single steps.
+"""
+import cube_state
+
+SIDE_FACES = "FRBL"
+OPPOSITE = {"U": "D", "D": "U", "R": "L", "L": "R", "F": "B", "B": "F"}
+SUFFIX = {1: "", 2: "2", 3: "'"}
+ROTATION_STEPS = {0: [], 1: ["y"], 2: ["y", "y"], 3: ["y'"]}
+
+# Relative time main() spends on each kind of step: a half turn is two quarter turns of the
+# hand, B is turned blind and checked on the top face, y/y' turn the whole cube
+STEP_COSTS = {"quarter": 1.0, "half": 1.6, "back": 0.5, "rotation": 1.0}
+
+
+def quarter_turns(move):
+    return {"": 1, "2": 2, "'": 3}[move[1:]]
+
+
+def normalise(moves):
+    """Merge and cancel turns of the same face, including across turns of the opposite face."""
+    stack = []
+    for move in cube_state.parse(moves):
+        face, turns = move[0], quarter_turns(move)
+        i = len(stack) - 1
+        while i >= 0 and stack[i][0] == OPPOSITE[face]:
+            i -= 1
+        if i >= 0 and stack[i][0] == face:
+            turns = (stack[i][1] + turns) % 4
+            if turns:
+                stack[i] = (face, turns)
+            else:
+                del stack[i]
+        else:
+            stack.append((face, turns))
+    return [face + SUFFIX[turns] for face, turns in stack]
+
+
+def face_in_frame(face, frame):
+    # where a face of the scanned orientation sits after `frame` y rotations
+    if face not in SIDE_FACES:
+        return face
+    return SIDE_FACES[(SIDE_FACES.index(face) - frame) % 4]
+
+
+def compile_solution(solution, rotation_cost=1, move_cost=1, back_cost=1):
+    """Physical steps (face turns relative to the current view, "y" and "y'") for a solution.
+
+    Returns (steps, frame) where frame is the number of y rotations the cube ends up
+    turned by, so applying the steps to the scanned state gives the solution's result
+    followed by that many y rotations.
+    """
+    moves = normalise(solution)
+    inf = float("inf")
+    # cost[k] / path[k]: cheapest way to reach the current point facing frame k
+    cost = [0, inf, inf, inf]
+    path = [[], None, None, None]
+    for move in moves:
+        new_cost = [inf] * 4
+        new_path = [None] * 4
+        for k in range(4):
+            if cost[k] == inf:
+                continue
+            for d in range(4):
+                frame = (k + d) % 4
+                face = face_in_frame(move[0], frame)
+                step_cost = move_cost
+                if face == "B":
+                    if back_cost is None:
+                        continue
+                    step_cost = back_cost
+                rotations = ROTATION_STEPS[d]
+                total = cost[k] + rotation_cost * len(rotations) + step_cost
+                if total < new_cost[frame]:
+                    new_cost[frame] = total
+                    new_path[frame] = path[k] + rotations + [face + move[1:]]
+        cost, path = new_cost, new_path
+    frame = min(range(4), key=lambda k: cost[k])
+    return path[frame], frame
+
+
+def step_cost(step, costs=STEP_COSTS):
+    if step[0] == "y":
+        return costs["rotation"]
+    cost = costs["half"] if step.endswith("2") else costs["quarter"]
+    if step[0] == "B":
+        cost += costs["back"]
+    return cost
+
+
+def compile_steps(solution, costs=STEP_COSTS):
+    """compile_solution charging rotations, turns and B turns as in ``costs``; what main() guides."""
+    return compile_solution(solution, rotation_cost=costs["rotation"], move_cost=costs["quarter"],
+                            back_cost=costs["quarter"] + costs["back"])
+
+
+def guidance_cost(solution, costs=STEP_COSTS):
+    """(cost, steps) of guiding the user through a solution, using the costs in ``costs``."""
+    steps, frame = compile_steps(solution, costs)
+    return sum(step_cost(step, costs) for step in steps), steps
@@ -0,0 +1,291 @@
+"""Headless analysis of recorded sessions (OUTPUT5.avi or any .avi/.mp4 of a cube).
+
+The video is cut into chunks of ``chunk_frames`` frames that worker processes
+decode and find the stickers in (main.locate_stickers) as fast as the decoder
+allows, each with its own face tracker, leaving out the outlines the app drew
+around the stickers in its recording.  The blobs are then replayed in frame
+order through main.main() by FrameReplay, so the scan, solve and move
+verification logic runs exactly as it did live, classifying the stickers with
+the same colour profile, with no window and no waiting on prompts.  The report
+has every frame's stickers and colours, the cube states the app inferred, the
+solution and when each move was asked for and seen done.
+
+    python offline.py OUTPUT5.avi --workers 4 --output session.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+import calibration
+import display
+import main
+import stickers
+
+CHUNK_FRAMES = 300
+
+# main.py settings the detection workers need to find stickers the way this process would
+DETECTION_SETTINGS = ("DETECTION_HEIGHT", "STICKER_AREA_RANGE", "STICKER_SQUARENESS", "REFERENCE_HEIGHT")
+
+
+def video_info(path):
+    # (frame count, fps, frame shape); the count is the container's estimate and may be 0
+    video = cv2.VideoCapture(path)
+    is_ok, frame = video.read()
+    info = int(video.get(cv2.CAP_PROP_FRAME_COUNT)), video.get(cv2.CAP_PROP_FPS), None if frame is None else frame.shape
+    video.release()
+    if not is_ok:
+        raise ValueError("Cannot read video: %s" % path)
+    return info
+
+
+def strip_outlines(frame, blob_colors):
+    """Blobs of a recorded frame without the outlines the app drew around the stickers.
+
+    An outline is found as one or two more squares around its sticker, so only the innermost
+    square of each nested group is kept, and its colour is read again from the middle half of
+    the square, clear of the outline.
+    """
+    if len(blob_colors) <= 9:
+        kept = blob_colors
+    else:
+        x, y, w, h = (blob_colors[field].astype(float) for field in ("x", "y", "w", "h"))
+        cx, cy = x + w / 2, y + h / 2
+        area = w * h
+        # inside[i, j]: the centre of square j lies within square i
+        inside = (cx >= x[:, None]) & (cx <= (x + w)[:, None]) & (cy >= y[:, None]) & (cy <= (y + h)[:, None])
+        order = np.arange(len(area))
+        smaller = (area < area[:, None]) | ((area == area[:, None]) & (order < order[:, None]))
+        kept = blob_colors[~(inside & smaller).any(axis=1)]
+    if len(kept):
+        rects = np.stack([kept["x"] + kept["w"] // 4, kept["y"] + kept["h"] // 4,
+                          np.maximum(1, kept["w"] // 2), np.maximum(1, kept["h"] // 2)], axis=-1)
+        middle = stickers.sample(frame, rects)
+        for channel in ("b", "g", "r"):
+            kept[channel] = middle[channel]
+    return kept
+
+
+def _detect_chunk(path, start, stop, settings):
+    # (frame times, blobs per frame, seconds) for frames start..stop (to the end when stop is None)
+    for name, value in settings.items():
+        setattr(main, name, value)
+    main.tracker.reset()
+    began = time.perf_counter()
+    video = cv2.VideoCapture(path)
+    if start and not (video.set(cv2.CAP_PROP_POS_FRAMES, start)
+                      and int(video.get(cv2.CAP_PROP_POS_FRAMES)) == start):
+        # containers that cannot seek are read up to the chunk instead
+        video.release()
+        video = cv2.VideoCapture(path)
+        for _ in range(start):
+            video.grab()
+    times = []
+    blobs = []
+    while stop is None or start + len(blobs) < stop:
+        is_ok, frame = video.read()
+        if not is_ok:
+            break
+        times.append(video.get(cv2.CAP_PROP_POS_MSEC) / 1000)
+        # sample the colours before locate_stickers draws its own outlines over the frame
+        clean = frame.copy()
+        blobs.append(strip_outlines(clean, main.locate_stickers(frame)))
+    video.release()
+    return times, blobs, time.perf_counter() - began
+
+
+def detect_video(path, workers=None, chunk_frames=CHUNK_FRAMES, frames=None):
+    """Stickers found in every frame of ``path``: (frame times, blobs per frame, stats)."""
+    if frames is None:
+        frames = video_info(path)[0]
+    settings = {name: getattr(main, name) for name in DETECTION_SETTINGS}
+    starts = list(range(0, max(frames, 1), chunk_frames))
+    # the last chunk runs to the end, in case the container's frame count is short
+    chunks = [(path, start, start + chunk_frames if i + 1 < len(starts) else None, settings)
+              for i, start in enumerate(starts)]
+    workers = min(workers or os.cpu_count() or 1, len(chunks))
+    began = time.perf_counter()
+    if workers == 1:
+        results = [_detect_chunk(*chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = list(pool.map(_detect_chunk, *zip(*chunks)))
+    elapsed = time.perf_counter() - began
+    times = [t for result in results for t in result[0]]
+    blobs = [b for result in results for b in result[1]]
+    stats = {"chunks": len(chunks), "workers": workers, "frames": len(blobs), "seconds": elapsed,
+             "fps": len(blobs) / max(elapsed, 1e-9), "busy": sum(result[2] for result in results)}
+    return times, blobs, stats
+
+
+class FrameReplay:
+    """A video source for main.main() that hands out blobs found beforehand, one frame at a time.
+
+    Frames are blank (the loops only draw on them), so only the stickers drive the session.
+    """
+    def __init__(self, blobs, shape, camera_name="camera0"):
+        self.blobs = blobs
+        self.camera_name = camera_name
+        self.frame = np.zeros(shape, dtype=np.uint8)
+        self.position = -1
+        self.faces = [None] * len(blobs)
+
+    def read_detected(self):
+        if self.position + 1 >= len(self.blobs):
+            return False, None, [], []
+        self.position += 1
+        face, blob_colors = main.read_face(self.blobs[self.position].copy())
+        if len(face) == 9:
+            self.faces[self.position] = [int(colour) for colour in face]
+        return True, self.frame, face, blob_colors
+
+    def read(self):
+        is_ok, frame, _, _ = self.read_detected()
+        return is_ok, frame
+
+    def isOpened(self):
+        return self.position + 1 < len(self.blobs)
+
+    def release(self):
+        pass
+
+    def classify_rest(self):
+        # colours of the frames the session never got to, without refining the profile
+        for index in range(self.position + 1, len(self.blobs)):
+            if len(self.blobs[index]) == 9:
+                face = stickers.classify(self.blobs[index])
+                if np.count_nonzero(face) == 9:
+                    self.faces[index] = [int(colour) for colour in face]
+
+
+class NullWriter:
+    def write(self, frame):
+        pass
+
+    def release(self):
+        pass
+
+
+def _is_solved(facelets):
+    return all(len(set(facelets[i:i + 9])) == 1 for i in range(0, 54, 9))
+
+
+def analyse(path, workers=None, chunk_frames=CHUNK_FRAMES, camera_name="camera0", profiles=None, recalibrate=False):
+    """Run the scan-and-verify session recorded in ``path`` headless and return a JSON-ready report.
+
+    Colours come from the ``camera_name`` profile in ``profiles`` (calibration.PROFILE_PATH by
+    default), or are calibrated from the video when there is none or ``recalibrate`` is set; the
+    profile file itself is left untouched.
+    """
+    began = time.perf_counter()
+    frames, fps, shape = video_info(path)
+    times, blobs, detection = detect_video(path, workers, chunk_frames, frames)
+    fps = fps if fps > 0 else 30.0
+    # some backends report no timestamps; fall back to the nominal frame rate
+    if not any(times):
+        times = [index / fps for index in range(len(blobs))]
+
+    replay = FrameReplay(blobs, shape, camera_name)
+    events = []
+    listener = lambda event, value: events.append((max(replay.position, 0), event, value))
+    profiles = profiles or calibration.PROFILE_PATH
+    saved = (display.headless, main.FACE_PROMPT_SECONDS, main.SOLVED_MESSAGE_SECONDS, main.CALIBRATE,
+             calibration.PROFILE_PATH, main.SOLUTION_CACHE_PATH)
+    replay_start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as scratch:
+        calibration.PROFILE_PATH = os.path.join(scratch, "colour_profiles.json")
+        if os.path.exists(profiles):
+            shutil.copy(profiles, calibration.PROFILE_PATH)
+        # the replay solves afresh, without reading or filling the live app's solution cache
+        main.SOLUTION_CACHE_PATH = None
+        display.headless = True
+        main.FACE_PROMPT_SECONDS = 0
+        main.SOLVED_MESSAGE_SECONDS = 0
+        main.CALIBRATE = recalibrate
+        display.listeners.append(listener)
+        try:
+            main.main(video=replay, videoWriter=NullWriter())
+            completed = True
+        except SystemExit:
+            # the video ended before the session did
+            completed = False
+        finally:
+            display.listeners.remove(listener)
+            (display.headless, main.FACE_PROMPT_SECONDS, main.SOLVED_MESSAGE_SECONDS, main.CALIBRATE,
+             calibration.PROFILE_PATH, main.SOLUTION_CACHE_PATH) = saved
+        replay.classify_rest()
+    replay_seconds = time.perf_counter() - replay_start
+
+    def at(frame):
+        return {"frame": frame, "time": round(times[frame], 3) if frame < len(times) else None}
+
+    prompts, states, moves = [], [], []
+    solution = None
+    for frame, event, value in events:
+        if event == "face":
+            prompts.append(dict(at(frame), prompt=value))
+        elif event == "scanned":
+            states.append(dict(at(frame), after="scan", cube=value))
+        elif event == "solution":
+            solution = value
+        elif event == "move":
+            moves.append({"move": value[0], "view": value[1], "asked": at(frame), "made": None})
+        elif event == "moved":
+            states.append(dict(at(frame), after=value[0], cube=value[1]))
+            if moves and moves[-1]["made"] is None:
+                moves[-1]["made"] = at(frame)
+    detections = [dict(at(index), stickers=len(blob_colors), face=face)
+                  for index, (blob_colors, face) in enumerate(zip(blobs, replay.faces))]
+    return {
+        "video": path,
+        "frames": len(blobs),
+        "fps": fps,
+        "completed": completed,
+        "solved": bool(states) and _is_solved(states[-1]["cube"]),
+        "frames_replayed": replay.position + 1,
+        "solution": solution,
+        "prompts": prompts,
+        "states": states,
+        "moves": moves,
+        "detections": detections,
+        "detection": detection,
+        "replay_seconds": replay_seconds,
+        "total_seconds": time.perf_counter() - began,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse recorded scan-and-solve sessions headless.")
+    parser.add_argument("videos", nargs="+", help=".avi/.mp4 files, such as OUTPUT5.avi")
+    parser.add_argument("--workers", type=int, help="detection processes (default one per core)")
+    parser.add_argument("--chunk-frames", type=int, default=CHUNK_FRAMES, help="frames per worker chunk")
+    parser.add_argument("--camera", default="camera0", help="camera whose colour profile to use")
+    parser.add_argument("--profiles", help="colour profile file (default %s)" % calibration.PROFILE_PATH)
+    parser.add_argument("--calibrate", action="store_true", help="learn the colours from the video's calibration")
+    parser.add_argument("--output", help="write the JSON report here instead of printing it")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    reports = [analyse(path, args.workers, args.chunk_frames, args.camera, args.profiles, args.calibrate)
+               for path in args.videos]
+    for report in reports:
+        print("%s: %d frames detected at %.1f fps by %d workers, replayed %d frames in %.2f s, %s" % (
+            report["video"], report["frames"], report["detection"]["fps"], report["detection"]["workers"],
+            report["frames_replayed"], report["replay_seconds"], "solved" if report["solved"] else "not solved"))
+    text = json.dumps(reports if len(reports) > 1 else reports[0], indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(text)
+    else:
+        print(text)
+    sys.exit(0 if all(report["solved"] for report in reports) else 1)
@@ -0,0 +1,121 @@
+"""Staged capture -> detect -> vote -> render pipeline.
+
+Capture runs on capture.FrameGrabber's thread and detection on a
+DetectionStage thread, which puts (frame, face, blobs) into a small bounded
+queue.  The scanning and guiding loops consume that queue on the app thread
+and do the voting, and display.show_frame hands their annotated frames to the
+render loop, which shows the newest one at a fixed rate (see display.run).
+When the queue is full the detection thread waits, so a slow consumer never
+leaves it working on frames nobody will look at.
+
+Loops read through read_detected(), which also works on a plain camera by
+detecting inline, so the same code runs with or without the pipeline.  Given a
+scheduler.DetectionScheduler, frames it skips come back with face None.
+"""
+import threading
+import time
+from collections import deque
+
+
+def read_detected(video, detect, schedule=None):
+    """(ok, frame, face, blobs) for the next frame, from a detection stage or by detecting inline."""
+    if hasattr(video, "read_detected"):
+        return video.read_detected()
+    is_ok, frame = video.read()
+    if not is_ok:
+        return False, frame, [], []
+    face, blobs = detect_scheduled(frame, detect, schedule)
+    return True, frame, face, blobs
+
+
+def detect_scheduled(frame, detect, schedule=None):
+    # (None, []) for a frame the schedule skips
+    if schedule is None:
+        return detect(frame)
+    if not schedule.due():
+        return None, []
+    start = time.perf_counter()
+    result = detect(frame, schedule.height)
+    schedule.record(time.perf_counter() - start)
+    return result
+
+
+class DetectionStage:
+    def __init__(self, video, detect, queue_size=2, schedule=None, timeout=2.0):
+        self.video = video
+        self.detect = detect
+        self.schedule = schedule
+        self.queue = deque()
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.exhausted = False
+        self.started = None
+        self.stats = {"detected": 0, "consumed": 0, "busy": 0.0, "blocked": 0.0, "waited": 0.0,
+                      "backlog": 0, "max_backlog": 0}
+        self.thread = threading.Thread(target=self._run, name="detection", daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.thread.start()
+        return self
+
+    def _run(self):
+        while not self.stopped:
+            is_ok, frame = self.video.read()
+            if not is_ok:
+                break
+            start = time.perf_counter()
+            face, blobs = detect_scheduled(frame, self.detect, self.schedule)
+            self.stats["busy"] += time.perf_counter() - start
+            with self.condition:
+                start = time.perf_counter()
+                self.condition.wait_for(lambda: len(self.queue) < self.queue_size or self.stopped)
+                self.stats["blocked"] += time.perf_counter() - start
+                if self.stopped:
+                    break
+                self.queue.append((frame, face, blobs))
+                self.stats["detected"] += 1
+                self.stats["backlog"] += len(self.queue)
+                self.stats["max_backlog"] = max(self.stats["max_backlog"], len(self.queue))
+                self.condition.notify_all()
+        with self.condition:
+            self.exhausted = True
+            self.condition.notify_all()
+
+    def read_detected(self):
+        with self.condition:
+            start = time.perf_counter()
+            self.condition.wait_for(lambda: self.queue or self.exhausted, self.timeout)
+            self.stats["waited"] += time.perf_counter() - start
+            if not self.queue:
+                return False, None, [], []
+            frame, face, blobs = self.queue.popleft()
+            self.stats["consumed"] += 1
+            self.condition.notify_all()
+        return True, frame, face, blobs
+
+    def read(self):
+        is_ok, frame, _, _ = self.read_detected()
+        return is_ok, frame
+
+    def isOpened(self):
+        return not self.exhausted
+
+    def report(self):
+        elapsed = max(1e-9, time.perf_counter() - self.started)
+        detected = max(1, self.stats["detected"])
+        return ("detect %d frames at %.1f fps, busy %.0f%%, waiting on vote %.0f%%, mean backlog %.2f (max %d); "
+                "vote %d frames at %.1f fps, waiting on detect %.0f%%") % (
+            self.stats["detected"], self.stats["detected"] / elapsed, 100 * self.stats["busy"] / elapsed,
+            100 * self.stats["blocked"] / elapsed, self.stats["backlog"] / detected, self.stats["max_backlog"],
+            self.stats["consumed"], self.stats["consumed"] / elapsed, 100 * self.stats["waited"] / elapsed)
+
+    def stop(self):
+        # stops detecting; the video itself belongs to the caller
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        if self.thread.is_alive():
+            self.thread.join(self.timeout)
@@ -0,0 +1,130 @@
+"""Background video recording with a bounded queue.
+
+AsyncVideoWriter has cv2.VideoWriter's write/release, but write() only queues
+the frame; a worker thread does the encoding.  When the queue is full the
+overflow policy decides what happens: "block" waits for room, "drop_oldest"
+discards the oldest queued frame and "drop_newest" discards the new one.  The
+file's frame rate is measured from the timestamps of the first frames unless
+a fixed fps is given, and without a frame_size the first frame's size is used,
+so the writer can be created before the camera has delivered anything.
+Because of that the file is only opened on the worker thread; if it cannot be,
+the error is printed, kept in ``error`` and shown by report(), and frames are
+counted as failed instead of written.
+"""
+import threading
+import time
+from collections import deque
+
+import cv2
+
+POLICIES = ("block", "drop_oldest", "drop_newest")
+
+
+class AsyncVideoWriter:
+    def __init__(self, path, fourcc, frame_size=None, fps=None, queue_size=32, policy="drop_oldest", fps_frames=30):
+        if policy not in POLICIES:
+            raise ValueError("unknown overflow policy: %s" % policy)
+        self.path = path
+        self.fourcc = fourcc
+        self.frame_size = frame_size
+        self.fps = fps
+        self.fps_frames = fps_frames
+        self.queue = deque()
+        self.queue_size = queue_size
+        self.policy = policy
+        self.condition = threading.Condition()
+        self.closed = False
+        self.writer = None
+        self.error = None
+        self.stats = {"queued": 0, "written": 0, "failed": 0, "dropped": 0, "max_depth": 0, "blocked": 0.0}
+        self.thread = threading.Thread(target=self._run, name="video-writer", daemon=True)
+        self.thread.start()
+
+    def write(self, frame, timestamp=None):
+        timestamp = time.perf_counter() if timestamp is None else timestamp
+        with self.condition:
+            if self.closed:
+                return
+            if self.error:
+                self.stats["failed"] += 1
+                return
+            if len(self.queue) >= self.queue_size:
+                if self.policy == "drop_newest":
+                    self.stats["dropped"] += 1
+                    return
+                if self.policy == "drop_oldest":
+                    self.queue.popleft()
+                    self.stats["dropped"] += 1
+                else:
+                    start = time.perf_counter()
+                    self.condition.wait_for(lambda: len(self.queue) < self.queue_size or self.closed)
+                    self.stats["blocked"] += time.perf_counter() - start
+            self.queue.append((timestamp, frame))
+            self.stats["queued"] += 1
+            self.stats["max_depth"] = max(self.stats["max_depth"], len(self.queue))
+            self.condition.notify_all()
+
+    def depth(self):
+        with self.condition:
+            return len(self.queue)
+
+    def _open(self, timestamps, frame):
+        if self.frame_size is None:
+            self.frame_size = (frame.shape[1], frame.shape[0])
+        fps = self.fps
+        if fps is None:
+            elapsed = timestamps[-1] - timestamps[0]
+            fps = (len(timestamps) - 1) / elapsed if len(timestamps) > 1 and elapsed > 0 else 20.0
+            self.fps = fps
+        self.writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self.fourcc), fps, self.frame_size)
+        if not self.writer.isOpened():
+            self.error = "can't create output video: %s" % self.path
+            print("Error: %s" % self.error)
+
+    def _write(self, frames):
+        if self.error:
+            self.stats["failed"] += len(frames)
+            return
+        for frame in frames:
+            self.writer.write(frame)
+        self.stats["written"] += len(frames)
+
+    def _run(self):
+        # hold the first frames back until there are enough timestamps to measure the frame rate
+        pending = []
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.queue or self.closed)
+                if not self.queue and self.closed:
+                    break
+                timestamp, frame = self.queue.popleft()
+                self.condition.notify_all()
+            if self.writer is None:
+                pending.append((timestamp, frame))
+                if self.fps is None and len(pending) < self.fps_frames:
+                    continue
+                self._open([t for t, _ in pending], pending[0][1])
+                self._write([held for _, held in pending])
+                pending = []
+                continue
+            self._write([frame])
+        if pending:
+            self._open([t for t, _ in pending], pending[0][1])
+            self._write([held for _, held in pending])
+        if self.writer is not None:
+            self.writer.release()
+
+    def report(self):
+        with self.condition:
+            depth = len(self.queue)
+        if self.error:
+            return "%s, %d frames not recorded" % (self.error, self.stats["failed"])
+        return "%s at %.1f fps: written %d, dropped %d, queue %d (max %d), blocked %.0f ms" % (
+            self.path, self.fps or 0.0, self.stats["written"], self.stats["dropped"], depth,
+            self.stats["max_depth"], self.stats["blocked"] * 1000)
+
+    def release(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
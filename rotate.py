@@ -1,870 +1,209 @@
 import sys
 import numpy as np
 import cv2
-from scipy import stats
+
+import cube_state
+import display
+import pipeline
+import voting
+
+# main's detect_face and detection schedule, set by main when it is imported
+detect_face = None
+schedule = None
+
+# The face the user was last asked to hold up to the camera; main sets it back to "F" before guiding
+shown_view = "F"
+VIEW_PROMPTS = {"F": "Show Front Face", "U": "Show Top Face"}
+
+# Overlay arrows are ((sticker, x fraction, y fraction), (sticker, x fraction, y fraction)) pairs,
+# stickers numbered 0-8 row by row on the visible face, fractions of the sticker's bounding box.
+def straight(start, end):
+    return ((start, 0.5, 0.5), (end, 0.5, 0.5))
+
+R_CW_ARROWS = [straight(8, 2)]
+R_CCW_ARROWS = [straight(2, 8)]
+L_CW_ARROWS = [straight(0, 6)]
+L_CCW_ARROWS = [straight(6, 0)]
+U_CW_ARROWS = [straight(2, 0)]
+U_CCW_ARROWS = [straight(0, 2)]
+D_CW_ARROWS = [straight(6, 8)]
+D_CCW_ARROWS = [straight(8, 6)]
+F_CW_ARROWS = [((8, 0.25, 0.5), (6, 0.75, 0.5)),
+               ((6, 0.5, 0.25), (0, 0.5, 0.75)),
+               ((0, 0.75, 0.5), (2, 0.25, 0.5)),
+               ((2, 0.5, 0.75), (8, 0.5, 0.25))]
+F_CCW_ARROWS = [((2, 0.25, 0.5), (0, 0.75, 0.5)),
+                ((0, 0.5, 0.75), (6, 0.5, 0.25)),
+                ((6, 0.75, 0.5), (8, 0.25, 0.5)),
+                ((8, 0.5, 0.25), (2, 0.5, 0.75))]
+# B is guided on the top face, held up as when it was scanned; its back row moves sideways
+B_CW_ARROWS = [straight(2, 0)]
+B_CCW_ARROWS = [straight(0, 2)]
+TURN_RIGHT_ARROWS = [straight(8, 6), straight(5, 3), straight(2, 0)]
+TURN_FRONT_ARROWS = [straight(6, 8), straight(3, 5), straight(0, 2)]
+
+# A move is confirmed by streaming votes like a scanned face, over more frames since the cube is
+# being turned: (window, minimum frames, threshold, weighted) for voting.StickerVoter
+MOVE_VOTING = (10, 4, 0.6, True)
 
 def rotate_cw(face):
-    final = np.copy(face)
-    final[0, 0] = face[0, 6]
-    final[0, 1] = face[0, 3]
-    final[0, 2] = face[0, 0]
-    final[0, 3] = face[0, 7]
-    final[0, 4] = face[0, 4]
-    final[0, 5] = face[0, 1]
-    final[0, 6] = face[0, 8]
-    final[0, 7] = face[0, 5]
-    final[0, 8] = face[0, 2]
-    return final
+    return np.asarray(face)[..., cube_state.FACE_CW]
 
 def rotate_ccw(face):
-    final = np.copy(face)
-    final[0, 8] = face[0, 6]
-    final[0, 7] = face[0, 3]
-    final[0, 6] = face[0, 0]
-    final[0, 5] = face[0, 7]
-    final[0, 4] = face[0, 4]
-    final[0, 3] = face[0, 1]
-    final[0, 2] = face[0, 8]
-    final[0, 1] = face[0, 5]
-    final[0, 0] = face[0, 2]
-    return final
-
-def right_cw(video,videoWriter,up_face,right_face,front_face,down_face,left_face,back_face):
-    print("Next Move: R Clockwise")
-    from main import detect_face
-    temp = np.copy(front_face)
-    front_face[0, 2] = down_face[0, 2]
-    front_face[0, 5] = down_face[0, 5]
-    front_face[0, 8] = down_face[0, 8]
-    down_face[0, 2] = back_face[0, 6]
-    down_face[0, 5] = back_face[0, 3]
-    down_face[0, 8] = back_face[0, 0]
-    back_face[0, 0] = up_face[0, 8]
-    back_face[0, 3] = up_face[0, 5]
-    back_face[0, 6] = up_face[0, 2]
-    up_face[0, 2] = temp[0, 2]
-    up_face[0, 5] = temp[0, 5]
-    up_face[0, 8] = temp[0, 8]
-    right_face = rotate_cw(right_face)
-    #front_face = temp
-
-    print(front_face)
-    faces = []
+    return np.asarray(face)[..., cube_state.FACE_CCW]
+
+def sticker_point(blob_colors, sticker, fx, fy):
+    blob = blob_colors[sticker]
+    return (int(blob["x"] + fx * blob["w"]), int(blob["y"] + fy * blob["h"]))
+
+def draw_arrows(bgr_image_input, blob_colors, arrows):
+    points = [(sticker_point(blob_colors, *start), sticker_point(blob_colors, *end)) for start, end in arrows]
+    for point1, point2 in points:
+        cv2.arrowedLine(bgr_image_input, point1, point2, (0, 0, 0), 7, tipLength=0.2)
+    for point1, point2 in points:
+        cv2.arrowedLine(bgr_image_input, point1, point2, (0, 0, 255), 4, tipLength=0.2)
+
+def verify_move(video, videoWriter, cube, move, arrows, view="F", text=""):
+    # Apply the move to the tracked state, then wait until the camera shows the expected `view` face.
+    # Only the stickers the move changes on that face are compared, plus the centre, which tells
+    # the faces apart.  While the old face is still visible the arrows for the move are drawn over it.
+    # When the last move was checked on another face, the user is asked to show this one.
+    global shown_view
+    if not text and view != shown_view:
+        text = VIEW_PROMPTS[view]
+    display.notify("move", (move, view))
+    moved = cube_state.apply(cube, move)
+    previous_face = cube_state.face(cube, view)
+    expected_face = cube_state.face(moved, view)
+    checked = expected_face != previous_face
+    checked[4] = True
+
+    print(expected_face)
+    voter = voting.StickerVoter(*MOVE_VOTING)
     while True:
-        is_ok, bgr_image_input = video.read()
+        is_ok, bgr_image_input, face, blob_colors = pipeline.read_detected(video, detect_face, schedule)
 
         if not is_ok:
             print("Cannot read video source")
             sys.exit()
 
-        face, blob_colors = detect_face(bgr_image_input)
-        # print(len(face))
-        if len(face) == 9:
-            faces.append(face)
-            if len(faces) == 10:
-                face_array = np.array(faces)
-                # print('INNNNN')
-                # face_array = np.transpose(face_array)
-                detected_face = stats.mode(face_array)[0]
-                up_face = np.asarray(up_face)
-                front_face = np.asarray(front_face)
-                detected_face = np.asarray(detected_face)
-                faces = []
-                if np.array_equal(detected_face, front_face) == True:
+        if text:
+            bgr_image_input = cv2.putText(bgr_image_input, text, (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 255), 3)
+        if face is None:
+            voter.skip()
+        elif len(face) == 9:
+            detected_face = voter.add(face, blob_colors["confidence"])
+            if detected_face is not None:
+                if np.array_equal(detected_face[checked], expected_face[checked]):
                     print("MOVE MADE")
-                    return up_face,right_face,front_face,down_face,left_face,back_face
-                elif np.array_equal(detected_face,temp) == True:
-                    centroid1 = blob_colors[8]
-                    centroid2 = blob_colors[2]
-                    point1 = (centroid1[5]+(centroid1[7]/2), centroid1[6]+(centroid1[7]/2))
-                    point2 = (centroid2[5]+(centroid2[8]/2), centroid2[6]+(centroid2[8]/2))
-                    cv2.arrowedLine(bgr_image_input, point1, point2, (0, 0, 0), 7, tipLength = 0.2)
-                    cv2.arrowedLine(bgr_image_input, point1, point2, (0, 0, 255), 4, tipLength=0.2)
-        videoWriter.write(bgr_image_input)
-        cv2.imshow("Output Image", bgr_image_input)
-        key_pressed = cv2.waitKey(1) & 0xFF
-        if key_pressed == 27 or key_pressed == ord('q'):
+                    shown_view = view
+                    display.notify("moved", (move, cube_state.to_facelet_string(moved)))
+                    return moved
+                elif arrows and np.array_equal(detected_face[checked], previous_face[checked]):
+                    draw_arrows(bgr_image_input, blob_colors, arrows)
+        else:
+            voter.miss()
+        if display.show_frame(videoWriter, bgr_image_input):
             break
 
-def right_ccw(video, videoWriter, up_face,right_face,front_face,down_face,left_face,back_face):
-    print("Next Move: R CounterClockwise")
-    from main import detect_face
-    temp = np.copy(front_face)
-    front_face[0, 2] = up_face[0, 2]
-    front_face[0, 5] = up_face[0, 5]
-    front_face[0, 8] = up_face[0, 8]
-    up_face[0, 2] = back_face[0, 6]
-    up_face[0, 5] = back_face[0, 3]
-    up_face[0, 8] = back_face[0, 0]
-    back_face[0, 0] = down_face[0, 8]
-    back_face[0, 3] = down_face[0, 5]
-    back_face[0, 6] = down_face[0, 2]
-    down_face[0, 2] = temp[0, 2]
-    down_face[0, 5] = temp[0, 5]
-    down_face[0, 8] = temp[0, 8]
-    right_face = rotate_ccw(right_face)
-    # front_face = temp
-
-    print(front_face)
-    faces = []
-    while True:
-        is_ok, bgr_image_input = video.read()
-
-        if not is_ok:
-            print("Cannot read video source")
-            sys.exit()
+def right_cw(video, videoWriter, cube):
+    print("Next Move: R Clockwise")
+    return verify_move(video, videoWriter, cube, "R", R_CW_ARROWS)
 
-        face, blob_colors = detect_face(bgr_image_input)
-        # print(len(face))
-        if len(face) == 9:
-            faces.append(face)
-            if len(faces) == 10:
-                face_array = np.array(faces)
-                # print('INNNNN')
-                # face_array = np.transpose(face_array)
-                detected_face = stats.mode(face_array)[0]
-                up_face = np.asarray(up_face)
-                front_face = np.asarray(front_face)
-                detected_face = np.asarray(detected_face)
-                faces = []
-                if np.array_equal(detected_face, front_face) == True:
-                    print("MOVE MADE")
-                    return up_face,right_face,front_face,down_face,left_face,back_face
-                elif np.array_equal(detected_face,temp) == True:
-                    centroid1 = blob_colors[2]
-                    centroid2 = blob_colors[8]
-                    point1 = (centroid1[5]+(centroid1[7]/2), centroid1[6]+(centroid1[7]/2))
-                    point2 = (centroid2[5]+(centroid2[8]/2), centroid2[6]+(centroid2[8]/2))
-                    cv2.arrowedLine(bgr_image_input, point1, point2, (0, 0, 0), 7, tipLength = 0.2)
-                    cv2.arrowedLine(bgr_image_input, point1, point2, (0, 0, 255), 4, tipLength=0.2)
-        videoWriter.write(bgr_image_input)
-        cv2.imshow("Output Image", bgr_image_input)
-        key_pressed = cv2.waitKey(1) & 0xFF
-        if key_pressed == 27 or key_pressed == ord('q'):
-            break
+def right_ccw(video, videoWriter, cube):
+    print("Next Move: R CounterClockwise")
+    return verify_move(video, videoWriter, cube, "R'", R_CCW_ARROWS)
 
-def left_cw(video,videoWriter,up_face,right_face,front_face,down_face,left_face,back_face):
+def left_cw(video, videoWriter, cube):
     print("Next Move: L Clockwise")
-    from main import detect_face
-    temp = np.copy(front_face)
-    front_face[0, 0] = up_face[0, 0]
-    front_face[0, 3] = up_face[0, 3]
-    front_face[0, 6] = up_face[0, 6]
-    up_face[0, 0] = back_face[0, 8]
-    up_face[0, 3] = back_face[0, 5]
-    up_face[0, 6] = back_face[0, 2]
-    back_face[0, 2] = down_face[0, 6]
-    back_face[0, 5] = down_face[0, 3]
-    back_face[0, 8] = down_face[0, 0]
-    down_face[0, 0] = temp[0, 0]
-    down_face[0, 3] = temp[0, 3]
-    down_face[0, 6] = temp[0, 6]
-    left_face = rotate_cw(left_face)
-    #front_face = temp
-
-    print(front_face)
-    faces = []
-    while True:
-        is_ok, bgr_image_input = video.read()
+    return verify_move(video, videoWriter, cube, "L", L_CW_ARROWS)
 
-        if not is_ok:
-            print("Cannot read video source")
-            sys.exit()
-
-        face, blob_colors = detect_face(bgr_image_input)
-        # print(len(face))
-        if len(face) == 9:
-            faces.append(face)
-            if len(faces) == 10:
-                face_array = np.array(faces)
-                # print('INNNNN')
-                # face_array = np.transpose(face_array)
-                detected_face = stats.mode(face_array)[0]
-                up_face = np.asarray(up_face)
-                front_face = np.asarray(front_face)
-                detected_face = np.asarray(detected_face)
-                faces = []
-                if np.array_equal(detected_face, front_face) == True:
-                    print("MOVE MADE")
-                    return up_face,right_face,front_face,down_face,left_face,back_face
-                elif np.array_equal(detected_face,temp) == True:
-                    centroid1 = blob_colors[0]
-                    centroid2 = blob_colors[6]
-                    point1 = (centroid1[5]+(centroid1[7]/2), centroid1[6]+(centroid1[7]/2))
-                    point2 = (centroid2[5]+(centroid2[8]/2), centroid2[6]+(centroid2[8]/2))
-                    cv2.arrowedLine(bgr_image_input, point1, point2, (0, 0, 0), 7, tipLength = 0.2)
-                    cv2.arrowedLine(bgr_image_input, point1, point2, (0, 0, 255), 4, tipLength=0.2)
-        videoWriter.write(bgr_image_input)
-        cv2.imshow("Output Image", bgr_image_input)
-        key_pressed = cv2.waitKey(1) & 0xFF
-        if key_pressed == 27 or key_pressed == ord('q'):
-            break
-
-def left_ccw(video,videoWriter,up_face,right_face,front_face,down_face,left_face,back_face):
+def left_ccw(video, videoWriter, cube):
     print("Next Move: L CounterClockwise")
-    from main import detect_face
-    temp = np.copy(front_face)
-    front_face[0, 0] = down_face[0, 0]
-    front_face[0, 3] = down_face[0, 3]
-    front_face[0, 6] = down_face[0, 6]
-    down_face[0, 0] = back_face[0, 8]
-    down_face[0, 3] = back_face[0, 5]
-    down_face[0, 6] = back_face[0, 2]
-    back_face[0, 2] = up_face[0, 6]
-    back_face[0, 5] = up_face[0, 3]
-    back_face[0, 8] = up_face[0, 0]
-    up_face[0, 0] = temp[0, 0]
-    up_face[0, 3] = temp[0, 3]
-    up_face[0, 6] = temp[0, 6]
-    left_face = rotate_ccw(left_face)
-    #front_face = temp
-
-    print(front_face)
-    faces = []
-    while True:
-        is_ok, bgr_image_input = video.read()
+    return verify_move(video, videoWriter, cube, "L'", L_CCW_ARROWS)
 
-        if not is_ok:
-            print("Cannot read video source")
-            sys.exit()
+def right_half(video, videoWriter, cube):
+    print("Next Move: R Half Turn")
+    return verify_move(video, videoWriter, cube, "R2", R_CW_ARROWS)
 
-        face, blob_colors = detect_face(bgr_image_input)
-        # print(len(face))
-        if len(face) == 9:
-            faces.append(face)
-            if len(faces) == 10:
-                face_array = np.array(faces)
-                # print('INNNNN')
-                # face_array = np.transpose(face_array)
-                detected_face = stats.mode(face_array)[0]
-                up_face = np.asarray(up_face)
-                front_face = np.asarray(front_face)
-                detected_face = np.asarray(detected_face)
-                faces = []
-                if np.array_equal(detected_face, front_face) == True:
-                    print("MOVE MADE")
-                    return up_face,right_face,front_face,down_face,left_face,back_face
-                elif np.array_equal(detected_face,temp) == True:
-                    centroid1 = blob_colors[6]
-                    centroid2 = blob_colors[0]
-                    point1 = (centroid1[5]+(centroid1[7]/2), centroid1[6]+(centroid1[7]/2))
-                    point2 = (centroid2[5]+(centroid2[8]/2), centroid2[6]+(centroid2[8]/2))
-                    cv2.arrowedLine(bgr_image_input, point1, point2, (0, 0, 0), 7, tipLength = 0.2)
-                    cv2.arrowedLine(bgr_image_input, point1, point2, (0, 0, 255), 4, tipLength=0.2)
-        videoWriter.write(bgr_image_input)
-        cv2.imshow("Output Image", bgr_image_input)
-        key_pressed = cv2.waitKey(1) & 0xFF
-        if key_pressed == 27 or key_pressed == ord('q'):
-            break
+def left_half(video, videoWriter, cube):
+    print("Next Move: L Half Turn")
+    return verify_move(video, videoWriter, cube, "L2", L_CW_ARROWS)
 
-def front_cw(video,videoWriter,up_face,right_face,front_face,down_face,left_face,back_face):
-    print(front_face)
+def front_cw(video, videoWriter, cube):
     print("Next Move: F Clockwise")
-    from main import detect_face
-    temp1 = np.copy(front_face)
-    temp = np.copy(up_face)
-    front_face = rotate_cw(front_face)
-    temp2 = np.copy(front_face)
-    if np.array_equal(temp2, temp1) == True:
-        [up_face, right_face, front_face, down_face, left_face, back_face] = turn_to_right(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-        [up_face, right_face, front_face, down_face, left_face, back_face] = left_cw(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-        [up_face, right_face, front_face, down_face, left_face, back_face] = turn_to_front(video, videoWriter, up_face, right_face, front_face, down_face, left_face, back_face)
-        return up_face, right_face, front_face, down_face, left_face, back_face
-    up_face[0, 8] = left_face[0, 2]
-    up_face[0, 7] = left_face[0, 5]
-    up_face[0, 6] = left_face[0, 8]
-    left_face[0, 2] = down_face[0, 0]
-    left_face[0, 5] = down_face[0, 1]
-    left_face[0, 8] = down_face[0, 2]
-    down_face[0, 2] = right_face[0, 0]
-    down_face[0, 1] = right_face[0, 3]
-    down_face[0, 0] = right_face[0, 6]
-    right_face[0, 0] = temp[0, 6]
-    right_face[0, 3] = temp[0, 7]
-    right_face[0, 6] = temp[0, 8]
-
-    #front_face = temp
-
-    print(front_face)
-    faces = []
-    while True:
-
-        is_ok, bgr_image_input = video.read()
-
-        if not is_ok:
-            print("Cannot read video source")
-            sys.exit()
-
-        face, blob_colors = detect_face(bgr_image_input)
-        # print(len(face))
-        if len(face) == 9:
-            faces.append(face)
-            if len(faces) == 10:
-                face_array = np.array(faces)
-                # print('INNNNN')
-                # face_array = np.transpose(face_array)
-                detected_face = stats.mode(face_array)[0]
-                up_face = np.asarray(up_face)
-                front_face = np.asarray(front_face)
-                detected_face = np.asarray(detected_face)
-                faces = []
-                if np.array_equal(detected_face, front_face) == True:
-                    print("MOVE MADE")
-                    return up_face,right_face,front_face,down_face,left_face,back_face
-                elif np.array_equal(detected_face,temp1) == True:
-                    centroid1 = blob_colors[8]
-                    centroid2 = blob_colors[6]
-                    centroid3 = blob_colors[0]
-                    centroid4 = blob_colors[2]
-                    point1 = (centroid1[5] + (centroid1[7] / 4), centroid1[6] + (centroid1[7] / 2))
-                    point2 = (centroid2[5] + (3 * centroid2[8] / 4), centroid2[6] + (centroid2[8] / 2))
-                    point3 = (centroid2[5] + (centroid2[7] / 2), centroid2[6] + (centroid2[7] / 4))
-                    point4 = (centroid3[5] + (centroid3[8] / 2), centroid3[6] + (3 * centroid3[8] / 4))
-                    point5 = (centroid3[5] + (3 * centroid3[8] / 4), centroid3[6] + (centroid3[8] / 2))
-                    point6 = (centroid4[5] + (centroid4[8] / 4), centroid4[6] + (centroid4[8] / 2))
-                    point7 = (centroid4[5] + (centroid4[8] / 2), centroid4[6] + (3 * centroid4[8] / 4))
-                    point8 = (centroid1[5] + (centroid1[8] / 2), centroid1[6] + (centroid1[8] / 4))
-                    cv2.arrowedLine(bgr_image_input, point1, point2, (0, 0, 0), 7, tipLength = 0.2)
-                    cv2.arrowedLine(bgr_image_input, point3, point4, (0, 0, 0), 7, tipLength = 0.2)
-                    cv2.arrowedLine(bgr_image_input, point5, point6, (0, 0, 0), 7, tipLength = 0.2)
-                    cv2.arrowedLine(bgr_image_input, point7, point8, (0, 0, 0), 7, tipLength = 0.2)
-                    cv2.arrowedLine(bgr_image_input, point1, point2, (0, 0, 255), 4, tipLength=0.2)
-                    cv2.arrowedLine(bgr_image_input, point3, point4, (0, 0, 255), 4, tipLength=0.2)
-                    cv2.arrowedLine(bgr_image_input, point5, point6, (0, 0, 255), 4, tipLength=0.2)
-                    cv2.arrowedLine(bgr_image_input, point7, point8, (0, 0, 255), 4, tipLength=0.2)
-        videoWriter.write(bgr_image_input)
-        cv2.imshow("Output Image", bgr_image_input)
-        key_pressed = cv2.waitKey(1) & 0xFF
-        if key_pressed == 27 or key_pressed == ord('q'):
-            break
-
-def front_ccw(video,videoWriter,up_face,right_face,front_face,down_face,left_face,back_face):
+    front_face = cube_state.face(cube, "F")
+    if np.array_equal(rotate_cw(front_face), front_face):
+        # a symmetric front face cannot show the turn, so make it as L seen from the right face
+        for step in (turn_to_right, left_cw, turn_to_front):
+            cube = step(video, videoWriter, cube)
+            if cube is None:
+                return None
+        return cube
+    return verify_move(video, videoWriter, cube, "F", F_CW_ARROWS)
+
+def front_ccw(video, videoWriter, cube):
     print("Next Move: F CounterClockwise")
-    from main import detect_face
-    temp = np.copy(up_face)
-    temp1 = np.copy(front_face)
-    front_face = rotate_ccw(front_face)
-    temp2 = np.copy(front_face)
-    if np.array_equal(temp2,temp1) == True:
-            [up_face, right_face, front_face, down_face, left_face, back_face] = turn_to_right(video,videoWriter,up_face,right_face,front_face,down_face,left_face,back_face)
-            [up_face, right_face, front_face, down_face, left_face, back_face] = left_ccw(video,videoWriter,up_face,right_face,front_face,down_face,left_face,back_face)
-            [up_face, right_face, front_face, down_face, left_face, back_face] = turn_to_front(video,videoWriter,up_face,right_face,front_face,down_face,left_face,back_face)
-            return up_face,right_face,front_face,down_face,left_face,back_face
-    up_face[0, 6] = right_face[0, 0]
-    up_face[0, 7] = right_face[0, 3]
-    up_face[0, 8] = right_face[0, 6]
-    right_face[0, 0] = down_face[0, 2]
-    right_face[0, 3] = down_face[0, 1]
-    right_face[0, 6] = down_face[0, 0]
-    down_face[0, 0] = left_face[0, 2]
-    down_face[0, 1] = left_face[0, 5]
-    down_face[0, 2] = left_face[0, 8]
-    left_face[0, 8] = temp[0, 6]
-    left_face[0, 5] = temp[0, 7]
-    left_face[0, 2] = temp[0, 8]
-
-    #front_face = temp
-
-    print(front_face)
-    faces = []
-    while True:
-        is_ok, bgr_image_input = video.read()
-
-        if not is_ok:
-            print("Cannot read video source")
-            sys.exit()
-
-        face, blob_colors = detect_face(bgr_image_input)
-        # print(len(face))
-        if len(face) == 9:
-            faces.append(face)
-            if len(faces) == 10:
-                face_array = np.array(faces)
-                # print('INNNNN')
-                # face_array = np.transpose(face_array)
-                detected_face = stats.mode(face_array)[0]
-                up_face = np.asarray(up_face)
-                front_face = np.asarray(front_face)
-                detected_face = np.asarray(detected_face)
-                faces = []
-                if np.array_equal(detected_face, front_face) == True:
-                    print("MOVE MADE")
-                    return up_face,right_face,front_face,down_face,left_face,back_face
-                elif np.array_equal(detected_face,temp1) == True:
-                    centroid1 = blob_colors[2]
-                    centroid2 = blob_colors[0]
-                    centroid3 = blob_colors[6]
-                    centroid4 = blob_colors[8]
-                    point1 = (centroid1[5] + (centroid1[7] / 4), centroid1[6] + (centroid1[7] / 2))
-                    point2 = (centroid2[5] + (3 * centroid2[8]/4), centroid2[6] + (centroid2[8] / 2))
-                    point3 = (centroid2[5] + (centroid2[7] / 2), centroid2[6] + (3 * centroid2[7] / 4))
-                    point4 = (centroid3[5] + (centroid3[8] / 2), centroid3[6] + (centroid3[8] / 4))
-                    point5 = (centroid3[5] + (3 * centroid3[8] / 4), centroid3[6] + (centroid3[8] / 2))
-                    point6 = (centroid4[5] + (centroid4[8] / 4), centroid4[6] + (centroid4[8] / 2))
-                    point7 = (centroid4[5] + (centroid4[8] / 2), centroid4[6] + (centroid4[8] / 4))
-                    point8 = (centroid1[5] + (centroid1[8] / 2), centroid1[6] + (3 * centroid1[8] / 4))
-                    cv2.arrowedLine(bgr_image_input, point1, point2, (0, 0, 0), 7, tipLength = 0.2)
-                    cv2.arrowedLine(bgr_image_input, point3, point4, (0, 0, 0), 7, tipLength = 0.2)
-                    cv2.arrowedLine(bgr_image_input, point5, point6, (0, 0, 0), 7, tipLength = 0.2)
-                    cv2.arrowedLine(bgr_image_input, point7, point8, (0, 0, 0), 7, tipLength = 0.2)
-                    cv2.arrowedLine(bgr_image_input, point1, point2, (0, 0, 255), 4, tipLength=0.2)
-                    cv2.arrowedLine(bgr_image_input, point3, point4, (0, 0, 255), 4, tipLength=0.2)
-                    cv2.arrowedLine(bgr_image_input, point5, point6, (0, 0, 255), 4, tipLength=0.2)
-                    cv2.arrowedLine(bgr_image_input, point7, point8, (0, 0, 255), 4, tipLength=0.2)
-        videoWriter.write(bgr_image_input)
-        cv2.imshow("Output Image", bgr_image_input)
-        key_pressed = cv2.waitKey(1) & 0xFF
-        if key_pressed == 27 or key_pressed == ord('q'):
-            break
-
-def back_cw(video,videoWriter,up_face,right_face,front_face,down_face,left_face,back_face):
+    front_face = cube_state.face(cube, "F")
+    if np.array_equal(rotate_ccw(front_face), front_face):
+        for step in (turn_to_right, left_ccw, turn_to_front):
+            cube = step(video, videoWriter, cube)
+            if cube is None:
+                return None
+        return cube
+    return verify_move(video, videoWriter, cube, "F'", F_CCW_ARROWS)
+
+def front_half(video, videoWriter, cube):
+    print("Next Move: F Half Turn")
+    front_face = cube_state.face(cube, "F")
+    if np.array_equal(rotate_cw(rotate_cw(front_face)), front_face):
+        for step in (turn_to_right, left_half, turn_to_front):
+            cube = step(video, videoWriter, cube)
+            if cube is None:
+                return None
+        return cube
+    return verify_move(video, videoWriter, cube, "F2", F_CW_ARROWS)
+
+def back_cw(video, videoWriter, cube):
     print("Next Move: B Clockwise")
-    from main import detect_face
-    temp = np.copy(up_face)
-    up_face[0, 0] = right_face[0, 2]
-    up_face[0, 1] = right_face[0, 5]
-    up_face[0, 2] = right_face[0, 8]
-    right_face[0, 8] = down_face[0, 6]
-    right_face[0, 5] = down_face[0, 7]
-    right_face[0, 2] = down_face[0, 8]
-    down_face[0, 6] = left_face[0, 0]
-    down_face[0, 7] = left_face[0, 3]
-    down_face[0, 8] = left_face[0, 6]
-    left_face[0, 0] = temp[0, 2]
-    left_face[0, 3] = temp[0, 1]
-    left_face[0, 6] = temp[0, 0]
-    back_face = rotate_cw(back_face)
-    #front_face = temp
-
-    print(front_face)
-    faces = []
-    while True:
-        is_ok, bgr_image_input = video.read()
-
-        if not is_ok:
-            print("Cannot read video source")
-            sys.exit()
-
-        face, blob_colors = detect_face(bgr_image_input)
-        # print(len(face))
-        if len(face) == 9:
-            faces.append(face)
-            if len(faces) == 10:
-                face_array = np.array(faces)
-                # print('INNNNN')
-                # face_array = np.transpose(face_array)
-                detected_face = stats.mode(face_array)[0]
-                up_face = np.asarray(up_face)
-                front_face = np.asarray(front_face)
-                detected_face = np.asarray(detected_face)
-                faces = []
-                if np.array_equal(detected_face, front_face) == True:
-                    print("MOVE MADE")
-                    return up_face,right_face,front_face,down_face,left_face,back_face
-        videoWriter.write(bgr_image_input)
-        cv2.imshow("Output Image", bgr_image_input)
-        key_pressed = cv2.waitKey(1) & 0xFF
-        if key_pressed == 27 or key_pressed == ord('q'):
-            break
+    return verify_move(video, videoWriter, cube, "B", B_CW_ARROWS, view="U")
 
-def back_ccw(video,videoWriter,up_face,right_face,front_face,down_face,left_face,back_face):
+def back_ccw(video, videoWriter, cube):
     print("Next Move: B CounterClockwise")
-    from main import detect_face
-    temp = np.copy(up_face)
-    up_face[0, 2] = left_face[0, 0]
-    up_face[0, 1] = left_face[0, 3]
-    up_face[0, 0] = left_face[0, 6]
-    left_face[0, 0] = down_face[0, 6]
-    left_face[0, 3] = down_face[0, 7]
-    left_face[0, 6] = down_face[0, 8]
-    down_face[0, 6] = right_face[0, 8]
-    down_face[0, 7] = right_face[0, 5]
-    down_face[0, 8] = right_face[0, 2]
-    right_face[0, 2] = temp[0, 0]
-    right_face[0, 5] = temp[0, 1]
-    right_face[0, 8] = temp[0, 2]
-    back_face = rotate_ccw(back_face)
-    #front_face = temp
-
-    print(front_face)
-    faces = []
-    while True:
-        is_ok, bgr_image_input = video.read()
+    return verify_move(video, videoWriter, cube, "B'", B_CCW_ARROWS, view="U")
 
-        if not is_ok:
-            print("Cannot read video source")
-            sys.exit()
-
-        face, blob_colors = detect_face(bgr_image_input)
-        # print(len(face))
-        if len(face) == 9:
-            faces.append(face)
-            if len(faces) == 10:
-                face_array = np.array(faces)
-                # print('INNNNN')
-                # face_array = np.transpose(face_array)
-                detected_face = stats.mode(face_array)[0]
-                up_face = np.asarray(up_face)
-                front_face = np.asarray(front_face)
-                detected_face = np.asarray(detected_face)
-                faces = []
-                if np.array_equal(detected_face, front_face) == True:
-                    print("MOVE MADE")
-                    return up_face,right_face,front_face,down_face,left_face,back_face
-        videoWriter.write(bgr_image_input)
-        cv2.imshow("Output Image", bgr_image_input)
-        key_pressed = cv2.waitKey(1) & 0xFF
-        if key_pressed == 27 or key_pressed == ord('q'):
-            break
+def back_half(video, videoWriter, cube):
+    print("Next Move: B Half Turn")
+    return verify_move(video, videoWriter, cube, "B2", B_CW_ARROWS, view="U")
 
-def up_cw(video,videoWriter,up_face,right_face,front_face,down_face,left_face,back_face):
+def up_cw(video, videoWriter, cube):
     print("Next Move: U Clockwise")
-    from main import detect_face
-    temp = np.copy(front_face)
-    front_face[0, 0] = right_face[0, 0]
-    front_face[0, 1] = right_face[0, 1]
-    front_face[0, 2] = right_face[0, 2]
-    right_face[0, 0] = back_face[0, 0]
-    right_face[0, 1] = back_face[0, 1]
-    right_face[0, 2] = back_face[0, 2]
-    back_face[0, 0] = left_face[0, 0]
-    back_face[0, 1] = left_face[0, 1]
-    back_face[0, 2] = left_face[0, 2]
-    left_face[0, 0] = temp[0, 0]
-    left_face[0, 1] = temp[0, 1]
-    left_face[0, 2] = temp[0, 2]
-    up_face = rotate_cw(up_face)
-    #front_face = temp
-
-    print(front_face)
-    faces = []
-    while True:
-        is_ok, bgr_image_input = video.read()
-
-        if not is_ok:
-            print("Cannot read video source")
-            sys.exit()
-
-        face, blob_colors = detect_face(bgr_image_input)
-        # print(len(face))
-        if len(face) == 9:
-            faces.append(face)
-            if len(faces) == 10:
-                face_array = np.array(faces)
-                # print('INNNNN')
-                # face_array = np.transpose(face_array)
-                detected_face = stats.mode(face_array)[0]
-                up_face = np.asarray(up_face)
-                front_face = np.asarray(front_face)
-                detected_face = np.asarray(detected_face)
-                faces = []
-                if np.array_equal(detected_face, front_face) == True:
-                    print("MOVE MADE")
-                    return up_face,right_face,front_face,down_face,left_face,back_face
-                elif np.array_equal(detected_face,temp) == True:
-                    centroid1 = blob_colors[2]
-                    centroid2 = blob_colors[0]
-                    point1 = (centroid1[5]+(centroid1[7]/2), centroid1[6]+(centroid1[7]/2))
-                    point2 = (centroid2[5]+(centroid2[8]/2), centroid2[6]+(centroid2[8]/2))
-                    cv2.arrowedLine(bgr_image_input, point1, point2, (0, 0, 0), 7, tipLength = 0.2)
-                    cv2.arrowedLine(bgr_image_input, point1, point2, (0, 0, 255), 4, tipLength=0.2)
-        videoWriter.write(bgr_image_input)
-        cv2.imshow("Output Image", bgr_image_input)
-        key_pressed = cv2.waitKey(1) & 0xFF
-        if key_pressed == 27 or key_pressed == ord('q'):
-            break
+    return verify_move(video, videoWriter, cube, "U", U_CW_ARROWS)
 
-def up_ccw(video,videoWriter,up_face,right_face,front_face,down_face,left_face,back_face):
+def up_ccw(video, videoWriter, cube):
     print("Next Move: U CounterClockwise")
-    from main import detect_face
-    temp = np.copy(front_face)
-    front_face[0, 0] = left_face[0, 0]
-    front_face[0, 1] = left_face[0, 1]
-    front_face[0, 2] = left_face[0, 2]
-    left_face[0, 0] = back_face[0, 0]
-    left_face[0, 1] = back_face[0, 1]
-    left_face[0, 2] = back_face[0, 2]
-    back_face[0, 0] = right_face[0, 0]
-    back_face[0, 1] = right_face[0, 1]
-    back_face[0, 2] = right_face[0, 2]
-    right_face[0, 0] = temp[0, 0]
-    right_face[0, 1] = temp[0, 1]
-    right_face[0, 2] = temp[0, 2]
-    up_face = rotate_ccw(up_face)
-    #front_face = temp
-
-    print(front_face)
-    faces = []
-    while True:
-        is_ok, bgr_image_input = video.read()
+    return verify_move(video, videoWriter, cube, "U'", U_CCW_ARROWS)
 
-        if not is_ok:
-            print("Cannot read video source")
-            sys.exit()
+def up_half(video, videoWriter, cube):
+    print("Next Move: U Half Turn")
+    return verify_move(video, videoWriter, cube, "U2", U_CW_ARROWS)
 
-        face, blob_colors = detect_face(bgr_image_input)
-        # print(len(face))
-        if len(face) == 9:
-            faces.append(face)
-            if len(faces) == 10:
-                face_array = np.array(faces)
-                # print('INNNNN')
-                # face_array = np.transpose(face_array)
-                detected_face = stats.mode(face_array)[0]
-                up_face = np.asarray(up_face)
-                front_face = np.asarray(front_face)
-                detected_face = np.asarray(detected_face)
-                faces = []
-                if np.array_equal(detected_face, front_face) == True:
-                    print("MOVE MADE")
-                    return up_face,right_face,front_face,down_face,left_face,back_face
-                elif np.array_equal(detected_face,temp) == True:
-                    centroid1 = blob_colors[0]
-                    centroid2 = blob_colors[2]
-                    point1 = (centroid1[5]+(centroid1[7]/2), centroid1[6]+(centroid1[7]/2))
-                    point2 = (centroid2[5]+(centroid2[8]/2), centroid2[6]+(centroid2[8]/2))
-                    cv2.arrowedLine(bgr_image_input, point1, point2, (0, 0, 0), 7, tipLength = 0.2)
-                    cv2.arrowedLine(bgr_image_input, point1, point2, (0, 0, 255), 4, tipLength=0.2)
-        videoWriter.write(bgr_image_input)
-        cv2.imshow("Output Image", bgr_image_input)
-        key_pressed = cv2.waitKey(1) & 0xFF
-        if key_pressed == 27 or key_pressed == ord('q'):
-            break
-
-def down_cw(video,videoWriter,up_face,right_face,front_face,down_face,left_face,back_face):
+def down_cw(video, videoWriter, cube):
     print("Next Move: D Clockwise")
-    from main import detect_face
-    temp = np.copy(front_face)
-    front_face[0, 6] = left_face[0, 6]
-    front_face[0, 7] = left_face[0, 7]
-    front_face[0, 8] = left_face[0, 8]
-    left_face[0, 6] = back_face[0, 6]
-    left_face[0, 7] = back_face[0, 7]
-    left_face[0, 8] = back_face[0, 8]
-    back_face[0, 6] = right_face[0, 6]
-    back_face[0, 7] = right_face[0, 7]
-    back_face[0, 8] = right_face[0, 8]
-    right_face[0, 6] = temp[0, 6]
-    right_face[0, 7] = temp[0, 7]
-    right_face[0, 8] = temp[0, 8]
-    down_face = rotate_cw(down_face)
-    #front_face = temp
-
-    print(front_face)
-    faces = []
-    while True:
-        is_ok, bgr_image_input = video.read()
-
-        if not is_ok:
-            print("Cannot read video source")
-            sys.exit()
-
-        face, blob_colors = detect_face(bgr_image_input)
-        # print(len(face))
-        if len(face) == 9:
-            faces.append(face)
-            if len(faces) == 10:
-                face_array = np.array(faces)
-                # print('INNNNN')
-                # face_array = np.transpose(face_array)
-                detected_face = stats.mode(face_array)[0]
-                up_face = np.asarray(up_face)
-                front_face = np.asarray(front_face)
-                detected_face = np.asarray(detected_face)
-                faces = []
-                if np.array_equal(detected_face, front_face) == True:
-                    print("MOVE MADE")
-                    return up_face,right_face,front_face,down_face,left_face,back_face
-                elif np.array_equal(detected_face,temp) == True:
-                    centroid1 = blob_colors[6]
-                    centroid2 = blob_colors[8]
-                    point1 = (centroid1[5]+(centroid1[7]/2), centroid1[6]+(centroid1[7]/2))
-                    point2 = (centroid2[5]+(centroid2[8]/2), centroid2[6]+(centroid2[8]/2))
-                    cv2.arrowedLine(bgr_image_input, point1, point2, (0, 0, 0), 7, tipLength = 0.2)
-                    cv2.arrowedLine(bgr_image_input, point1, point2, (0, 0, 255), 4, tipLength=0.2)
-        videoWriter.write(bgr_image_input)
-        cv2.imshow("Output Image", bgr_image_input)
-        key_pressed = cv2.waitKey(1) & 0xFF
-        if key_pressed == 27 or key_pressed == ord('q'):
-            break
+    return verify_move(video, videoWriter, cube, "D", D_CW_ARROWS)
 
-def down_ccw(video,videoWriter,up_face,right_face,front_face,down_face,left_face,back_face):
+def down_ccw(video, videoWriter, cube):
     print("Next Move: D CounterClockwise")
-    from main import detect_face
-    temp = np.copy(front_face)
-    front_face[0, 6] = right_face[0, 6]
-    front_face[0, 7] = right_face[0, 7]
-    front_face[0, 8] = right_face[0, 8]
-    right_face[0, 6] = back_face[0, 6]
-    right_face[0, 7] = back_face[0, 7]
-    right_face[0, 8] = back_face[0, 8]
-    back_face[0, 6] = left_face[0, 6]
-    back_face[0, 7] = left_face[0, 7]
-    back_face[0, 8] = left_face[0, 8]
-    left_face[0, 6] = temp[0, 6]
-    left_face[0, 7] = temp[0, 7]
-    left_face[0, 8] = temp[0, 8]
-    down_face = rotate_ccw(down_face)
-    #front_face = temp
-
-    print(front_face)
-    faces = []
-    while True:
-        is_ok, bgr_image_input = video.read()
+    return verify_move(video, videoWriter, cube, "D'", D_CCW_ARROWS)
 
-        if not is_ok:
-            print("Cannot read video source")
-            sys.exit()
-
-        face, blob_colors = detect_face(bgr_image_input)
-        # print(len(face))
-        if len(face) == 9:
-            faces.append(face)
-            if len(faces) == 10:
-                face_array = np.array(faces)
-                # print('INNNNN')
-                # face_array = np.transpose(face_array)
-                detected_face = stats.mode(face_array)[0]
-                up_face = np.asarray(up_face)
-                front_face = np.asarray(front_face)
-                detected_face = np.asarray(detected_face)
-                faces = []
-                if np.array_equal(detected_face, front_face) == True:
-                    print("MOVE MADE")
-                    return up_face,right_face,front_face,down_face,left_face,back_face
-                elif np.array_equal(detected_face,temp) == True:
-                    centroid1 = blob_colors[8]
-                    centroid2 = blob_colors[6]
-                    point1 = (centroid1[5]+(centroid1[7]/2), centroid1[6]+(centroid1[7]/2))
-                    point2 = (centroid2[5]+(centroid2[8]/2), centroid2[6]+(centroid2[8]/2))
-                    cv2.arrowedLine(bgr_image_input, point1, point2, (0, 0, 0), 7, tipLength = 0.2)
-                    cv2.arrowedLine(bgr_image_input, point1, point2, (0, 0, 255), 4, tipLength=0.2)
-        videoWriter.write(bgr_image_input)
-        cv2.imshow("Output Image", bgr_image_input)
-        key_pressed = cv2.waitKey(1) & 0xFF
-        if key_pressed == 27 or key_pressed == ord('q'):
-            break
+def down_half(video, videoWriter, cube):
+    print("Next Move: D Half Turn")
+    return verify_move(video, videoWriter, cube, "D2", D_CW_ARROWS)
 
-def turn_to_right(video,videoWriter,up_face,right_face,front_face,down_face,left_face,back_face):
+def turn_to_right(video, videoWriter, cube):
     print("Next Move: Show Right Face")
-    temp = np.copy(front_face)
-    front_face = np.copy(right_face)
-    right_face = np.copy(back_face)
-    back_face = np.copy(left_face)
-    left_face = np.copy(temp)
-    up_face = rotate_cw(up_face)
-    down_face = rotate_ccw(down_face)
-    #front_face = temp
-
-    print(front_face)
-    faces = []
-    while True:
-        is_ok, bgr_image_input = video.read()
-
-        if not is_ok:
-            print("Cannot read video source")
-            sys.exit()
+    return verify_move(video, videoWriter, cube, "y", TURN_RIGHT_ARROWS)
 
-        from main import detect_face
-        face, blob_colors = detect_face(bgr_image_input)
-        # print(len(face))
-        if len(face) == 9:
-            faces.append(face)
-            if len(faces) == 10:
-                face_array = np.array(faces)
-                # print('INNNNN')
-                # face_array = np.transpose(face_array)
-                detected_face = stats.mode(face_array)[0]
-                up_face = np.asarray(up_face)
-                front_face = np.asarray(front_face)
-                detected_face = np.asarray(detected_face)
-                faces = []
-                if np.array_equal(detected_face, front_face) == True:
-                    print("MOVE MADE")
-                    return up_face,right_face,front_face,down_face,left_face,back_face
-                elif np.array_equal(detected_face,temp) == True:
-                    centroid1 = blob_colors[8]
-                    centroid2 = blob_colors[6]
-                    centroid3 = blob_colors[5]
-                    centroid4 = blob_colors[3]
-                    centroid5 = blob_colors[2]
-                    centroid6 = blob_colors[0]
-                    point1 = (centroid1[5] + (centroid1[7] / 2), centroid1[6] + (centroid1[7] / 2))
-                    point2 = (centroid2[5] + (centroid2[8] / 2), centroid2[6] + (centroid2[8] / 2))
-                    point3 = (centroid3[5] + (centroid3[7] / 2), centroid3[6] + (centroid3[7] / 2))
-                    point4 = (centroid4[5] + (centroid4[8] / 2), centroid4[6] + (centroid4[8] / 2))
-                    point5 = (centroid5[5] + (centroid5[7] / 2), centroid5[6] + (centroid5[7] / 2))
-                    point6 = (centroid6[5] + (centroid6[8] / 2), centroid6[6] + (centroid6[8] / 2))
-                    cv2.arrowedLine(bgr_image_input, point1, point2, (0, 0, 0), 7, tipLength = 0.2)
-                    cv2.arrowedLine(bgr_image_input, point3, point4, (0, 0, 0), 7, tipLength = 0.2)
-                    cv2.arrowedLine(bgr_image_input, point5, point6, (0, 0, 0), 7, tipLength = 0.2)
-                    cv2.arrowedLine(bgr_image_input, point1, point2, (0, 0, 255), 4, tipLength=0.2)
-                    cv2.arrowedLine(bgr_image_input, point3, point4, (0, 0, 255), 4, tipLength=0.2)
-                    cv2.arrowedLine(bgr_image_input, point5, point6, (0, 0, 255), 4, tipLength=0.2)
-        videoWriter.write(bgr_image_input)
-        cv2.imshow("Output Image", bgr_image_input)
-        key_pressed = cv2.waitKey(1) & 0xFF
-        if key_pressed == 27 or key_pressed == ord('q'):
-            break
-
-def turn_to_front(video,videoWriter,up_face,right_face,front_face,down_face,left_face,back_face):
+def turn_to_front(video, videoWriter, cube):
     print("Next Move: Show Front Face")
-    temp = np.copy(front_face)
-    front_face = np.copy(left_face)
-    left_face = np.copy(back_face)
-    back_face = np.copy(right_face)
-    right_face = np.copy(temp)
-    up_face = rotate_ccw(up_face)
-    down_face = rotate_cw(down_face)
-    #front_face = temp
-
-    print(front_face)
-    faces = []
-    while True:
-        is_ok, bgr_image_input = video.read()
-
-        if not is_ok:
-            print("Cannot read video source")
-            sys.exit()
-
-        from main import detect_face
-        face, blob_colors = detect_face(bgr_image_input)
-        # print(len(face))
-        if len(face) == 9:
-            faces.append(face)
-            if len(faces) == 10:
-                face_array = np.array(faces)
-                # print('INNNNN')
-                # face_array = np.transpose(face_array)
-                detected_face = stats.mode(face_array)[0]
-                up_face = np.asarray(up_face)
-                front_face = np.asarray(front_face)
-                detected_face = np.asarray(detected_face)
-                faces = []
-                if np.array_equal(detected_face, front_face) == True:
-                    print("MOVE MADE")
-                    return up_face,right_face,front_face,down_face,left_face,back_face
-                elif np.array_equal(detected_face,temp) == True:
-                    centroid1 = blob_colors[6]
-                    centroid2 = blob_colors[8]
-                    centroid3 = blob_colors[3]
-                    centroid4 = blob_colors[5]
-                    centroid5 = blob_colors[0]
-                    centroid6 = blob_colors[2]
-                    point1 = (centroid1[5] + (centroid1[7] / 2), centroid1[6] + (centroid1[7] / 2))
-                    point2 = (centroid2[5] + (centroid2[8] / 2), centroid2[6] + (centroid2[8] / 2))
-                    point3 = (centroid3[5] + (centroid3[7] / 2), centroid3[6] + (centroid3[7] / 2))
-                    point4 = (centroid4[5] + (centroid4[8] / 2), centroid4[6] + (centroid4[8] / 2))
-                    point5 = (centroid5[5] + (centroid5[7] / 2), centroid5[6] + (centroid5[7] / 2))
-                    point6 = (centroid6[5] + (centroid6[8] / 2), centroid6[6] + (centroid6[8] / 2))
-                    cv2.arrowedLine(bgr_image_input, point1, point2, (0, 0, 0), 7, tipLength = 0.2)
-                    cv2.arrowedLine(bgr_image_input, point3, point4, (0, 0, 0), 7, tipLength = 0.2)
-                    cv2.arrowedLine(bgr_image_input, point5, point6, (0, 0, 0), 7, tipLength = 0.2)
-                    cv2.arrowedLine(bgr_image_input, point1, point2, (0, 0, 255), 4, tipLength=0.2)
-                    cv2.arrowedLine(bgr_image_input, point3, point4, (0, 0, 255), 4, tipLength=0.2)
-                    cv2.arrowedLine(bgr_image_input, point5, point6, (0, 0, 255), 4, tipLength=0.2)
-        videoWriter.write(bgr_image_input)
-        cv2.imshow("Output Image", bgr_image_input)
-        key_pressed = cv2.waitKey(1) & 0xFF
-        if key_pressed == 27 or key_pressed == ord('q'):
-            break
\ No newline at end of file
+    return verify_move(video, videoWriter, cube, "y'", TURN_FRONT_ARROWS)
@@ -0,0 +1,90 @@
+"""Adaptive detection scheduling against a per-frame time budget.
+
+At ``fps`` frames per second every frame has 1 / fps seconds, and detection may
+use ``load`` of that.  DetectionScheduler keeps a running mean of what
+detection costs at each detection height and picks the largest height whose
+cost fits; when even the smallest does not fit it runs detection only on every
+``stride``-th frame (at most every ``max_stride``-th), so the preview keeps
+its frame rate and decisions just take longer.  Frames that are not detected are reported to the loops as
+skipped (face None) so the voters can tell them from frames without a face.
+A height found too slow is tried again after ``probe_every`` detections, in
+case it was slow only for a while.
+"""
+import math
+
+
+class DetectionScheduler:
+    def __init__(self, fps=30.0, load=0.5, heights=(480, 240), smoothing=0.1, headroom=0.7, settle=5,
+                 probe_every=150, max_stride=8, enabled=True):
+        self.budget = load / fps
+        self.heights = tuple(heights)
+        self.smoothing = smoothing
+        # only move up a level when its expected cost is this far inside the budget
+        self.headroom = headroom
+        # detections at a height before its cost is trusted enough to change height
+        self.settle = settle
+        self.probe_every = probe_every
+        self.max_stride = max_stride
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        self.level = 0
+        self.stride = 1
+        self.countdown = 0
+        self.since_change = 0
+        self.costs = [None] * len(self.heights)
+        self.stats = {"frames": 0, "detected": 0, "skipped": 0, "level_changes": 0, "max_stride": 1}
+
+    @property
+    def height(self):
+        return self.heights[self.level]
+
+    def due(self):
+        """Whether this frame should be run through detection."""
+        self.stats["frames"] += 1
+        if not self.enabled or self.countdown <= 0:
+            self.countdown = self.stride - 1
+            self.stats["detected"] += 1
+            return True
+        self.countdown -= 1
+        self.stats["skipped"] += 1
+        return False
+
+    def record(self, seconds):
+        # running mean of the cost at the current height, then adapt height and stride
+        self.since_change += 1
+        cost = self.costs[self.level]
+        self.costs[self.level] = seconds if cost is None else cost + self.smoothing * (seconds - cost)
+        if not self.enabled:
+            return
+        cost = self.costs[self.level]
+        self.stride = min(self.max_stride, max(1, math.ceil(cost / self.budget)))
+        self.stats["max_stride"] = max(self.stats["max_stride"], self.stride)
+        if self.since_change < self.settle:
+            return
+        if cost > self.budget and self.level + 1 < len(self.heights):
+            self._set_level(self.level + 1)
+            return
+        if self.level > 0:
+            if self.since_change >= self.probe_every:
+                self.costs[self.level - 1] = None
+            upper = self.costs[self.level - 1]
+            # a height twice as large costs about four times as much
+            expected = upper if upper is not None else 4 * cost
+            if expected < self.headroom * self.budget:
+                self._set_level(self.level - 1)
+
+    def _set_level(self, level):
+        self.level = level
+        self.stride = 1
+        self.costs[level] = None
+        self.since_change = 0
+        self.stats["level_changes"] += 1
+
+    def report(self):
+        costs = ", ".join("%dpx %.1f ms" % (height, 1000 * cost)
+                          for height, cost in zip(self.heights, self.costs) if cost is not None)
+        return "detected %d of %d frames (%d skipped, stride up to %d), %d height changes, now %dpx; %s" % (
+            self.stats["detected"], self.stats["frames"], self.stats["skipped"], self.stats["max_stride"],
+            self.stats["level_changes"], self.height, costs)
@@ -0,0 +1,233 @@
+"""Headless virtual camera for timing a whole scan-and-solve session without a webcam.
+
+VirtualCamera stands in for cv2.VideoCapture.  It renders the face of a simulated
+cube that a "virtual human" is holding up, and reacts to the app's prompts
+(display.notify) the way a person would: after a reaction delay it spends a
+few frames turning the cube (frames with no cube in view), then shows the new
+face.  run_session() drives main.main() against it and reports frames consumed
+and wall time per phase.
+
+    python simulator.py --scramble "R U R' U' F2" --delay 0.5 --noise 4
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+import calibration
+import capture
+import cube_state
+import display
+import main
+
+SOLVED = np.repeat(np.arange(1, 7, dtype=np.uint8), 9)
+
+# BGR values that detect_face classifies as colours 1-6
+STICKER_BGR = {
+    1: (255, 255, 255),
+    2: (0, 220, 220),
+    3: (200, 120, 40),
+    4: (60, 200, 60),
+    5: (40, 40, 200),
+    6: (0, 140, 255),
+}
+
+SCAN_PROMPTS = {
+    "Show Front Face": "F",
+    "Show Top Face": "U",
+    "Show Down Face": "D",
+    "Show Right Face": "R",
+    "Show Left Face": "L",
+    "Show Back Face": "B",
+}
+
+
+def render_face(face, frame_size=(480, 640), sticker=36, gap=14, noise=0.0, rng=None):
+    # noise is the standard deviation of a per-frame colour jitter on every sticker and of the
+    # cube's position in pixels, standing in for lighting flicker and an unsteady hand
+    rng = rng if rng is not None else np.random.default_rng()
+    h, w = frame_size
+    image = np.full((h, w, 3), 40, dtype=np.uint8)
+    if face is None:
+        return image
+    total = 3 * sticker + 2 * gap
+    x0 = (w - total) // 2
+    y0 = (h - total) // 2
+    if noise > 0:
+        dx, dy = np.clip(rng.normal(0, noise, 2), -gap, gap).astype(int)
+        x0 += dx
+        y0 += dy
+    cv2.rectangle(image, (x0 - gap, y0 - gap), (x0 + total + gap, y0 + total + gap), (15, 15, 15), -1)
+    for i, colour in enumerate(face):
+        row, col = divmod(i, 3)
+        x = x0 + col * (sticker + gap)
+        y = y0 + row * (sticker + gap)
+        bgr = np.array(STICKER_BGR[int(colour)], dtype=float)
+        if noise > 0:
+            bgr = np.clip(bgr + rng.normal(0, noise, 3), 0, 255)
+        cv2.rectangle(image, (x, y), (x + sticker - 1, y + sticker - 1), bgr.tolist(), -1)
+    return image
+
+
+class VirtualCamera:
+    def __init__(self, cube, fps=30.0, delay=0.5, turn_time=0.3, noise=4.0, frame_size=(480, 640),
+                 max_frames=200000, realtime=False, seed=0):
+        self.cube = np.array(cube, dtype=np.uint8)
+        self.view = "F"
+        self.fps = fps
+        self.delay_frames = int(round(delay * fps))
+        self.turn_frames = max(1, int(round(turn_time * fps)))
+        self.noise = noise
+        self.frame_size = frame_size
+        self.max_frames = max_frames
+        self.realtime = realtime
+        self.rng = np.random.default_rng(seed)
+        self.frames = 0
+        self.moves_made = 0
+        # (first frame of the turn, frame it completes on, action) in the order the prompts came
+        self.pending = []
+        self.last_read = None
+        display.listeners.append(self.on_prompt)
+
+    def on_prompt(self, event, value):
+        if event == "face":
+            action = ("face", SCAN_PROMPTS[value])
+        elif event == "move":
+            action = ("move",) + tuple(value)
+        else:
+            return
+        start = self.frames + self.delay_frames
+        if self.pending:
+            start = max(start, self.pending[-1][1] + self.delay_frames)
+        self.pending.append((start, start + self.turn_frames, action))
+
+    def isOpened(self):
+        return self.frames < self.max_frames
+
+    def read(self):
+        if self.frames >= self.max_frames:
+            return False, None
+        if self.realtime and self.last_read is not None:
+            wait = 1.0 / self.fps - (time.perf_counter() - self.last_read)
+            if wait > 0:
+                time.sleep(wait)
+        self.last_read = time.perf_counter()
+        self.frames += 1
+
+        while self.pending and self.pending[0][1] <= self.frames:
+            action = self.pending.pop(0)[2]
+            if action[0] == "face":
+                self.view = action[1]
+            else:
+                self.cube = cube_state.apply(self.cube, action[1])
+                self.view = action[2]
+                self.moves_made += 1
+        turning = bool(self.pending) and self.pending[0][0] <= self.frames
+        face = None if turning else cube_state.face(self.cube, self.view)
+        return True, render_face(face, self.frame_size, noise=self.noise, rng=self.rng)
+
+    def release(self):
+        if self.on_prompt in display.listeners:
+            display.listeners.remove(self.on_prompt)
+
+
+class NullWriter:
+    def write(self, frame):
+        pass
+
+    def release(self):
+        pass
+
+
+def random_scramble(length=25, seed=None):
+    rng = random.Random(seed)
+    moves = []
+    while len(moves) < length:
+        move = rng.choice(cube_state.FACE_TURNS)
+        if moves and moves[-1][0] == move[0]:
+            continue
+        moves.append(move)
+    return " ".join(moves)
+
+
+def run_session(scramble=None, seed=0, record=False, solve_deadline=None, threaded=False, profiles=None,
+                **camera_options):
+    """Run main.main() headless on a scrambled virtual cube and return a timing report.
+
+    threaded reads the camera through capture.FrameGrabber, which only makes sense in realtime.
+    Colour profiles are read from and saved to ``profiles``; by default every session gets an
+    empty file of its own, so it always calibrates and sessions can be compared.
+    """
+    if scramble is None:
+        scramble = random_scramble(seed=seed)
+    if threaded:
+        camera_options["realtime"] = True
+    camera = VirtualCamera(cube_state.apply(SOLVED, scramble), seed=seed, **camera_options)
+    video = capture.FrameGrabber(camera).start() if threaded else camera
+    writer = None if record else NullWriter()
+    saved = (display.headless, main.FACE_PROMPT_SECONDS, main.SOLVED_MESSAGE_SECONDS, main.SOLVE_DEADLINE,
+             calibration.PROFILE_PATH, main.SOLUTION_CACHE_PATH)
+    scratch = tempfile.TemporaryDirectory()
+    calibration.PROFILE_PATH = profiles or os.path.join(scratch.name, "colour_profiles.json")
+    # solutions left on disk by earlier runs would make the solve phase vary between sessions
+    main.SOLUTION_CACHE_PATH = None
+    display.headless = True
+    main.FACE_PROMPT_SECONDS = 0
+    main.SOLVED_MESSAGE_SECONDS = 0
+    main.SOLVE_DEADLINE = solve_deadline
+    start = time.perf_counter()
+    try:
+        timings = main.main(video=video, videoWriter=writer)
+        completed = True
+    except SystemExit:
+        timings = None
+        completed = False
+    finally:
+        (display.headless, main.FACE_PROMPT_SECONDS, main.SOLVED_MESSAGE_SECONDS, main.SOLVE_DEADLINE,
+         calibration.PROFILE_PATH, main.SOLUTION_CACHE_PATH) = saved
+        scratch.cleanup()
+        video.release()
+    total = time.perf_counter() - start
+    return {
+        "scramble": scramble,
+        "solved": completed and cube_state.is_solved(camera.cube),
+        "frames": camera.frames,
+        "moves_made": camera.moves_made,
+        "simulated_seconds": camera.frames / camera.fps,
+        "wall_seconds": timings,
+        "face_tracking": dict(main.tracker.stats),
+        "capture": dict(video.stats) if threaded else None,
+        "total_wall_seconds": total,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark a headless scan-and-solve session.")
+    parser.add_argument("--scramble", help="scramble to apply to a solved cube (random if omitted)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--delay", type=float, default=0.5, help="human reaction time per prompt, seconds")
+    parser.add_argument("--turn-time", type=float, default=0.3, help="time the cube is out of view per turn, seconds")
+    parser.add_argument("--noise", type=float, default=4.0, help="sticker colour and cube position jitter (sigma)")
+    parser.add_argument("--max-frames", type=int, default=200000)
+    parser.add_argument("--deadline", type=float, help="solver time budget in seconds (unbounded if omitted)")
+    parser.add_argument("--threaded", action="store_true", help="read frames through capture.FrameGrabber (implies --realtime)")
+    parser.add_argument("--realtime", action="store_true", help="pace frames at --fps instead of as fast as possible")
+    parser.add_argument("--profiles", help="colour profile file to use and update (default: calibrate afresh)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = run_session(scramble=args.scramble, seed=args.seed, fps=args.fps, delay=args.delay,
+                         turn_time=args.turn_time, noise=args.noise, max_frames=args.max_frames,
+                         realtime=args.realtime, solve_deadline=args.deadline,
+                         threaded=args.threaded, profiles=args.profiles)
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if report["solved"] else 1)
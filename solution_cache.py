@@ -0,0 +1,134 @@
+"""Solution cache in front of kociemba.solve.
+
+States are keyed by a canonical facelet string: the smallest facelet string over
+the 24 ways of holding the cube.  Facelet strings name stickers after the centre
+they match, so the key does not depend on which colours the cube has either.  A
+solution stored for the canonical orientation is translated back into the
+caller's orientation by renaming the faces it turns.
+
+Lookups go through an in-memory LRU, then an SQLite file that survives
+restarts and keeps at most ``disk_size`` entries, dropping the least recently
+used.  Both are keyed by the canonical string, so the cube held another way
+hits either.  A read from the file only notes when the entry was used; those
+times are written with the next put() or on close(), so a hit costs no commit.
+"""
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import cube_state
+
+_ROWS = np.arange(len(cube_state.ORIENTATIONS))[:, None]
+_LETTERS = np.frombuffer(cube_state.FACES.encode(), dtype=np.uint8)
+
+# For each orientation, the scanned face that ends up at each position, as str.translate tables
+FACE_MAPS = tuple(
+    str.maketrans({face: cube_state.FACES[perm[centre] // 9]
+                   for face, centre in zip(cube_state.FACES, cube_state.CENTRES)})
+    for perm in cube_state.ORIENTATION_TABLE)
+INVERSE_FACE_MAPS = tuple({ord(v): chr(k) for k, v in table.items()} for table in FACE_MAPS)
+
+
+def canonical(facelets):
+    """Return (key, orientation index) for a facelet string."""
+    state = np.frombuffer(facelets.encode(), dtype=np.uint8)
+    rotated = state[cube_state.ORIENTATION_TABLE]
+    lut = np.zeros((len(rotated), 256), dtype=np.uint8)
+    lut[_ROWS, rotated[:, cube_state.CENTRES]] = _LETTERS
+    keys = [row.tobytes() for row in lut[_ROWS, rotated]]
+    best = min(range(len(keys)), key=keys.__getitem__)
+    return keys[best].decode(), best
+
+
+def translate(solution, orientation):
+    """Rewrite a solution found for the cube held in ``orientation`` into the scanned orientation."""
+    return solution.translate(FACE_MAPS[orientation])
+
+
+class SolutionCache:
+    def __init__(self, path="solution_cache.sqlite3", memory_size=1024, disk_size=100000, solver=None):
+        if solver is None:
+            import kociemba
+            solver = kociemba.solve
+        self.solver = solver
+        self.memory = OrderedDict()
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        # key -> time it was last read from the file, not written back yet
+        self.used = {}
+        self.db = None
+        if path:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS solutions "
+                            "(key TEXT PRIMARY KEY, solution TEXT NOT NULL, used REAL NOT NULL)")
+            self.db.commit()
+
+    def _remember(self, key, stored):
+        self.memory[key] = stored
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def _write_used(self):
+        # with the lock held; the caller commits
+        if self.used:
+            self.db.executemany("UPDATE solutions SET used = ? WHERE key = ?",
+                                [(used, key) for key, used in self.used.items()])
+            self.used.clear()
+
+    def get(self, facelets):
+        key, orientation = canonical(facelets)
+        with self.lock:
+            stored = self.memory.get(key)
+            if stored is not None:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return translate(stored, orientation)
+            if self.db is None:
+                return None
+            row = self.db.execute("SELECT solution FROM solutions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.used[key] = time.time()
+            self._remember(key, row[0])
+            self.disk_hits += 1
+            return translate(row[0], orientation)
+
+    def put(self, facelets, solution):
+        key, orientation = canonical(facelets)
+        # stored as the solution reads for the canonical orientation
+        stored = solution.translate(INVERSE_FACE_MAPS[orientation])
+        with self.lock:
+            self._remember(key, stored)
+            if self.db is None:
+                return
+            self._write_used()
+            self.db.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?, ?)", (key, stored, time.time()))
+            count = self.db.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+            if count > self.disk_size:
+                self.db.execute("DELETE FROM solutions WHERE key IN "
+                                "(SELECT key FROM solutions ORDER BY used LIMIT ?)", (count - self.disk_size,))
+            self.db.commit()
+
+    def solve(self, facelets):
+        solution = self.get(facelets)
+        if solution is None:
+            self.misses += 1
+            solution = self.solver(facelets)
+            self.put(facelets, solution)
+        return solution
+
+    def close(self):
+        with self.lock:
+            if self.db is not None:
+                self._write_used()
+                self.db.commit()
+                self.db.close()
+                self.db = None
@@ -0,0 +1,320 @@
+"""Solver start-up and execution helpers around kociemba."""
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+import cube_state
+import move_compiler
+import solution_cache
+
+# A scrambled cube solved once at start-up so the pruning tables are loaded before the real solve
+WARMUP_CUBE = "DRLUUBFBRBLURRLRUBLRDDFDLFUFUFFDBRDUBRUFLLFDDBFLUBLRBD"
+SOLVED_CUBE = "".join(face * 9 for face in "URFDLB")
+
+
+class SolverWarmup:
+    """Imports kociemba and runs one solve on a background thread.
+
+    kociemba loads its pruning tables (cprunetables, or pykociemba's tables when
+    the native build is missing) on the first solve.  Starting this before the
+    camera opens lets that happen while the user is still scanning; solve()
+    waits for the warm-up if it has not finished yet.
+    """
+
+    def __init__(self):
+        self.ready = threading.Event()
+        self.timings = {}
+        self.error = None
+        self.kociemba = None
+        self.thread = threading.Thread(target=self._run, name="solver-warmup", daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.thread.start()
+        return self
+
+    def _run(self):
+        try:
+            start = time.perf_counter()
+            import kociemba
+            self.timings["import"] = time.perf_counter() - start
+            start = time.perf_counter()
+            kociemba.solve(WARMUP_CUBE)
+            self.timings["first_solve"] = time.perf_counter() - start
+            self.kociemba = kociemba
+        except Exception as e:
+            self.error = e
+        finally:
+            self.timings["ready_after"] = time.perf_counter() - self.started
+            self.ready.set()
+
+    def wait(self, timeout=None):
+        return self.ready.wait(timeout)
+
+    def solve(self, facelets):
+        if not self.ready.is_set():
+            start = time.perf_counter()
+            self.ready.wait()
+            self.timings["waited"] = self.timings.get("waited", 0.0) + time.perf_counter() - start
+        if self.kociemba is None:
+            import kociemba
+            self.kociemba = kociemba
+        return self.kociemba.solve(facelets)
+
+    def report(self):
+        return ", ".join("%s %.1f ms" % (name, seconds * 1000) for name, seconds in self.timings.items())
+
+    def close(self):
+        pass
+
+
+def start_warmup():
+    return SolverWarmup().start()
+
+
+def _deadline_worker(jobs, results):
+    # Runs in the worker process: warm up, then for each job keep asking for shorter
+    # solutions, reporting every one found, until no shorter one exists.
+    start = time.perf_counter()
+    import kociemba
+    kociemba.solve(WARMUP_CUBE)
+    results.put((None, "ready", time.perf_counter() - start))
+    while True:
+        job = jobs.get()
+        if job is None:
+            return
+        job_id, facelets, max_depth = job
+        if facelets == SOLVED_CUBE:
+            # kociemba finds a long identity sequence rather than the empty solution
+            results.put((job_id, "solution", ""))
+            results.put((job_id, "done", None))
+            continue
+        found = False
+        depth = max_depth
+        while depth >= 0:
+            try:
+                solution = kociemba.solve(facelets, max_depth=depth)
+            except ValueError as e:
+                if not found:
+                    results.put((job_id, "error", str(e)))
+                break
+            found = True
+            results.put((job_id, "solution", solution))
+            depth = len(solution.split()) - 1
+        results.put((job_id, "done", None))
+
+
+class _Worker:
+    def __init__(self, context):
+        self.started = time.perf_counter()
+        self.jobs = context.Queue()
+        self.results = context.Queue()
+        self.process = context.Process(target=_deadline_worker, args=(self.jobs, self.results),
+                                       name="deadline-solver", daemon=True)
+        self.process.start()
+
+    def stop(self, cancel=False):
+        if cancel:
+            self.process.terminate()
+        elif self.process.is_alive():
+            self.jobs.put(None)
+        self.process.join(1.0)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class DeadlineSolver:
+    """kociemba in a worker process, bounded by a deadline and a maximum depth.
+
+    solve() returns the shortest solution the worker has found when the deadline
+    passes (or sooner, once no shorter solution exists) and cancels the rest of
+    the search by killing the worker.  A spare worker is kept warm so that the
+    next solve does not wait for a new process.  If nothing has been found yet
+    solve() raises TimeoutError and leaves the search running, so calling it
+    again with the same facelets picks up where it left off.
+    """
+
+    def __init__(self, deadline=0.2, max_depth=24):
+        self.deadline = deadline
+        self.max_depth = max_depth
+        self.context = multiprocessing.get_context("spawn")
+        self.timings = {}
+        self.job_id = 0
+        self.job = None
+        self.worker = None
+        self.spare = None
+
+    def start(self):
+        self.worker = _Worker(self.context)
+        self.spare = _Worker(self.context)
+        return self
+
+    def _cancel(self):
+        self.worker.stop(cancel=True)
+        self.worker, self.spare = self.spare, _Worker(self.context)
+        self.timings["cancelled"] = self.timings.get("cancelled", 0) + 1
+
+    def _handle(self, message):
+        job_id, kind, value = message
+        if kind == "ready":
+            self.timings.setdefault("ready_after", time.perf_counter() - self.worker.started)
+            self.timings.setdefault("worker_warmup", value)
+        elif self.job is not None and job_id == self.job["id"]:
+            if kind == "solution":
+                self.job["best"] = value
+            elif kind == "error":
+                self.job["error"] = value
+            elif kind == "done":
+                self.job["done"] = True
+
+    def solve(self, facelets, deadline=None, max_depth=None):
+        deadline = self.deadline if deadline is None else deadline
+        end = time.perf_counter() + deadline
+        if self.job is None or self.job["facelets"] != facelets:
+            if self.job is not None and not self.job["done"]:
+                self._cancel()
+            self.job_id += 1
+            self.job = {"id": self.job_id, "facelets": facelets, "best": None, "error": None, "done": False}
+            self.worker.jobs.put((self.job_id, facelets, self.max_depth if max_depth is None else max_depth))
+        job = self.job
+        while not job["done"]:
+            remaining = end - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                self._handle(self.worker.results.get(timeout=remaining))
+            except queue.Empty:
+                break
+        if job["best"] is None and job["error"] is None:
+            raise TimeoutError("no solution within %.0f ms" % (deadline * 1000))
+        self.job = None
+        if not job["done"]:
+            self._cancel()
+        if job["best"] is None:
+            raise ValueError(job["error"])
+        return job["best"]
+
+    def report(self):
+        return ", ".join("%s %.1f ms" % (name, seconds * 1000) if isinstance(seconds, float)
+                         else "%s %d" % (name, seconds) for name, seconds in self.timings.items())
+
+    def close(self):
+        for worker in (self.worker, self.spare):
+            if worker is not None:
+                worker.stop()
+        self.worker = self.spare = None
+
+
+# One orientation per face on top; the y turns in between are already covered by move_compiler
+CANDIDATE_ORIENTATIONS = tuple(range(0, len(cube_state.ORIENTATIONS), 4))
+
+
+def _pool_warmup():
+    global _kociemba
+    import kociemba
+    kociemba.solve(WARMUP_CUBE)
+    _kociemba = kociemba
+
+
+def _pool_solve(facelets):
+    return _kociemba.solve(facelets)
+
+
+def _pool_ping():
+    return os.getpid()
+
+
+def rotate_facelets(facelets, orientation):
+    """Facelet string of the cube held in ``cube_state.ORIENTATIONS[orientation]``."""
+    state = np.frombuffer(facelets.encode(), dtype=np.uint8)
+    return cube_state.to_facelet_string(state[cube_state.ORIENTATION_TABLE[orientation]])
+
+
+class OrientationSolver:
+    """Solves the cube held several ways (and its inverse) in a process pool and keeps the cheapest.
+
+    kociemba's answer depends on how the cube is held, and main() does not spend
+    the same time on every move, so each candidate is scored with
+    move_compiler.guidance_cost rather than by its length.  With a ``deadline``
+    solve() returns the cheapest candidate finished by then (or the first to
+    finish after it, when none has) and drops the rest.
+    """
+
+    def __init__(self, orientations=CANDIDATE_ORIENTATIONS, inverse=True, costs=move_compiler.STEP_COSTS,
+                 workers=None, deadline=None):
+        self.orientations = tuple(orientations)
+        self.inverse = inverse
+        self.costs = costs
+        self.deadline = deadline
+        self.workers = workers or os.cpu_count() or 1
+        self.timings = {}
+        self.pool = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=_pool_warmup)
+        # start every worker now so they are warm by the time the faces are scanned
+        for _ in range(self.workers):
+            self.pool.submit(_pool_ping)
+        return self
+
+    def candidates(self, facelets):
+        for orientation in self.orientations:
+            rotated = rotate_facelets(facelets, orientation)
+            yield orientation, False, rotated
+            if self.inverse:
+                yield orientation, True, cube_state.inverse_facelets(rotated)
+
+    def solve(self, facelets):
+        if facelets == SOLVED_CUBE:
+            # kociemba finds a long identity sequence rather than the empty solution
+            return ""
+        start = time.perf_counter()
+        # the cube as scanned goes first, so it is the likeliest to be done by the deadline
+        jobs = {self.pool.submit(_pool_solve, cube): (number, orientation, inverted)
+                for number, (orientation, inverted, cube) in enumerate(self.candidates(facelets))}
+        done, pending = wait(jobs, self.deadline)
+        best = None
+        error = None
+        while True:
+            for future in done:
+                number, orientation, inverted = jobs[future]
+                try:
+                    solution = future.result()
+                except ValueError as e:
+                    error = e
+                    continue
+                if inverted:
+                    solution = cube_state.inverse_moves(solution)
+                solution = solution_cache.translate(solution, orientation)
+                cost = move_compiler.guidance_cost(solution, self.costs)[0]
+                if best is None or (cost, len(solution.split()), number) < best[:3]:
+                    best = (cost, len(solution.split()), number, solution)
+            if best is not None or not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in pending:
+            # candidates already running finish in the pool and are ignored
+            future.cancel()
+        if best is None:
+            raise error
+        self.timings["solve"] = time.perf_counter() - start
+        self.timings["candidates"] = len(jobs)
+        self.timings["finished"] = len(jobs) - len(pending)
+        self.timings["best_cost"] = best[0]
+        return best[3]
+
+    def report(self):
+        return ", ".join("%s %.1f ms" % (name, seconds * 1000) if name == "solve"
+                         else "%s %g" % (name, seconds) for name, seconds in self.timings.items())
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
@@ -0,0 +1,220 @@
+"""Sticker colour sampling and classification for detect_face.
+
+Every candidate sticker's mean colour comes from one integral image over the
+area the candidates cover, so each costs four lookups however large it is.
+Blobs are a structured array whose fields keep the order of detect_face's old
+columns (b, g, r, colour, order, x, y, w, h) plus a confidence, and all nine
+stickers are classified in one vectorised pass.
+
+Classification uses the BGR rules directly, or a ColourLut: a 32^3 table of
+colour id and confidence built from a rule set or from labelled samples, so
+any number of stickers is classified with one indexing operation.  Build one
+offline with
+
+    python stickers.py colour_lut.npz --rules hsv
+"""
+import argparse
+
+import cv2
+import numpy as np
+
+BLOB_DTYPE = np.dtype([("b", np.int32), ("g", np.int32), ("r", np.int32), ("colour", np.int32),
+                       ("order", np.int32), ("x", np.int32), ("y", np.int32), ("w", np.int32), ("h", np.int32),
+                       ("confidence", np.float32)])
+
+
+def sample(image, rects, offset=(0, 0), scale=1.0):
+    """Blob array for bounding rects (x, y, w, h) in ``image``.
+
+    Geometry is stored in frame coordinates, offset + rect / scale, for when
+    ``image`` is a region of the frame that starts at ``offset`` and was resized
+    by ``scale``.
+    """
+    blobs = np.zeros(len(rects), dtype=BLOB_DTYPE)
+    if not len(rects):
+        return blobs
+    rects = np.asarray(rects, dtype=np.int32).reshape(-1, 4)
+    # the integral only needs to cover the rects, not the whole image
+    left = rects[:, 0].min()
+    top = rects[:, 1].min()
+    right = (rects[:, 0] + rects[:, 2]).max()
+    bottom = (rects[:, 1] + rects[:, 3]).max()
+    sums = cv2.integral(image[top:bottom, left:right])
+    x0 = rects[:, 0] - left
+    y0 = rects[:, 1] - top
+    x1 = x0 + rects[:, 2]
+    y1 = y0 + rects[:, 3]
+    total = sums[y1, x1] - sums[y0, x1] - sums[y1, x0] + sums[y0, x0]
+    means = (total / (rects[:, 2] * rects[:, 3])[:, None]).astype(np.int32)
+    blobs["b"], blobs["g"], blobs["r"] = means[:, 0], means[:, 1], means[:, 2]
+    if scale != 1.0:
+        rects = np.rint(rects / scale).astype(np.int32)
+    blobs["x"] = rects[:, 0] + offset[0]
+    blobs["y"] = rects[:, 1] + offset[1]
+    blobs["w"], blobs["h"] = rects[:, 2], rects[:, 3]
+    # reading order: rows of stickers top to bottom, left to right within a row
+    blobs["order"] = 50 * blobs["y"] + 10 * blobs["x"]
+    return blobs
+
+
+def bgr_rules(b, g, r):
+    """detect_face's BGR thresholds: colour ids 1-6, 0 when no rule matches."""
+    b, g, r = (np.asarray(c, dtype=np.int32) for c in (b, g, r))
+    rules = [
+        (b > 120) & (g > 120) & (r > 100),
+        (b < 100) & (g > 120) & (r > 120) & (np.abs(g - r) < 30),
+        (b > g) & (g > r),
+        (g > b) & (g > r) & (np.abs(b - r) < 30),
+        (r > b) & (r > g) & (np.abs(b - g) < 30) & (b < 80),
+        (g < r) & (b < g) & (r > 120),
+    ]
+    # np.select takes the first rule that matches, like the original if/elif chain
+    return np.select(rules, [1, 2, 3, 4, 5, 6], 0)
+
+
+def hsv_rules(b, g, r):
+    """The HSV thresholds from the commented-out detect_face: 1 white, 2 yellow, 3 red, 4 orange, 5 green, 6 blue."""
+    bgr = np.stack([b, g, r], axis=-1).astype(np.uint8).reshape(-1, 1, 3)
+    hsv = cv2.cvtColor(bgr, cv2.COLOR_BGR2HSV).reshape(np.shape(b) + (3,)).astype(np.int32)
+    h, s, v = hsv[..., 0], hsv[..., 1], hsv[..., 2]
+    rules = [
+        (s < 60) & (v > 120),
+        (20 < h) & (h < 35) & (s > 80),
+        ((h < 10) | (h > 160)) & (s > 80),
+        (10 < h) & (h < 25) & (s > 80),
+        (35 < h) & (h < 85) & (s > 80),
+        (85 < h) & (h < 130) & (s > 80),
+    ]
+    return np.select(rules, [1, 2, 3, 4, 5, 6], 0)
+
+
+RULE_SETS = {"bgr": bgr_rules, "hsv": hsv_rules}
+
+
+class ColourLut:
+    """Quantised BGR lookup table: colour id and confidence for every cell of a bins^3 grid.
+
+    Build one from a rule set (from_rules) or from labelled sticker means
+    (from_samples), save it with save() and load it back with load().
+    """
+
+    def __init__(self, ids, confidence):
+        self.ids = np.ascontiguousarray(ids, dtype=np.uint8)
+        self.confidence = np.ascontiguousarray(confidence, dtype=np.float32)
+        self.bins = self.ids.shape[0]
+        self.shift = 8 - int(np.log2(self.bins))
+        self._ids = self.ids.ravel()
+        self._confidence = self.confidence.ravel()
+
+    @classmethod
+    def from_rules(cls, rules, bins=32, samples=4):
+        """Majority vote of ``rules`` over samples^3 colours spread through each cell."""
+        if isinstance(rules, str):
+            rules = RULE_SETS[rules]
+        size = 256 // bins
+        offsets = (np.arange(samples) * size) // samples + size // (2 * samples)
+        values = (np.arange(bins)[:, None] * size + offsets).ravel()
+        b, g, r = np.meshgrid(values, values, values, indexing="ij")
+        votes = rules(b, g, r).reshape(bins, samples, bins, samples, bins, samples)
+        votes = votes.transpose(0, 2, 4, 1, 3, 5).reshape(bins, bins, bins, -1)
+        counts = np.stack([(votes == colour).sum(axis=-1) for colour in range(7)], axis=-1)
+        ids = counts.argmax(axis=-1)
+        confidence = counts.max(axis=-1) / votes.shape[-1]
+        return cls(ids, confidence)
+
+    @classmethod
+    def from_samples(cls, bgr, labels, bins=32, max_distance=60.0):
+        """Nearest labelled sample for every cell centre.
+
+        Confidence is 1 - d1 / d2, where d1 and d2 are the distances to the
+        nearest sample of the chosen colour and of any other colour.  Cells
+        further than ``max_distance`` from every sample get colour 0.
+        """
+        bgr = np.asarray(bgr, dtype=np.float32).reshape(-1, 3)
+        labels = np.asarray(labels).ravel()
+        size = 256 // bins
+        centres = np.arange(bins) * size + size / 2
+        cells = np.stack(np.meshgrid(centres, centres, centres, indexing="ij"), axis=-1).reshape(-1, 3)
+        colours = np.unique(labels)
+        nearest = np.empty((len(cells), len(colours)), dtype=np.float32)
+        cell_norms = (cells ** 2).sum(axis=1)
+        for k, colour in enumerate(colours):
+            points = bgr[labels == colour]
+            point_norms = (points ** 2).sum(axis=1)
+            for start in range(0, len(cells), 4096):
+                block = slice(start, start + 4096)
+                # |c - p|^2 = |c|^2 + |p|^2 - 2 c.p, one matrix product per block
+                distances = point_norms[None, :] - 2 * cells[block] @ points.T
+                nearest[block, k] = np.sqrt(np.maximum(distances.min(axis=1) + cell_norms[block], 0))
+        order = np.argsort(nearest, axis=1)
+        best = nearest[np.arange(len(cells)), order[:, 0]]
+        ids = colours[order[:, 0]]
+        confidence = np.ones(len(cells), dtype=np.float32)
+        if len(colours) > 1:
+            second = nearest[np.arange(len(cells)), order[:, 1]]
+            confidence = 1 - best / np.maximum(second, 1e-6)
+        far = best > max_distance
+        ids = np.where(far, 0, ids)
+        confidence = np.where(far, 0, confidence)
+        return cls(ids.reshape(bins, bins, bins), confidence.reshape(bins, bins, bins))
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(data["ids"], data["confidence"])
+
+    def save(self, path):
+        np.savez_compressed(path, ids=self.ids, confidence=self.confidence)
+
+    def lookup(self, b, g, r):
+        """(colour ids, confidences) for any number of BGR means."""
+        shift = self.shift
+        bits = 8 - shift
+        cells = (((np.asarray(b) >> shift) << bits | np.asarray(g) >> shift) << bits) | np.asarray(r) >> shift
+        return self._ids[cells], self._confidence[cells]
+
+
+# A ColourLut, or None to evaluate the BGR rules directly
+classifier = None
+
+
+def use(source):
+    """Set the classifier from a rule set name ("bgr", "hsv"), a saved LUT's path, or None."""
+    global classifier
+    if source is None:
+        classifier = None
+    elif source in RULE_SETS:
+        classifier = ColourLut.from_rules(source)
+    else:
+        classifier = ColourLut.load(source)
+    return classifier
+
+
+def classify(blobs):
+    """Colour ids 1-6 (0 when no rule matches) for each blob, also stored in blobs["colour"]."""
+    if classifier is None:
+        blobs["colour"] = bgr_rules(blobs["b"], blobs["g"], blobs["r"])
+        blobs["confidence"] = 1.0
+    else:
+        blobs["colour"], blobs["confidence"] = classifier.lookup(blobs["b"], blobs["g"], blobs["r"])
+    return blobs["colour"].copy()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build a colour lookup table for detect_face.")
+    parser.add_argument("output", help="where to write the table (.npz)")
+    parser.add_argument("--rules", choices=sorted(RULE_SETS), help="rule set to tabulate")
+    parser.add_argument("--samples", help=".npz with 'bgr' (N, 3) sticker means and their 'labels' (N,)")
+    parser.add_argument("--bins", type=int, default=32)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.samples:
+        data = np.load(args.samples)
+        lut = ColourLut.from_samples(data["bgr"], data["labels"], bins=args.bins)
+    else:
+        lut = ColourLut.from_rules(args.rules or "bgr", bins=args.bins)
+    lut.save(args.output)
+    print("%s: %d^3 cells, mean confidence %.2f" % (args.output, lut.bins, lut.confidence.mean()))
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+import calibration
+import stickers
+
+CENTROIDS = [(200, 200, 200), (30, 200, 200), (200, 60, 30), (40, 180, 40), (30, 30, 200), (20, 100, 230)]
+
+
+def test_lookup_by_nearest_centroid():
+    profile = calibration.ColourProfile(CENTROIDS, max_distance=60)
+    ids, confidence = profile.lookup(np.array([195, 35, 128]), np.array([205, 190, 128]), np.array([190, 210, 0]))
+    assert ids.tolist() == [1, 2, 0]
+    assert confidence[0] > 0.5 and confidence[1] > 0.5
+    assert confidence[2] == 0
+
+
+def test_refine_moves_centroids_towards_confident_stickers():
+    profile = calibration.ColourProfile(CENTROIDS, rate=0.5)
+    blobs = np.zeros(3, dtype=stickers.BLOB_DTYPE)
+    blobs["b"], blobs["g"], blobs["r"] = np.array([(180, 180, 180), (180, 180, 180), (0, 0, 0)]).T
+    blobs["colour"] = [1, 1, 2]
+    blobs["confidence"] = [0.9, 0.9, 0.1]
+    profile.refine(blobs)
+    assert np.allclose(profile.centroids[0], (190, 190, 190))
+    # the unconfident sticker leaves its colour alone
+    assert np.allclose(profile.centroids[1], CENTROIDS[1])
+    assert profile.refinements == 1
+
+
+def test_camera_key():
+    assert calibration.camera_key("camera0", (480, 640, 3)) == "camera0@640x480"
+
+
+def test_profiles_are_saved_per_camera(tmp_path):
+    path = str(tmp_path / "colour_profiles.json")
+    assert calibration.load_profile("camera0@640x480", path) is None
+    profile = calibration.ColourProfile(CENTROIDS)
+    profile.refinements = 3
+    other = calibration.ColourProfile(np.array(CENTROIDS) + 5)
+    calibration.save_profile("camera0@640x480", profile, path)
+    calibration.save_profile("camera1@1280x720", other, path)
+    loaded = calibration.load_profile("camera0@640x480", path)
+    assert np.allclose(loaded.centroids, profile.centroids)
+    assert loaded.refinements == 3
+    assert np.allclose(calibration.load_profile("camera1@1280x720", path).centroids, other.centroids)
+
+
+def test_calibration_gives_up_on_a_colour_it_has_already_learnt(monkeypatch, capsys):
+    import display
+    import main
+
+    # every face the camera shows has the front face's centre colour
+    blobs = np.zeros(9, dtype=stickers.BLOB_DTYPE)
+    blobs["b"], blobs["g"], blobs["r"] = CENTROIDS[2]
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    monkeypatch.setattr(main.pipeline, "read_detected", lambda *args: (True, frame.copy(), None, blobs))
+    monkeypatch.setattr(display, "show_frame", lambda writer, image: False)
+    monkeypatch.setattr(main, "CALIBRATION_TIMEOUT", 0.2)
+    monkeypatch.setattr(main, "FACE_PROMPT_SECONDS", 0)
+    with pytest.raises(TimeoutError, match="no top face in 0.2 s, centre too close to the front face's colour"):
+        main.calibrate(None, None)
+    assert "Show Top Face refused, centre too close to the front face's colour" in capsys.readouterr().out
+
+
+def test_unreadable_profiles_are_ignored(tmp_path):
+    path = str(tmp_path / "colour_profiles.json")
+    for text in ('{"camera0@640x480": {"centroids"', "[]"):
+        with open(path, "w") as f:
+            f.write(text)
+        assert calibration.load_profile("camera0@640x480", path) is None
+    calibration.save_profile("camera0@640x480", calibration.ColourProfile(CENTROIDS), path)
+    assert np.allclose(calibration.load_profile("camera0@640x480", path).centroids, CENTROIDS)
@@ -0,0 +1,171 @@
+import random
+
+import numpy as np
+import pytest
+
+import cube_state
+
+SOLVED = np.repeat(np.arange(1, 7, dtype=np.uint8), 9)
+# every sticker different, so a permutation cannot hide behind equal colours
+LABELLED = np.arange(54, dtype=np.uint8)
+
+
+def scramble(seed, length=25):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(cube_state.FACE_TURNS) for _ in range(length))
+
+
+@pytest.mark.parametrize("move", sorted(cube_state.MOVES))
+def test_four_turns_are_the_identity(move):
+    assert np.array_equal(cube_state.apply(LABELLED, [move] * 4), LABELLED)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_inverse_permutation_undoes_a_scramble(seed):
+    perm = cube_state.compose(scramble(seed))
+    assert np.array_equal(cube_state.apply(LABELLED, scramble(seed))[cube_state.inverse(perm)], LABELLED)
+
+
+def test_face_turns_keep_centres_and_opposite_faces():
+    opposite = dict(zip(cube_state.FACES, "DLBURF"))
+    for name in cube_state.FACES:
+        turned = cube_state.apply(LABELLED, name)
+        assert np.array_equal(cube_state.centres(turned), cube_state.centres(LABELLED))
+        assert np.array_equal(cube_state.face(turned, opposite[name]), cube_state.face(LABELLED, opposite[name]))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_faces_and_facelet_string_round_trip(seed):
+    state = cube_state.apply(SOLVED, scramble(seed))
+    faces = [cube_state.face(state, name) for name in cube_state.FACES]
+    assert np.array_equal(cube_state.from_faces(*faces), state)
+    # naming each colour after its centre's face and back gives the same cube
+    facelets = cube_state.to_facelet_string(state)
+    assert np.array_equal([cube_state.FACES.index(letter) + 1 for letter in facelets], state)
+
+
+def test_solved_cube():
+    assert cube_state.to_facelet_string(SOLVED) == "".join(name * 9 for name in cube_state.FACES)
+    assert cube_state.is_solved(SOLVED)
+    assert not cube_state.is_solved(cube_state.apply(SOLVED, "R"))
+    assert cube_state.is_solved(cube_state.apply(SOLVED, "x y' z2"))
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_kociemba_solution_solves_the_scramble(seed):
+    kociemba = pytest.importorskip("kociemba")
+    state = cube_state.apply(SOLVED, scramble(seed))
+    solution = kociemba.solve(cube_state.to_facelet_string(state))
+    assert cube_state.is_solved(cube_state.apply(state, solution))
+
+
+def scrambled_states(count, seed=0):
+    return np.stack([cube_state.apply(LABELLED, scramble(seed + i)) for i in range(count)])
+
+
+def test_apply_batch_matches_apply():
+    states = scrambled_states(8)
+    moves = scramble(100, 10)
+    batched = cube_state.apply_batch(states, moves)
+    assert batched.shape == states.shape
+    for state, moved in zip(states, batched):
+        assert np.array_equal(moved, cube_state.apply(state, moves))
+
+
+def test_apply_rows_matches_apply():
+    states = scrambled_states(8)
+    row_moves = [scramble(200 + i, i) for i in range(8)]
+    moved = cube_state.apply_rows(states, row_moves)
+    for state, moves, row in zip(states, row_moves, moved):
+        assert np.array_equal(row, cube_state.apply(state, moves))
+
+
+def test_apply_rows_with_padded_move_ids():
+    states = scrambled_states(8)
+    row_moves = [scramble(300 + i, i) for i in range(8)]
+    ids = np.full((8, 7), cube_state.NO_MOVE)
+    for row, moves in zip(ids, row_moves):
+        found = cube_state.move_ids(moves)
+        row[:len(found)] = found
+    moved = cube_state.apply_rows(states, ids)
+    for state, moves, row in zip(states, row_moves, moved):
+        assert np.array_equal(row, cube_state.apply(state, moves))
+    # one move id per row
+    single = cube_state.apply_rows(states, ids[:, 0])
+    for state, move_id, row in zip(states, ids[:, 0], single):
+        expected = state if move_id == cube_state.NO_MOVE else cube_state.apply(state, cube_state.MOVE_NAMES[move_id])
+        assert np.array_equal(row, expected)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_inverse_moves_undo_a_scramble(seed):
+    moves = scramble(seed)
+    undone = cube_state.apply(cube_state.apply(LABELLED, moves), cube_state.inverse_moves(moves))
+    assert np.array_equal(undone, LABELLED)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_inverse_cube_solution_inverted_solves_the_cube(seed):
+    kociemba = pytest.importorskip("kociemba")
+    state = cube_state.apply(SOLVED, scramble(seed))
+    solution = kociemba.solve(cube_state.inverse_facelets(cube_state.to_facelet_string(state)))
+    assert cube_state.is_solved(cube_state.apply(state, cube_state.inverse_moves(solution)))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_scrambles_are_valid(seed):
+    assert cube_state.validate(cube_state.to_facelet_string(cube_state.apply(SOLVED, scramble(seed)))) == []
+
+
+def swap(facelets, pairs):
+    stickers = list(facelets)
+    for a, b in pairs:
+        stickers[a], stickers[b] = stickers[b], stickers[a]
+    return "".join(stickers)
+
+
+def reasons(facelets):
+    return [reason for reason, _ in cube_state.validate(facelets)]
+
+
+def scrambled_facelets(seed):
+    return cube_state.to_facelet_string(cube_state.apply(SOLVED, scramble(seed)))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_twisted_corner(seed):
+    facelets = scrambled_facelets(seed)
+    a, b, c = cube_state.CORNER_FACELETS[0]
+    twisted = list(facelets)
+    twisted[a], twisted[b], twisted[c] = facelets[c], facelets[a], facelets[b]
+    assert reasons("".join(twisted)) == ["a corner is twisted"]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_flipped_edge(seed):
+    assert reasons(swap(scrambled_facelets(seed), [cube_state.EDGE_FACELETS[0]])) == ["an edge is flipped"]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_swapped_edges(seed):
+    first, second = cube_state.EDGE_FACELETS[:2]
+    assert reasons(swap(scrambled_facelets(seed), zip(first, second))) == ["two pieces are swapped"]
+
+
+def test_repeated_centre():
+    facelets = cube_state.SOLVED_FACELETS
+    problems = cube_state.validate(facelets[:13] + "U" + facelets[14:])
+    assert [reason for reason, _ in problems] == ["centre colours are not all different"]
+    assert cube_state.problem_faces(problems) == "UR"
+
+
+def test_short_scan():
+    assert reasons(cube_state.SOLVED_FACELETS[:53]) == ["expected 54 stickers, got 53"]
+
+
+def test_no_states():
+    states = np.zeros((0, 54), dtype=np.uint8)
+    assert cube_state.apply_batch(states, "R U").shape == (0, 54)
+    for row_moves in ([], np.zeros(0, dtype=np.intp), np.full((0, 3), cube_state.NO_MOVE)):
+        moved = cube_state.apply_rows(states, row_moves)
+        assert moved.shape == (0, 54) and moved.dtype == states.dtype
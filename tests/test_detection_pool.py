@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+import detection_pool
+
+SHAPE = (240, 320, 3)
+
+
+class Frames:
+    """A video of numbered frames: noisy ones, which take longer to search, and blank ones in turn."""
+
+    def __init__(self, count=None):
+        self.count = count
+        self.number = 0
+        self.noise = np.random.default_rng(0).integers(0, 256, SHAPE, dtype=np.uint8)
+
+    def read(self):
+        if self.count is not None and self.number >= self.count:
+            return False, None
+        frame = self.noise.copy() if self.number % 2 == 0 else np.zeros(SHAPE, dtype=np.uint8)
+        frame[-8:, -8:] = self.number % 256
+        self.number += 1
+        return True, frame
+
+
+def number(frame):
+    # the workers may draw sticker outlines over a pixel or two of the number
+    return int(np.median(frame[-8:, -8:, 0]))
+
+
+def unclassified(blobs):
+    return len(blobs), blobs
+
+
+def test_frames_come_back_in_capture_order():
+    stage = detection_pool.ParallelDetectionStage(Frames(40), SHAPE, unclassified, workers=2).start()
+    numbers = []
+    try:
+        while True:
+            is_ok, frame, face, blobs = stage.read_detected()
+            if not is_ok:
+                break
+            numbers.append(number(frame))
+            assert face == len(blobs)
+    finally:
+        stage.stop()
+    assert numbers == list(range(40))
+    assert stage.stats["detected"] == stage.stats["consumed"] == 40
+
+
+def test_worker_failing_to_start_is_reported():
+    # a worker that cannot find stickers with these settings dies while warming up
+    stage = detection_pool.ParallelDetectionStage(Frames(10), SHAPE, unclassified, workers=1,
+                                                  settings={"DETECTION_HEIGHT": "tall"})
+    with pytest.raises(RuntimeError):
+        stage.start()
+
+
+def test_worker_dying_ends_the_video(capsys):
+    stage = detection_pool.ParallelDetectionStage(Frames(), SHAPE, unclassified, workers=2).start()
+    try:
+        stage.read_detected()
+        stage.processes[0].kill()
+        for _ in range(1000):
+            is_ok, frame, face, blobs = stage.read_detected()
+            if not is_ok:
+                break
+        assert (is_ok, frame, face, blobs) == (False, None, [], [])
+        assert not stage.isOpened() and stage.closed
+        assert "Detection workers failed (detection worker 0 exited with code" in capsys.readouterr().out
+    finally:
+        stage.stop()
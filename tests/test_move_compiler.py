@@ -0,0 +1,70 @@
+import random
+
+import numpy as np
+import pytest
+
+import cube_state
+import move_compiler
+
+LABELLED = np.arange(54, dtype=np.uint8)
+
+
+def random_solution(rng, length=20):
+    return " ".join(rng.choice(cube_state.FACE_TURNS) for _ in range(length))
+
+
+def reaches(solution, steps, frame):
+    # the steps leave the cube as the solution does, turned by frame y rotations
+    expected = cube_state.apply(cube_state.apply(LABELLED, solution), ["y"] * frame)
+    return np.array_equal(cube_state.apply(LABELLED, steps), expected)
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_steps_reach_the_solution_state(seed):
+    rng = random.Random(seed)
+    solution = random_solution(rng, rng.randint(1, 25))
+    rotation_cost, move_cost = [(1, 1), (2, 1), (0.5, 1)][seed % 3]
+    steps, frame = move_compiler.compile_solution(solution, rotation_cost, move_cost)
+    assert reaches(solution, steps, frame)
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_normalise_keeps_the_state(seed):
+    rng = random.Random(seed)
+    solution = random_solution(rng)
+    normalised = move_compiler.normalise(solution)
+    assert np.array_equal(cube_state.apply(LABELLED, normalised), cube_state.apply(LABELLED, solution))
+    assert len(normalised) <= len(solution.split())
+
+
+def test_cancelling_and_merging_turns():
+    assert move_compiler.compile_solution("R R'") == ([], 0)
+    assert move_compiler.normalise("R L R'") == ["L"]
+    assert move_compiler.normalise("U U") == ["U2"]
+    assert move_compiler.normalise("F2 F") == ["F'"]
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_back_turns_reach_the_solution_state(seed):
+    rng = random.Random(seed)
+    solution = random_solution(rng, rng.randint(1, 25))
+    for back_cost in (1, 3, None):
+        steps, frame = move_compiler.compile_solution(solution, 1, 1, back_cost)
+        assert reaches(solution, steps, frame)
+        if back_cost is None:
+            assert not any(step[0] == "B" for step in steps)
+
+
+def test_back_turn_is_guided_without_turning_the_cube():
+    assert move_compiler.compile_solution("B", 1, 1, 1) == (["B"], 0)
+    steps, frame = move_compiler.compile_solution("B", 1, 1, None)
+    assert len(steps) == 2 and steps[0] in ("y", "y'")
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_guided_steps_are_the_ones_costed(seed):
+    solution = random_solution(random.Random(seed))
+    steps, frame = move_compiler.compile_steps(solution)
+    assert reaches(solution, steps, frame)
+    assert move_compiler.guidance_cost(solution)[1] == steps
+    assert move_compiler.guidance_cost(solution)[0] == pytest.approx(sum(map(move_compiler.step_cost, steps)))
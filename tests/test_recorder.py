@@ -0,0 +1,99 @@
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+import recorder
+
+@pytest.fixture
+def encoder(monkeypatch):
+    # stands in for cv2.VideoWriter; write() holds the worker thread until go is set
+    class Encoder:
+        made = []
+        go = threading.Event()
+        busy = threading.Event()
+        opened = True
+
+        def __init__(self, path, fourcc, fps, size):
+            self.fps = fps
+            self.frames = []
+            Encoder.made.append(self)
+
+        def isOpened(self):
+            return self.opened
+
+        def write(self, frame):
+            self.busy.set()
+            self.go.wait(5)
+            self.frames.append(int(frame[0, 0, 0]))
+
+        def release(self):
+            pass
+
+    monkeypatch.setattr(cv2, "VideoWriter", Encoder)
+    return Encoder
+
+
+def frame(number):
+    return np.full((4, 4, 3), number, dtype=np.uint8)
+
+
+def record(encoder, policy, count=6):
+    # frame 0 keeps the worker busy while the rest arrive at a queue of two
+    writer = recorder.AsyncVideoWriter("unused.avi", "XVID", (4, 4), fps=10, queue_size=2, policy=policy)
+    writer.write(frame(0))
+    assert encoder.busy.wait(5)
+    for number in range(1, count):
+        writer.write(frame(number))
+    encoder.go.set()
+    writer.release()
+    return encoder.made[0].frames, writer.stats
+
+
+def test_drop_newest_keeps_the_queued_frames(encoder):
+    frames, stats = record(encoder, "drop_newest")
+    assert frames == [0, 1, 2]
+    assert stats["dropped"] == 3 and stats["written"] == 3
+
+
+def test_drop_oldest_keeps_the_latest_frames(encoder):
+    frames, stats = record(encoder, "drop_oldest")
+    assert frames == [0, 4, 5]
+    assert stats["dropped"] == 3 and stats["max_depth"] == 2
+
+
+def test_block_waits_for_room(encoder):
+    timer = threading.Timer(0.2, encoder.go.set)
+    timer.start()
+    frames, stats = record(encoder, "block")
+    timer.join()
+    assert frames == [0, 1, 2, 3, 4, 5]
+    assert stats["dropped"] == 0 and stats["blocked"] > 0
+
+
+def test_frame_rate_is_measured_from_timestamps(encoder):
+    encoder.go.set()
+    writer = recorder.AsyncVideoWriter("unused.avi", "XVID", (4, 4), queue_size=100, fps_frames=10)
+    for number in range(20):
+        writer.write(frame(number), timestamp=number / 25)
+    writer.release()
+    assert encoder.made[0].fps == pytest.approx(25)
+    assert encoder.made[0].frames == list(range(20))
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        recorder.AsyncVideoWriter("unused.avi", "XVID", (4, 4), policy="drop_all")
+
+
+def test_a_file_that_cannot_be_opened_is_reported(encoder):
+    encoder.go.set()
+    encoder.opened = False
+    writer = recorder.AsyncVideoWriter("missing/dir/out.avi", "XVID", fps=10)
+    for number in range(5):
+        writer.write(frame(number))
+    writer.release()
+    assert writer.error and "missing/dir/out.avi" in writer.error
+    assert writer.stats["written"] == 0 and writer.stats["failed"] == 5
+    assert "5 frames not recorded" in writer.report()
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+import cube_state
+import display
+import rotate
+
+SOLVED = np.repeat(np.arange(1, 7, dtype=np.uint8), 9)
+
+
+@pytest.fixture
+def camera(monkeypatch):
+    # shows cube_state.face(camera.cube, camera.view) every frame and records the banners drawn over it
+    class Camera:
+        cube = SOLVED
+        view = "F"
+        texts = []
+
+    def read_detected(video, detect_face, schedule):
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        return True, frame, cube_state.face(Camera.cube, Camera.view), {"confidence": np.ones(9)}
+
+    def put_text(image, text, *args):
+        Camera.texts.append(text)
+        return image
+
+    monkeypatch.setattr(rotate.pipeline, "read_detected", read_detected)
+    monkeypatch.setattr(rotate.cv2, "putText", put_text)
+    monkeypatch.setattr(display, "show_frame", lambda writer, image: False)
+    monkeypatch.setattr(rotate, "shown_view", "F")
+    return Camera
+
+
+def turn(camera, step, move, view):
+    camera.texts.clear()
+    camera.cube, camera.view = cube_state.apply(camera.cube, move), view
+    return step(None, None, cube_state.apply(camera.cube, cube_state.inverse_moves(move)))
+
+
+def test_back_turn_asks_for_the_top_face_and_then_the_front_again(camera):
+    turn(camera, rotate.right_cw, "R", "F")
+    assert set(camera.texts) == set()
+    turn(camera, rotate.back_cw, "B", "U")
+    assert set(camera.texts) == {"Show Top Face"}
+    turn(camera, rotate.up_ccw, "U'", "F")
+    assert set(camera.texts) == {"Show Front Face"}
+    turn(camera, rotate.front_cw, "F", "F")
+    assert set(camera.texts) == set()
+    assert rotate.shown_view == "F"
@@ -0,0 +1,120 @@
+import random
+
+import numpy as np
+import pytest
+
+import cube_state
+import solution_cache
+
+SOLVED = np.repeat(np.arange(1, 7, dtype=np.uint8), 9)
+
+
+def scrambled_facelets(seed):
+    rng = random.Random(seed)
+    moves = " ".join(rng.choice(cube_state.FACE_TURNS) for _ in range(25))
+    return cube_state.to_facelet_string(cube_state.apply(SOLVED, moves))
+
+
+def held(facelets, orientation):
+    # the same cube held another way, as the camera would read it
+    state = np.frombuffer(facelets.encode(), dtype=np.uint8)
+    return cube_state.to_facelet_string(state[cube_state.ORIENTATION_TABLE[orientation]])
+
+
+def solves(facelets, solution):
+    return cube_state.is_solved(cube_state.apply(np.frombuffer(facelets.encode(), dtype=np.uint8), solution))
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_canonical_key_ignores_how_the_cube_is_held(seed):
+    facelets = scrambled_facelets(seed)
+    key = solution_cache.canonical(facelets)[0]
+    for orientation in range(len(cube_state.ORIENTATIONS)):
+        assert solution_cache.canonical(held(facelets, orientation))[0] == key
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_canonical_orientation_gives_the_key(seed):
+    facelets = scrambled_facelets(seed)
+    key, orientation = solution_cache.canonical(facelets)
+    assert held(facelets, orientation) == key
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_translated_solution_solves_the_scanned_cube(seed):
+    kociemba = pytest.importorskip("kociemba")
+    facelets = scrambled_facelets(seed)
+    for orientation in range(0, len(cube_state.ORIENTATIONS), 5):
+        solution = kociemba.solve(held(facelets, orientation))
+        assert solves(facelets, solution_cache.translate(solution, orientation))
+
+
+def test_disk_cache_hits_for_a_rotated_cube(tmp_path):
+    kociemba = pytest.importorskip("kociemba")
+    calls = []
+
+    def solver(facelets):
+        calls.append(facelets)
+        return kociemba.solve(facelets)
+
+    cache = solution_cache.SolutionCache(str(tmp_path / "cache.sqlite3"), solver=solver)
+    facelets = scrambled_facelets(0)
+    for orientation in (0, 7, 13):
+        assert solves(held(facelets, orientation), cache.solve(held(facelets, orientation)))
+    assert len(calls) == 1
+    cache.close()
+    # and again after reopening the file
+    cache = solution_cache.SolutionCache(str(tmp_path / "cache.sqlite3"), solver=solver)
+    assert solves(held(facelets, 20), cache.solve(held(facelets, 20)))
+    assert len(calls) == 1
+    cache.close()
+
+
+def test_memory_cache_hits_for_a_rotated_cube():
+    kociemba = pytest.importorskip("kociemba")
+    calls = []
+
+    def solver(facelets):
+        calls.append(facelets)
+        return kociemba.solve(facelets)
+
+    # no file, so every hit comes from memory
+    cache = solution_cache.SolutionCache(None, solver=solver)
+    facelets = scrambled_facelets(1)
+    for orientation in (0, 3, 11, 22):
+        assert solves(held(facelets, orientation), cache.solve(held(facelets, orientation)))
+    assert len(calls) == 1 and cache.hits == 3
+
+
+def test_disk_hits_write_when_they_were_used_on_close(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = solution_cache.SolutionCache(path, solver=lambda facelets: "R U")
+    for seed in range(3):
+        cache.solve(scrambled_facelets(seed))
+    cache.close()
+    cache = solution_cache.SolutionCache(path, solver=lambda facelets: "R U")
+    before = dict(cache.db.execute("SELECT key, used FROM solutions"))
+    assert cache.get(scrambled_facelets(0)) is not None
+    assert cache.disk_hits == 1
+    # not written by the read itself
+    assert dict(cache.db.execute("SELECT key, used FROM solutions")) == before
+    cache.close()
+    cache = solution_cache.SolutionCache(path, solver=lambda facelets: "R U")
+    after = dict(cache.db.execute("SELECT key, used FROM solutions"))
+    key = solution_cache.canonical(scrambled_facelets(0))[0]
+    assert after[key] > before[key]
+    assert {k: v for k, v in after.items() if k != key} == {k: v for k, v in before.items() if k != key}
+    cache.close()
+
+
+def test_recently_read_entries_outlive_the_disk_limit(tmp_path):
+    cache = solution_cache.SolutionCache(str(tmp_path / "cache.sqlite3"), memory_size=1, disk_size=2,
+                                         solver=lambda facelets: "R U")
+    cache.solve(scrambled_facelets(0))
+    cache.solve(scrambled_facelets(1))
+    # read back from the file, then a third entry pushes out the least recently used one
+    assert cache.get(scrambled_facelets(0)) is not None
+    cache.solve(scrambled_facelets(2))
+    keys = {row[0] for row in cache.db.execute("SELECT key FROM solutions")}
+    assert keys == {solution_cache.canonical(scrambled_facelets(seed))[0] for seed in (0, 2)}
+    cache.close()
@@ -0,0 +1,98 @@
+import random
+
+import numpy as np
+import pytest
+
+import cube_state
+import move_compiler
+import solution_cache
+import solver
+
+pytest.importorskip("kociemba")
+
+SOLVED = np.repeat(np.arange(1, 7, dtype=np.uint8), 9)
+
+
+def scrambled_facelets(seed):
+    rng = random.Random(seed)
+    moves = " ".join(rng.choice(cube_state.FACE_TURNS) for _ in range(25))
+    return cube_state.to_facelet_string(cube_state.apply(SOLVED, moves))
+
+
+def solves(facelets, solution):
+    return cube_state.is_solved(cube_state.apply(np.frombuffer(facelets.encode(), dtype=np.uint8), solution))
+
+
+@pytest.fixture(scope="module")
+def deadline_solver():
+    deadline_solver = solver.DeadlineSolver(deadline=1).start()
+    # returns as soon as the worker is warm, so the deadlines below are all spent solving
+    assert deadline_solver.solve(solver.SOLVED_CUBE, deadline=30) == ""
+    yield deadline_solver
+    deadline_solver.close()
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_deadline_solution_solves_the_cube(deadline_solver, seed):
+    facelets = scrambled_facelets(seed)
+    solution = deadline_solver.solve(facelets)
+    assert solves(facelets, solution)
+    assert len(solution.split()) <= deadline_solver.max_depth
+
+
+def test_solved_cube_needs_no_moves(deadline_solver):
+    assert deadline_solver.solve(solver.SOLVED_CUBE) == ""
+
+
+def test_nothing_found_by_the_deadline_keeps_searching(deadline_solver):
+    facelets = scrambled_facelets(10)
+    with pytest.raises(TimeoutError):
+        deadline_solver.solve(facelets, deadline=0)
+    assert solves(facelets, deadline_solver.solve(facelets))
+
+
+def test_impossible_cube_raises_value_error(deadline_solver):
+    facelets = list(scrambled_facelets(11))
+    # flip the UR edge
+    facelets[5], facelets[10] = facelets[10], facelets[5]
+    with pytest.raises(ValueError):
+        deadline_solver.solve("".join(facelets))
+
+
+@pytest.fixture(scope="module")
+def orientation_solver():
+    orientation_solver = solver.OrientationSolver(workers=2).start()
+    yield orientation_solver
+    orientation_solver.close()
+
+
+def test_rotated_facelets_are_the_same_cube():
+    facelets = scrambled_facelets(20)
+    assert solver.rotate_facelets(facelets, 0) == facelets
+    for orientation in solver.CANDIDATE_ORIENTATIONS:
+        rotated = solver.rotate_facelets(facelets, orientation)
+        assert rotated[4::9] == "URFDLB"
+        assert solution_cache.canonical(rotated)[0] == solution_cache.canonical(facelets)[0]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_cheapest_orientation_solves_the_cube(orientation_solver, seed):
+    import kociemba
+
+    facelets = scrambled_facelets(seed)
+    solution = orientation_solver.solve(facelets)
+    assert solves(facelets, solution)
+    # holding the cube as scanned is one of the candidates, so the result is never worse
+    assert move_compiler.guidance_cost(solution)[0] <= move_compiler.guidance_cost(kociemba.solve(facelets))[0]
+
+
+def test_orientations_solved_cube_needs_no_moves(orientation_solver):
+    assert orientation_solver.solve(solver.SOLVED_CUBE) == ""
+
+
+def test_orientations_deadline_returns_a_finished_candidate(orientation_solver, monkeypatch):
+    # nothing can be done by a deadline of 0, so the first candidate to finish is used
+    monkeypatch.setattr(orientation_solver, "deadline", 0)
+    facelets = scrambled_facelets(30)
+    assert solves(facelets, orientation_solver.solve(facelets))
+    assert 1 <= orientation_solver.timings["finished"] <= orientation_solver.timings["candidates"]
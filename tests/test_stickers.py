@@ -0,0 +1,86 @@
+import cv2
+import numpy as np
+
+import stickers
+
+def original_colour(b, g, r):
+    # detect_face's per-sticker if/elif chain, which classify() replaced
+    if b > 120 and g > 120 and r > 100:
+        return 1
+    elif b < 100 and g > 120 and r > 120 and abs(g - r) < 30:
+        return 2
+    elif b > g and g > r:
+        return 3
+    elif g > b and g > r and abs(b - r) < 30:
+        return 4
+    elif r > b and r > g and abs(b - g) < 30 and b < 80:
+        return 5
+    elif g < r and b < g and r > 120:
+        return 6
+    return 0
+
+
+def test_sampled_means_match_cv2_mean():
+    image = np.random.default_rng(0).integers(0, 256, (120, 160, 3), dtype=np.uint8)
+    rects = [(10, 20, 15, 12), (50, 60, 30, 30), (0, 0, 1, 1), (140, 100, 20, 20)]
+    blobs = stickers.sample(image, rects)
+    for blob, (x, y, w, h) in zip(blobs, rects):
+        mean = np.array(cv2.mean(image[y:y + h, x:x + w])).astype(int)
+        assert (blob["b"], blob["g"], blob["r"]) == tuple(mean[:3])
+        assert (blob["x"], blob["y"], blob["w"], blob["h"]) == (x, y, w, h)
+        assert blob["order"] == 50 * y + 10 * x
+
+
+def test_no_rects():
+    assert len(stickers.sample(np.zeros((10, 10, 3), dtype=np.uint8), [])) == 0
+
+
+def test_classify_matches_the_original_rules():
+    bgr = np.random.default_rng(1).integers(0, 256, (5000, 3))
+    blobs = np.zeros(len(bgr), dtype=stickers.BLOB_DTYPE)
+    blobs["b"], blobs["g"], blobs["r"] = bgr.T
+    ids = stickers.classify(blobs)
+    assert np.array_equal(ids, blobs["colour"])
+    assert ids.tolist() == [original_colour(*map(int, colour)) for colour in bgr]
+
+
+def test_lut_from_rules_matches_the_rules_in_every_cell():
+    lut = stickers.ColourLut.from_rules("bgr", bins=32, samples=1)
+    # with one sample per cell the table holds the rules at each cell's sample point
+    values = np.arange(32) * 8 + 4
+    b, g, r = (axis.ravel() for axis in np.meshgrid(values, values, values, indexing="ij"))
+    ids, confidence = lut.lookup(b, g, r)
+    assert np.array_equal(ids, stickers.bgr_rules(b, g, r))
+    assert (confidence == 1).all()
+
+
+COLOURS = [(20, 20, 20), (230, 20, 20), (20, 230, 20), (20, 20, 230), (230, 230, 20), (20, 230, 230)]
+
+
+def test_lut_from_samples_classifies_its_samples():
+    rng = np.random.default_rng(2)
+    bgr = np.concatenate([np.array(colour) + rng.integers(-10, 11, (20, 3)) for colour in COLOURS])
+    labels = np.repeat(np.arange(1, 7), 20)
+    lut = stickers.ColourLut.from_samples(bgr, labels, max_distance=60)
+    ids, confidence = lut.lookup(*bgr.T)
+    assert np.array_equal(ids, labels)
+    assert (confidence > 0.5).all()
+    # far from every sample
+    assert lut.lookup(np.array([230]), np.array([230]), np.array([230]))[0][0] == 0
+
+
+def test_lut_save_and_load(tmp_path):
+    lut = stickers.ColourLut.from_rules("hsv", bins=16)
+    lut.save(str(tmp_path / "lut.npz"))
+    loaded = stickers.ColourLut.load(str(tmp_path / "lut.npz"))
+    assert np.array_equal(loaded.ids, lut.ids)
+    assert np.array_equal(loaded.confidence, lut.confidence)
+
+
+def test_classify_with_a_lut(monkeypatch):
+    monkeypatch.setattr(stickers, "classifier", stickers.ColourLut.from_rules("bgr"))
+    blobs = np.zeros(len(COLOURS), dtype=stickers.BLOB_DTYPE)
+    blobs["b"], blobs["g"], blobs["r"] = np.array(COLOURS).T
+    ids = stickers.classify(blobs)
+    assert np.array_equal(ids, stickers.bgr_rules(blobs["b"], blobs["g"], blobs["r"]))
+    assert np.array_equal(blobs["confidence"], stickers.classifier.lookup(blobs["b"], blobs["g"], blobs["r"])[1])
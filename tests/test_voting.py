@@ -0,0 +1,66 @@
+import numpy as np
+
+import voting
+
+FACE = np.array([1, 2, 3, 4, 5, 6, 1, 2, 3])
+
+
+def test_steady_faces_decide_after_min_frames():
+    voter = voting.StickerVoter(window=5, min_frames=3, threshold=0.6)
+    assert voter.add(FACE) is None
+    assert voter.add(FACE) is None
+    assert np.array_equal(voter.add(FACE), FACE)
+
+
+def test_one_misread_frame_does_not_change_the_decision():
+    voter = voting.StickerVoter(window=5, min_frames=3, threshold=0.6)
+    misread = FACE.copy()
+    misread[0] = 6
+    for face in (FACE, FACE, misread, FACE, FACE):
+        decided = voter.add(face)
+    assert np.array_equal(decided, FACE)
+
+
+def test_split_votes_stay_undecided():
+    voter = voting.StickerVoter(window=4, min_frames=3, threshold=0.6)
+    other = FACE.copy()
+    other[4] = 1
+    for face in (FACE, other, FACE, other):
+        assert voter.add(face) is None
+
+
+def test_old_votes_leave_the_window():
+    voter = voting.StickerVoter(window=3, min_frames=3, threshold=0.6, max_misses=100)
+    new = FACE[::-1].copy()
+    for _ in range(3):
+        voter.add(FACE)
+    decided = [voter.add(new) for _ in range(3)]
+    assert np.array_equal(decided[-1], new)
+
+
+def test_misses_clear_the_window():
+    voter = voting.StickerVoter(window=5, min_frames=3, threshold=0.6, max_misses=2)
+    voter.add(FACE)
+    voter.add(FACE)
+    voter.miss()
+    voter.miss()
+    assert voter.size == 0
+    assert voter.add(FACE) is None
+
+
+def test_weighted_votes_favour_confident_frames():
+    voter = voting.StickerVoter(window=5, min_frames=3, threshold=0.6, weighted=True)
+    other = FACE.copy()
+    other[0] = 6
+    voter.add(other, np.full(9, 0.05))
+    voter.add(FACE, np.ones(9))
+    assert np.array_equal(voter.add(FACE, np.ones(9)), FACE)
+
+
+def test_skipped_frames_change_nothing():
+    voter = voting.StickerVoter(window=5, min_frames=3, threshold=0.6)
+    voter.add(FACE)
+    voter.add(FACE)
+    voter.skip()
+    assert voter.skipped == 1
+    assert np.array_equal(voter.add(FACE), FACE)
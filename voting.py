@@ -0,0 +1,72 @@
+"""Streaming per-sticker voting over the last few detected faces.
+
+StickerVoter keeps running vote totals for every sticker and colour over a
+sliding window of faces, optionally weighting each vote by its classification
+confidence.  A face is decided as soon as, for every sticker, the leading
+colour is ahead of the runner-up by ``threshold`` of that sticker's votes in the
+window, so agreeing frames decide quickly and one bad frame only delays the
+decision by a frame or two instead of spoiling a whole batch.  Adding a face
+updates the totals in place.  After ``max_misses`` frames in a row without a
+face (the cube being turned or moved) the window is cleared, so the next face
+is not outvoted by the last one.  Frames that were not run through detection
+at all are reported with skip() and change nothing but the count.
+"""
+import numpy as np
+
+
+class StickerVoter:
+    def __init__(self, window=5, min_frames=3, threshold=0.6, weighted=False, max_misses=3, stickers=9, colours=7):
+        self.window = window
+        self.min_frames = min_frames
+        self.threshold = threshold
+        self.weighted = weighted
+        self.max_misses = max_misses
+        self.ids = np.zeros((window, stickers), dtype=np.intp)
+        self.weights = np.zeros((window, stickers))
+        self.counts = np.zeros((stickers, colours))
+        self.rows = np.arange(stickers)
+        self.frames = 0
+        self.skipped = 0
+        self.reset()
+
+    def reset(self):
+        self.counts.fill(0)
+        self.size = 0
+        self.next = 0
+        self.misses = 0
+
+    def add(self, face, confidence=None):
+        """Vote with one face's colour ids; returns the decided face, or None while undecided."""
+        self.misses = 0
+        self.frames += 1
+        slot = self.next
+        if self.size == self.window:
+            # the oldest face leaves the window
+            self.counts[self.rows, self.ids[slot]] -= self.weights[slot]
+        else:
+            self.size += 1
+        self.ids[slot] = face
+        self.weights[slot] = confidence if self.weighted and confidence is not None else 1.0
+        self.counts[self.rows, self.ids[slot]] += self.weights[slot]
+        self.next = (slot + 1) % self.window
+        return self.decision()
+
+    def skip(self):
+        # a frame the detection scheduler skipped
+        self.skipped += 1
+
+    def miss(self):
+        # a frame without a full face
+        self.misses += 1
+        if self.misses >= self.max_misses:
+            self.reset()
+
+    def decision(self):
+        if self.size < self.min_frames:
+            return None
+        top = np.partition(self.counts, -2, axis=1)
+        total = self.counts.sum(axis=1)
+        lead = (top[:, -1] - top[:, -2]) >= self.threshold * total - 1e-9
+        if not (lead.all() and total.all()):
+            return None
+        return self.counts.argmax(axis=1)